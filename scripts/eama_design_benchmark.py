@@ -0,0 +1,661 @@
+#!/usr/bin/env python3
+"""
+EAMA Design Benchmark Script
+
+Generates synthetic design corpora and times the design search and
+validation hot paths against them:
+- Scans: without index (serially and over a process pool), cold index
+  build, warm (index loaded from disk), incremental (1% of files touched)
+  and hot (index already in memory, as in the search daemon)
+- Every search type of eama_design_search.py, run in-process on a warm index
+  and through a search daemon started for the corpus
+- DesignDocumentValidator.validate_all(), without and with its result cache
+
+Corpora are realistic design trees: GUUID frontmatter, the usual statuses,
+nested type/area folders, headings, cross-references between documents and
+occasional large bodies. They are generated once per size and seed under
+the work directory and reused by later runs.
+
+Usage:
+    python eama_design_benchmark.py
+    python eama_design_benchmark.py --sizes 1000,10000 --repeat 5
+    python eama_design_benchmark.py --output bench-main.json
+    python eama_design_benchmark.py --compare bench-main.json --threshold 1.25
+
+Output: JSON results on stdout (or --output), progress to stderr. With
+--compare, each timing is also compared with a previous results file and the
+exit code is 1 if any benchmark got slower than the threshold allows. A
+parallel scan that differs from the serial one, or a daemon search that
+fails, aborts the run with an error.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from eama_design_daemon import query_daemon
+from eama_design_index import DEFAULT_INDEX_DIR, DesignIndex
+from eama_design_search import (
+    build_parser,
+    document_to_dict,
+    indexed_documents,
+    scan_design_documents,
+    search_documents,
+    validate_args,
+)
+from eama_design_validate import DesignDocumentValidator
+
+# Bump when the generated corpus or the benchmark set changes meaning
+BENCHMARK_VERSION = 1
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Marker written into each generated corpus, so it is only reused as-is
+MANIFEST_FILE = ".bench-manifest.json"
+
+# Benchmarks faster than this are too noisy to flag as regressions
+NOISE_FLOOR_SECONDS = 0.001
+
+# Seconds a started search daemon gets to answer its first query
+DAEMON_START_SECONDS = 120.0
+
+SEARCH_SCRIPT = Path(__file__).resolve().parent / "eama_design_search.py"
+
+DOC_TYPES = ["pdr", "spec", "feature", "decision", "architecture"]
+
+# Weighted towards the states real trees are mostly in
+STATUSES = ["draft"] * 3 + ["review"] * 2 + ["approved"] * 4 + ["deprecated"]
+
+DOMAIN_WORDS = [
+    "authentication",
+    "authorization",
+    "token",
+    "refresh",
+    "rotation",
+    "rollout",
+    "gateway",
+    "payment",
+    "reconciliation",
+    "scheduler",
+    "telemetry",
+    "migration",
+    "cache",
+    "replication",
+    "notification",
+    "billing",
+    "search",
+    "indexer",
+    "session",
+    "audit",
+]
+
+SECTION_TITLES = [
+    "Overview",
+    "Motivation",
+    "Requirements",
+    "Design",
+    "Alternatives Considered",
+    "Rollout Plan",
+    "Open Questions",
+    "Security Considerations",
+]
+
+SYLLABLES = ["ka", "lo", "mi", "ser", "vo", "tra", "ne", "dux", "pel", "quor"]
+
+BASE_DATE = date(2025, 1, 1)
+
+# GUUID sequence numbers per day (NNNN), leaving headroom below 9999
+UUIDS_PER_DAY = 9000
+
+
+def guuid(i: int) -> str:
+    """Deterministic, unique GUUID for the i-th generated document."""
+    day = BASE_DATE + timedelta(days=i // UUIDS_PER_DAY)
+    return f"GUUID-{day:%Y%m%d}-{i % UUIDS_PER_DAY + 1:04d}"
+
+
+def build_vocabulary(rng: random.Random, size: int = 3000) -> list[str]:
+    """Filler words: domain terms plus pseudo-words built from syllables."""
+    words = set(DOMAIN_WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def paragraph(rng: random.Random, vocabulary: list[str], words: int) -> str:
+    """A paragraph of filler, biased towards domain terms like real prose."""
+    picked = [
+        rng.choice(DOMAIN_WORDS) if rng.random() < 0.15 else rng.choice(vocabulary)
+        for _ in range(words)
+    ]
+    picked[0] = picked[0].capitalize()
+    return " ".join(picked) + "."
+
+
+def render_document(
+    rng: random.Random, vocabulary: list[str], i: int, body_bytes: int
+) -> tuple[str, str]:
+    """Render the i-th document.
+
+    Returns:
+        Tuple of (path relative to the design directory, content)
+    """
+    doc_type = DOC_TYPES[i % len(DOC_TYPES)]
+    area = f"area-{rng.randrange(max(1, i // 500 + 1)):03d}"
+    nested = f"/sub-{rng.randrange(4)}" if rng.random() < 0.3 else ""
+    topic = rng.sample(DOMAIN_WORDS, 2)
+    created = BASE_DATE + timedelta(days=rng.randrange(600))
+    updated = created + timedelta(days=rng.randrange(120))
+
+    frontmatter = [
+        "---",
+        f"uuid: {guuid(i)}",
+        f"title: {topic[0].capitalize()} {topic[1]} design {i}",
+        f"status: {rng.choice(STATUSES)}",
+        f"created: {created:%Y-%m-%d}",
+        f"keywords: [{', '.join(topic)}]",
+    ]
+    # A few documents are invalid so validation exercises its error paths
+    if rng.random() >= 0.02:
+        frontmatter.append(f"updated: {updated:%Y-%m-%d}")
+    frontmatter.append("---")
+
+    body = [f"# {topic[0].capitalize()} {topic[1]} design {i}", ""]
+    if i and rng.random() < 0.6:
+        refs = {guuid(rng.randrange(i)) for _ in range(rng.randint(1, 3))}
+        body += [f"Builds on {', '.join(sorted(refs))}.", ""]
+
+    # One document in fifty is large, like long specs with appendices
+    target = body_bytes * 16 if rng.random() < 0.02 else body_bytes
+    size = 0
+    section = 0
+    while size < target:
+        title = SECTION_TITLES[section % len(SECTION_TITLES)]
+        text = paragraph(rng, vocabulary, rng.randint(40, 120))
+        body += [f"## {title}", "", text, ""]
+        size += len(title) + len(text) + 6
+        section += 1
+
+    path = f"{doc_type}/{area}{nested}/doc-{i:06d}.md"
+    return path, "\n".join(frontmatter + body) + "\n"
+
+
+def generate_corpus(root: Path, count: int, seed: int, body_bytes: int) -> Path:
+    """Create (or reuse) a synthetic project with count design documents.
+
+    Args:
+        root: Project directory to generate into
+        count: Number of documents
+        seed: Random seed; the same seed always gives the same corpus
+        body_bytes: Approximate body size of a typical document
+
+    Returns:
+        The project directory
+    """
+    manifest = {
+        "version": BENCHMARK_VERSION,
+        "count": count,
+        "seed": seed,
+        "body_bytes": body_bytes,
+    }
+    manifest_path = root / MANIFEST_FILE
+    try:
+        if json.loads(manifest_path.read_text(encoding="utf-8")) == manifest:
+            return root
+    except (OSError, ValueError):
+        pass
+
+    if root.exists():
+        shutil.rmtree(root)
+    design_dir = root / "design"
+
+    rng = random.Random(seed)
+    vocabulary = build_vocabulary(rng)
+    for i in range(count):
+        rel_path, content = render_document(rng, vocabulary, i, body_bytes)
+        file_path = design_dir / rel_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content, encoding="utf-8")
+
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    return root
+
+
+def search_cases(count: int) -> dict[str, list[str]]:
+    """Command lines timed for each search type against a corpus."""
+    target = guuid(count // 2)
+    return {
+        "uuid_exact": ["--uuid", target],
+        "uuid_prefix": ["--uuid", target[:-2]],
+        "uuid_substring": ["--uuid", target[-6:], "--uuid-substring"],
+        "keyword": ["--keyword", "reconciliation"],
+        "status": ["--status", "approved"],
+        "list_sorted_page": ["--list", "--sort", "modified", "--limit", "20"],
+        "text": ["--text", "token refresh"],
+        "text_phrase_or": ["--text", '"token refresh" OR rollout'],
+        "text_snippets": ["--text", "token refresh", "--snippets", "2"],
+        "fuzzy": ["--fuzzy", "reconcilation"],
+        "query": ["--query", "status:approved type:pdr modified>2025-06-01 token"],
+        "references_to": ["--references-to", guuid(count // 10)],
+        "references_to_transitive": [
+            "--references-to",
+            guuid(count // 10),
+            "--transitive",
+        ],
+        "referenced_by_transitive": [
+            "--referenced-by",
+            guuid(count - 1),
+            "--transitive",
+        ],
+        "related": ["--related", target],
+        "duplicates": ["--duplicates"],
+        "facets": ["--facets"],
+        "facets_filtered": ["--status", "approved", "--facets", "--limit", "0"],
+    }
+
+
+def time_runs(func: Callable[[], Any], repeat: int) -> list[float]:
+    """Wall-clock seconds of each of repeat calls."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def start_daemon(project_dir: Path, jobs: int) -> "subprocess.Popen[bytes]":
+    """Start a search daemon for a project and wait until it answers.
+
+    Raises:
+        RuntimeError: If the daemon exits or does not answer in time
+    """
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            str(SEARCH_SCRIPT),
+            "serve",
+            "--project-dir",
+            str(project_dir),
+            "--jobs",
+            str(jobs),
+        ],
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + DAEMON_START_SECONDS
+    while query_daemon(project_dir, ["--list", "--limit", "0"]) is None:
+        if process.poll() is not None:
+            raise RuntimeError(f"search daemon exited with {process.returncode}")
+        if time.monotonic() > deadline:
+            stop_daemon(process)
+            raise RuntimeError("search daemon did not answer")
+        time.sleep(0.05)
+    return process
+
+
+def stop_daemon(process: "subprocess.Popen[bytes]") -> None:
+    """Terminate a daemon started by start_daemon()."""
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def daemon_search(project_dir: Path, argv: list[str]) -> dict[str, Any]:
+    """Run one search through the project's daemon.
+
+    Raises:
+        RuntimeError: If no daemon answered or the search failed
+    """
+    response = query_daemon(project_dir, argv)
+    if response is None:
+        raise RuntimeError(f"search daemon did not answer {argv}")
+    output = response.get("output", {})
+    if response.get("exit_code", 0) != 0 or "error" in output:
+        raise RuntimeError(f"daemon search {argv} failed: {output.get('error')}")
+    return output
+
+
+def record(
+    results: list[dict[str, Any]], size: int, name: str, runs: list[float]
+) -> None:
+    """Append one benchmark's timings to the results and report progress."""
+    median = statistics.median(runs)
+    results.append(
+        {
+            "corpus": size,
+            "name": name,
+            "median": round(median, 6),
+            "min": round(min(runs), 6),
+            "runs": [round(r, 6) for r in runs],
+        }
+    )
+    print(f"  {name:<28} {median * 1000:10.2f} ms", file=sys.stderr)
+
+
+def benchmark_corpus(
+    project_dir: Path, size: int, repeat: int, jobs: int
+) -> list[dict[str, Any]]:
+    """Run every benchmark against one corpus."""
+    results: list[dict[str, Any]] = []
+    index_dir = project_dir / DEFAULT_INDEX_DIR
+
+    def cold_scan() -> None:
+        shutil.rmtree(index_dir, ignore_errors=True)
+        scan_design_documents(project_dir, index=DesignIndex(project_dir), jobs=jobs)
+
+    def warm_scan() -> None:
+        scan_design_documents(project_dir, index=DesignIndex(project_dir), jobs=jobs)
+
+    record(
+        results,
+        size,
+        "scan_no_index",
+        time_runs(lambda: scan_design_documents(project_dir, jobs=jobs), repeat),
+    )
+
+    # The process pool must give exactly the documents of a serial scan
+    parallel_jobs = jobs if jobs != 1 else 2
+    serial = [document_to_dict(doc) for doc in scan_design_documents(project_dir)]
+
+    def parallel_scan() -> None:
+        documents = scan_design_documents(project_dir, jobs=parallel_jobs)
+        if [document_to_dict(doc) for doc in documents] != serial:
+            raise RuntimeError(
+                f"scan with --no-index --jobs {parallel_jobs} differs from "
+                "the serial scan"
+            )
+
+    record(results, size, "scan_no_index_parallel", time_runs(parallel_scan, repeat))
+    record(results, size, "scan_cold", time_runs(cold_scan, repeat))
+    record(results, size, "scan_warm", time_runs(warm_scan, repeat))
+
+    # Touch 1% of the files between runs; the index must reparse only those
+    touched = sorted((project_dir / "design").rglob("*.md"))[::100]
+    incremental_runs = []
+    for _ in range(repeat):
+        now = time.time()
+        for file_path in touched:
+            os.utime(file_path, (now, now))
+        incremental_runs += time_runs(warm_scan, 1)
+    record(results, size, "scan_incremental_1pct", incremental_runs)
+
+    index = DesignIndex(project_dir)
+    scan_design_documents(project_dir, index=index, jobs=jobs)
+    record(
+        results,
+        size,
+        "scan_hot",
+        time_runs(
+            lambda: scan_design_documents(project_dir, index=index, jobs=jobs), repeat
+        ),
+    )
+
+    parser = build_parser()
+    for name, argv in search_cases(size).items():
+        args = parser.parse_args(argv + ["--project-dir", str(project_dir)])
+        query = validate_args(parser, args)
+
+        # Warm-up: also brings the lazily built tables this search needs up
+        # to date on disk, so the first-use timing measures loading them
+        search_documents(
+            args, query, project_dir, indexed_documents(index), index, 0.0
+        )
+
+        # A fresh process loads the index tables it needs on first use
+        fresh = DesignIndex(project_dir)
+        fresh.load()
+        record(
+            results,
+            size,
+            f"search_{name}_first",
+            time_runs(
+                lambda: search_documents(
+                    args, query, project_dir, indexed_documents(fresh), fresh, 0.0
+                ),
+                1,
+            ),
+        )
+        # Steady state, as in the search daemon: every table already loaded
+        record(
+            results,
+            size,
+            f"search_{name}",
+            time_runs(
+                lambda: search_documents(
+                    args, query, project_dir, indexed_documents(index), index, 0.0
+                ),
+                repeat,
+            ),
+        )
+
+    # The same searches through a daemon, including its rescan of changed files
+    daemon = start_daemon(project_dir, parallel_jobs)
+    try:
+        for name, argv in search_cases(size).items():
+            argv = argv + ["--project-dir", str(project_dir)]
+            daemon_search(project_dir, argv)
+            record(
+                results,
+                size,
+                f"daemon_{name}",
+                time_runs(lambda: daemon_search(project_dir, argv), repeat),
+            )
+
+        daemon_incremental_runs = []
+        list_argv = ["--list", "--limit", "0", "--project-dir", str(project_dir)]
+        for _ in range(repeat):
+            now = time.time()
+            for file_path in touched:
+                os.utime(file_path, (now, now))
+            daemon_incremental_runs += time_runs(
+                lambda: daemon_search(project_dir, list_argv), 1
+            )
+        record(results, size, "daemon_incremental_1pct", daemon_incremental_runs)
+    finally:
+        stop_daemon(daemon)
+
+    validator = DesignDocumentValidator(project_dir / "design", use_cache=False)
+    record(results, size, "validate_all", time_runs(validator.validate_all, repeat))
+
+    # Unchanged corpus: every result comes from the validation cache
+    cached = DesignDocumentValidator(project_dir / "design")
+    cached.validate_all()
+    record(
+        results, size, "validate_all_cached", time_runs(cached.validate_all, repeat)
+    )
+    return results
+
+
+def git_revision() -> dict[str, Any]:
+    """Commit the benchmarked code comes from, if it is in a git checkout."""
+    script_dir = Path(__file__).resolve().parent
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=script_dir,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--", "."],
+            cwd=script_dir,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": bool(dirty)}
+
+
+def compare_results(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[dict[str, Any]]:
+    """Compare median timings with a baseline results file.
+
+    Returns:
+        One entry per benchmark present in both, with the ratio and whether
+        it counts as a regression
+    """
+    previous = {(r["corpus"], r["name"]): r for r in baseline.get("results", [])}
+    comparison = []
+    for result in current["results"]:
+        before = previous.get((result["corpus"], result["name"]))
+        if before is None or not before["median"]:
+            continue
+        ratio = result["median"] / before["median"]
+        comparison.append(
+            {
+                "corpus": result["corpus"],
+                "name": result["name"],
+                "baseline": before["median"],
+                "median": result["median"],
+                "ratio": round(ratio, 3),
+                "regression": ratio > threshold
+                and result["median"] > NOISE_FLOOR_SECONDS,
+            }
+        )
+    return comparison
+
+
+def parse_sizes(value: str) -> list[int]:
+    """argparse type for a comma-separated list of corpus sizes."""
+    try:
+        sizes = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size list: {value}")
+    if not sizes or any(size <= 0 for size in sizes):
+        raise argparse.ArgumentTypeError("sizes must be positive numbers")
+    return sizes
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark design search and validation on synthetic corpora",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --sizes 1000 --repeat 3             Quick run
+  %(prog)s --output base.json                  Save results of this commit
+  %(prog)s --compare base.json                 Fail on >25%% slowdowns
+        """,
+    )
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=DEFAULT_SIZES,
+        help="Comma-separated corpus sizes (default: 1000,10000,100000)",
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "eama-design-bench",
+        help="Where corpora are generated and kept between runs",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Corpus random seed")
+    parser.add_argument(
+        "--body-bytes",
+        type=int,
+        default=4096,
+        help="Approximate body size of a typical document (default: 4096)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per benchmark (default: 3)"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Parse processes for scans (default: 1)"
+    )
+    parser.add_argument("--output", type=Path, help="Write results to this file")
+    parser.add_argument(
+        "--compare", type=Path, help="Previous results file to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Slowdown ratio counted as a regression with --compare (default: 1.25)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    baseline = None
+    if args.compare:
+        try:
+            baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            parser.error(f"Cannot read {args.compare}: {e}")
+
+    output: dict[str, Any] = {
+        "benchmark_version": BENCHMARK_VERSION,
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {
+            "seed": args.seed,
+            "body_bytes": args.body_bytes,
+            "repeat": args.repeat,
+            "jobs": args.jobs,
+        },
+        "results": [],
+    }
+
+    for size in args.sizes:
+        project_dir = args.work_dir / f"corpus-{size}-seed{args.seed}"
+        print(f"Corpus of {size} documents: {project_dir}", file=sys.stderr)
+        start = time.perf_counter()
+        generate_corpus(project_dir, size, args.seed, args.body_bytes)
+        print(
+            f"  {'generate (or reuse)':<28} {time.perf_counter() - start:10.2f} s",
+            file=sys.stderr,
+        )
+        output["results"] += benchmark_corpus(project_dir, size, args.repeat, args.jobs)
+
+    exit_code = 0
+    if baseline is not None:
+        comparison = compare_results(output, baseline, args.threshold)
+        output["comparison"] = {
+            "baseline_git": baseline.get("git"),
+            "threshold": args.threshold,
+            "results": comparison,
+        }
+        regressions = [c for c in comparison if c["regression"]]
+        for c in regressions:
+            print(
+                f"REGRESSION {c['corpus']} {c['name']}: "
+                f"{c['baseline'] * 1000:.2f} ms -> {c['median'] * 1000:.2f} ms "
+                f"({c['ratio']}x)",
+                file=sys.stderr,
+            )
+        if regressions:
+            exit_code = 1
+
+    text = json.dumps(output, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+eama_design_daemon.py - Unix socket daemon for EAMA design searches.
+
+This module keeps a design search process alive between queries so each
+search skips Python startup and index loading:
+- A Unix socket server answering one JSON request per connection
+- A client that tries the socket and reports None when no daemon answers
+- Change detection through inotify (Linux), with a polling fallback
+
+The module is transport only: eama_design_search.py supplies the request
+handler and the directories to watch (see serve_searches there).
+
+Protocol (one JSON object per line, one request per connection):
+    request:  {"argv": ["--keyword", "auth"], "project_dir": "/path/to/project"}
+    response: {"output": {...}, "exit_code": 0, "timing": "..."}
+
+Result paths are built from the project directory as spelled on the command
+line, so the daemon only answers requests that spell it the same way it was
+started with; other clients fall back to searching in-process.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+__all__ = [
+    "SOCKET_NAME",
+    "socket_path",
+    "query_daemon",
+    "InotifyWatcher",
+    "PollingWatcher",
+    "create_watcher",
+    "serve",
+]
+
+SOCKET_NAME = "design-search.sock"
+
+# Unix socket paths longer than this do not fit in sockaddr_un on all platforms
+MAX_SOCKET_PATH = 100
+
+# Seconds a client waits to connect, and for the answer to a query
+CONNECT_TIMEOUT_SECONDS = 0.5
+QUERY_TIMEOUT_SECONDS = 60.0
+
+# Without inotify the tree is re-stat()ed at most this often
+POLL_INTERVAL_SECONDS = 2.0
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+
+TREE_EVENTS = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+PARENT_EVENTS = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# Single files (the search config) are watched through their directory
+FILE_EVENTS = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def socket_path(project_dir: Path) -> Path:
+    """Socket location for a project's daemon.
+
+    The socket lives in the project's .eama directory unless that path is
+    too long for a Unix socket, in which case a per-project name in the
+    temp directory is used.
+    """
+    path = project_dir.resolve() / ".eama" / SOCKET_NAME
+    if len(str(path)) <= MAX_SOCKET_PATH:
+        return path
+
+    digest = hashlib.sha1(str(project_dir.resolve()).encode()).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"eama-design-search-{digest}.sock"
+
+
+def _recv_all(conn: socket.socket) -> bytes:
+    """Read from a connection until the peer closes its side."""
+    chunks: list[bytes] = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def _is_listening(path: Path) -> bool:
+    """True if a process accepts connections on the socket."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(CONNECT_TIMEOUT_SECONDS)
+            conn.connect(str(path))
+    except OSError:
+        return False
+    return True
+
+
+def query_daemon(
+    project_dir: Path, argv: list[str], timeout: float = QUERY_TIMEOUT_SECONDS
+) -> Optional[dict[str, Any]]:
+    """Send a search to the project's daemon.
+
+    Args:
+        project_dir: Project the daemon serves
+        argv: Search command-line arguments
+        timeout: Seconds to wait for the answer
+
+    Returns:
+        Response dictionary, or None if no daemon answered
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    path = socket_path(project_dir)
+    if not path.exists():
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(CONNECT_TIMEOUT_SECONDS)
+            conn.connect(str(path))
+            conn.settimeout(timeout)
+            request = {"argv": argv, "project_dir": str(project_dir)}
+            conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            conn.shutdown(socket.SHUT_WR)
+            response = json.loads(_recv_all(conn).decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(response, dict) or "output" not in response:
+        return None
+    return response
+
+
+class PollingWatcher:
+    """Change detection by periodically re-checking the tree."""
+
+    def __init__(self, interval: float = POLL_INTERVAL_SECONDS):
+        self.interval = interval
+        self.last_check = 0.0
+
+    def changed(self) -> bool:
+        """True when the tree is due to be re-stat()ed."""
+        now = time.monotonic()
+        if now - self.last_check >= self.interval:
+            self.last_check = now
+            return True
+        return False
+
+    def sync(
+        self, directories: list[Path], parents: list[Path], files: Sequence[Path] = ()
+    ) -> None:
+        """Polling needs no per-directory state."""
+
+    def close(self) -> None:
+        """Polling holds no resources."""
+
+
+class InotifyWatcher:
+    """Change detection through Linux inotify, read without blocking."""
+
+    def __init__(self) -> None:
+        """Create the inotify instance.
+
+        Raises:
+            OSError: If inotify is unavailable
+        """
+        library = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        # watch descriptor -> True for design trees, False for parent dirs
+        self.watches: dict[int, bool] = {}
+        # watch descriptor -> names of the watched files in that directory
+        self.file_watches: dict[int, set[bytes]] = {}
+        self.dirty = True
+
+    def _watch(self, path: Path, mask: int) -> Optional[int]:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        return wd if wd >= 0 else None
+
+    def sync(
+        self, directories: list[Path], parents: list[Path], files: Sequence[Path] = ()
+    ) -> None:
+        """Watch every directory of the design trees and their parents.
+
+        Called after each rescan so newly created folders are covered.
+        Parent directories only report folders being created or removed,
+        which is how new design directories appear.
+
+        Args:
+            directories: Design directory roots, watched recursively
+            parents: Directories where design roots may be created
+            files: Single files whose changes require a rescan (they are
+                picked up once their directory exists)
+        """
+        for file_path in files:
+            wd = self._watch(file_path.parent, FILE_EVENTS)
+            if wd is not None:
+                self.file_watches.setdefault(wd, set()).add(os.fsencode(file_path.name))
+
+        for parent in parents:
+            wd = self._watch(parent, PARENT_EVENTS)
+            if wd is not None:
+                self.watches.setdefault(wd, False)
+
+        for root in directories:
+            for dirpath, dirnames, _ in os.walk(root):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                wd = self._watch(Path(dirpath), TREE_EVENTS)
+                if wd is not None:
+                    self.watches[wd] = True
+
+    def changed(self) -> bool:
+        """Drain pending events; True if anything relevant happened."""
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.dirty = True
+                break
+            if not data:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_len = INOTIFY_EVENT.unpack_from(data, offset)
+                name_start = offset + INOTIFY_EVENT.size
+                offset = name_start + name_len
+                if wd in self.file_watches:
+                    name = data[name_start:offset].rstrip(b"\0")
+                    if mask & IN_Q_OVERFLOW or name in self.file_watches[wd]:
+                        self.dirty = True
+                # Parent directories only matter when a folder comes or goes
+                elif mask & (IN_Q_OVERFLOW | IN_ISDIR) or self.watches.get(wd, True):
+                    self.dirty = True
+
+        dirty, self.dirty = self.dirty, False
+        return dirty
+
+    def close(self) -> None:
+        """Release the inotify instance."""
+        os.close(self.fd)
+
+
+def create_watcher() -> InotifyWatcher | PollingWatcher:
+    """Use inotify where available, polling everywhere else."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher()
+
+
+def serve(
+    project_dir: Path,
+    handle: Callable[[list[str], bool], dict[str, Any]],
+    watch_dirs: Callable[[], list[Path]],
+    watch_files: Sequence[Path] = (),
+) -> int:
+    """Answer search requests on the project's socket until terminated.
+
+    A request whose handler raises gets an error response; the daemon keeps
+    serving and rescans on the next request.
+
+    Args:
+        project_dir: Project being served
+        handle: Callable(argv, changed) returning the response dictionary;
+            ``changed`` tells it whether the tree must be rescanned
+        watch_dirs: Callable returning the current design directories
+        watch_files: Files that also require a rescan when they change
+            (e.g. the search config)
+
+    Returns:
+        Process exit code
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        print(
+            "Error: Unix sockets are not supported on this platform", file=sys.stderr
+        )
+        return 1
+
+    path = socket_path(project_dir)
+    if path.exists():
+        if _is_listening(path):
+            print(f"Error: A daemon is already serving {path}", file=sys.stderr)
+            return 1
+        # Left behind by a daemon that did not shut down cleanly
+        path.unlink()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    watcher = create_watcher()
+    parents = [project_dir, project_dir / "docs"]
+    files = list(watch_files)
+    watcher.sync(watch_dirs(), parents, files)
+
+    stopping = False
+    # A handler that failed mid-rescan leaves the rescan pending
+    rescan = False
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        # Create the socket owner-only, with no window where others can connect
+        umask = os.umask(0o177)
+        try:
+            server.bind(str(path))
+        finally:
+            os.umask(umask)
+        server.listen()
+        server.settimeout(1.0)
+        print(
+            f"Serving design searches on {path} ({type(watcher).__name__})",
+            file=sys.stderr,
+        )
+
+        while not stopping:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except InterruptedError:
+                continue
+
+            with conn:
+                try:
+                    conn.settimeout(QUERY_TIMEOUT_SECONDS)
+                    request = json.loads(_recv_all(conn).decode("utf-8"))
+                    argv = [str(arg) for arg in request["argv"]]
+                except (OSError, ValueError, KeyError, TypeError):
+                    continue
+
+                if request.get("project_dir") != str(project_dir):
+                    response: dict[str, Any] = {"error": "Project directory mismatch"}
+                else:
+                    changed = watcher.changed() or rescan
+                    try:
+                        response = handle(argv, changed)
+                        rescan = False
+                    except Exception as e:
+                        response = {
+                            "output": {"error": f"Search failed: {e}"},
+                            "exit_code": 1,
+                        }
+                        rescan = changed
+                    if changed:
+                        watcher.sync(watch_dirs(), parents, files)
+
+                try:
+                    conn.sendall(json.dumps(response).encode("utf-8"))
+                except OSError:
+                    pass
+    finally:
+        server.close()
+        watcher.close()
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    return 0
@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+"""
+eama_design_fulltext.py - Full-text inverted index for EAMA design documents.
+
+This module provides token-level search over full document bodies:
+- Tokenization into lowercase terms with positions; the frontmatter block
+  is not indexed, so metadata neither matches nor counts towards lengths
+- An inverted index (term -> document -> positions) persisted in SQLite,
+  clustered by term: a query reads only its own terms' postings, and an
+  update rewrites only the changed document's rows
+- Byte offsets of every OFFSET_STRIDE-th token, so hit snippets are read by
+  seeking into the file instead of re-reading it
+- Incremental per-document updates and removals
+- BM25 ranking with AND/OR clauses and quoted phrase queries
+
+Used by eama_design_index.py to keep postings in sync with the design index.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+__all__ = [
+    "TOKEN_PATTERN",
+    "tokenize",
+    "body_start",
+    "positions_of",
+    "term_positions",
+    "token_offsets",
+    "parse_text_query",
+    "FullTextIndex",
+]
+
+# Words are runs of letters/digits, optionally joined by _ or '
+TOKEN_PATTERN = re.compile(r"\w+(?:['_]\w+)*")
+
+# Query syntax: quoted phrases, OR/AND operators, bare terms
+QUERY_TOKEN_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# A byte offset is stored for every OFFSET_STRIDE-th token of a document
+OFFSET_STRIDE = 16
+
+# Tokens of context shown on each side of a snippet's first and last hit
+SNIPPET_CONTEXT = 8
+
+# Upper bound on the bytes read for one snippet
+SNIPPET_MAX_BYTES = 4096
+
+# Marks around highlighted terms in snippets
+HIGHLIGHT = "**"
+
+# Markdown between snippet tokens that is dropped: line-leading rules,
+# heading marks, bullets, quote and table bars, and emphasis/code marks
+SNIPPET_MARKUP_PATTERN = re.compile(
+    r"(?<=\n)[ \t]*(?:[-*_=]{3,}|#{1,6}|[-*+>|])(?=\s|$)|[*`]+"
+)
+
+# Seconds to wait for another process (daemon or CLI) writing the database
+DB_TIMEOUT_SECONDS = 30.0
+
+# Page cache of the postings database in KiB; a document's postings are
+# inserted all over the term-ordered table
+DB_CACHE_KIB = 65536
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase terms."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def positions_of(terms: Iterable[str]) -> dict[str, list[int]]:
+    """Map each term of a token sequence to the list of its positions."""
+    positions: dict[str, list[int]] = {}
+    for pos, term in enumerate(terms):
+        positions.setdefault(term, []).append(pos)
+    return positions
+
+
+def term_positions(text: str) -> dict[str, list[int]]:
+    """Map each term in text to the list of its token positions."""
+    return positions_of(tokenize(text))
+
+
+def body_start(text: str) -> int:
+    """Offset of the first character after a document's frontmatter block.
+
+    The block is the one the metadata parser reads: a first line of ``---``
+    closed by the next line starting with ``---``. Without a closed block
+    the whole text is body and 0 is returned.
+    """
+    end = text.find("\n")
+    if end < 0 or text[:end].rstrip() != "---":
+        return 0
+    while True:
+        start = end + 1
+        end = text.find("\n", start)
+        if text.startswith("---", start):
+            return len(text) if end < 0 else end + 1
+        if end < 0:
+            return 0
+
+
+def token_offsets(text: str, start: int = 0) -> list[int]:
+    """UTF-8 byte offsets of every OFFSET_STRIDE-th token of text.
+
+    ``text`` must be the file content with its original line endings, so
+    the offsets can be used to seek in the file. Tokens are numbered from
+    the character offset ``start`` (e.g. body_start()), matching the
+    positions term_positions() gives for ``text[start:]``.
+    """
+    offsets = []
+    ascii_only = text.isascii()
+    char_pos = byte_pos = 0
+    for i, match in enumerate(TOKEN_PATTERN.finditer(text, start)):
+        if i % OFFSET_STRIDE:
+            continue
+        token_start = match.start()
+        if ascii_only:
+            byte_pos = token_start
+        else:
+            byte_pos += len(text[char_pos:token_start].encode("utf-8"))
+            char_pos = token_start
+        offsets.append(byte_pos)
+    return offsets
+
+
+def parse_text_query(query: str) -> list[list[list[str]]]:
+    """Parse a full-text query into clauses.
+
+    Whitespace-separated items must all match (AND). Items joined by ``OR``
+    form a single clause that matches if any alternative does. A quoted
+    string is a phrase whose terms must appear consecutively.
+
+    Example:
+        ``token "refresh rotation" auth OR login`` parses to
+        ``[[["token"]], [["refresh", "rotation"]], [["auth"], ["login"]]]``
+
+    Args:
+        query: Query string
+
+    Returns:
+        List of clauses; each clause is a list of alternatives, and each
+        alternative is the term sequence of a word or phrase
+    """
+    clauses: list[list[list[str]]] = []
+    join_next = False
+
+    for match in QUERY_TOKEN_PATTERN.finditer(query):
+        phrase, word = match.groups()
+        if word == "OR":
+            join_next = bool(clauses)
+            continue
+        if word == "AND":
+            join_next = False
+            continue
+
+        terms = tokenize(phrase if phrase is not None else word)
+        if not terms:
+            continue
+
+        if join_next:
+            clauses[-1].append(terms)
+        else:
+            clauses.append([terms])
+        join_next = False
+
+    return clauses
+
+
+_SCHEMA = """
+DROP TABLE IF EXISTS meta;
+DROP TABLE IF EXISTS docs;
+DROP TABLE IF EXISTS postings;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    length INTEGER NOT NULL,
+    offsets BLOB NOT NULL,
+    terms TEXT NOT NULL
+);
+CREATE TABLE postings (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    positions BLOB NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+"""
+
+
+def _pack(numbers: list[int]) -> bytes:
+    """Store a list of token positions or offsets as a compact blob."""
+    return array("I", numbers).tobytes()
+
+
+def _unpack(blob: bytes) -> list[int]:
+    """Read back a list stored by _pack()."""
+    numbers = array("I")
+    numbers.frombytes(blob)
+    return numbers.tolist()
+
+
+class FullTextIndex:
+    """Inverted index with positional postings and BM25 scoring.
+
+    Postings live in a SQLite database clustered by term, so a query reads
+    only the postings of its own terms, and a changed document only
+    rewrites its own rows. Collection statistics (document count, lengths,
+    document frequencies) are read from the database when a query needs
+    them. Changes are committed by save().
+    """
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, path: Path, version: int):
+        """Initialize an index bound to a SQLite database file.
+
+        Args:
+            path: Location of the database
+            version: Format version shared with the owning design index
+        """
+        self.path = path
+        self.version = version
+        self._db: Optional[sqlite3.Connection] = None
+        self.loaded = False
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Connection to the database, opened on first use."""
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=DB_TIMEOUT_SECONDS)
+            # Readers never wait for a daemon or CLI run that is writing
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(f"PRAGMA cache_size=-{DB_CACHE_KIB}")
+        return self._db
+
+    def load(self) -> bool:
+        """Open the database and check its format version.
+
+        Returns:
+            True if a compatible index was found
+        """
+        try:
+            row = self.db.execute(
+                "SELECT value FROM meta WHERE key = 'version'"
+            ).fetchone()
+        except (OSError, sqlite3.Error):
+            return False
+
+        if row is None or row[0] != self.version:
+            return False
+        self.loaded = True
+        return True
+
+    def save(self) -> bool:
+        """Commit the changes made since the last save.
+
+        Returns:
+            True if the changes were written
+        """
+        try:
+            self.db.commit()
+        except (OSError, sqlite3.Error):
+            return False
+        return True
+
+    def clear(self) -> None:
+        """Drop all documents and postings.
+
+        If the database file cannot be written, the index is kept in
+        memory for the lifetime of this object.
+        """
+        script = (
+            f"BEGIN IMMEDIATE;{_SCHEMA}"
+            f"INSERT INTO meta (key, value) VALUES ('version', {self.version:d});"
+            "COMMIT;"
+        )
+        try:
+            self.db.executescript(script)
+        except (OSError, sqlite3.Error):
+            self._db = sqlite3.connect(":memory:")
+            self._db.executescript(script)
+
+    def _write(self) -> sqlite3.Connection:
+        """The connection, inside a write transaction until save().
+
+        The transaction takes the write lock before anything is read, so
+        the documents read back while updating cannot be changed by another
+        process before the update is committed.
+        """
+        if not self.db.in_transaction:
+            self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def remove(self, path: str) -> None:
+        """Remove a document and its postings."""
+        db = self._write()
+        row = db.execute(
+            "SELECT id, terms FROM docs WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return
+        doc, terms = row
+        db.executemany(
+            "DELETE FROM postings WHERE term = ? AND doc = ?",
+            ((term, doc) for term in terms.split()),
+        )
+        db.execute("DELETE FROM docs WHERE id = ?", (doc,))
+
+    def update(
+        self,
+        path: str,
+        positions: dict[str, list[int]],
+        offsets: Optional[list[int]] = None,
+    ) -> None:
+        """Replace the postings of a document.
+
+        Args:
+            path: Document path
+            positions: Term positions as returned by term_positions()
+            offsets: Token byte offsets as returned by token_offsets()
+        """
+        self.remove(path)
+        length = sum(len(p) for p in positions.values())
+        db = self._write()
+        cursor = db.execute(
+            "INSERT INTO docs (path, length, offsets, terms) VALUES (?, ?, ?, ?)",
+            (path, length, _pack(offsets or []), " ".join(positions)),
+        )
+        doc = cursor.lastrowid
+        db.executemany(
+            "INSERT INTO postings (term, doc, count, positions) VALUES (?, ?, ?, ?)",
+            (
+                (term, doc, len(term_pos), _pack(term_pos))
+                for term, term_pos in positions.items()
+            ),
+        )
+
+    def document_frequency(self, term: str) -> int:
+        """Number of documents containing a term."""
+        row = self.db.execute(
+            "SELECT COUNT(*) FROM postings WHERE term = ?", (term,)
+        ).fetchone()
+        return int(row[0])
+
+    def _term_rows(self, term: str, columns: str) -> sqlite3.Cursor:
+        """Rows of a term's postings joined with their documents."""
+        return self.db.execute(
+            f"SELECT {columns} FROM postings p JOIN docs d ON d.id = p.doc"
+            " WHERE p.term = ?",
+            (term,),
+        )
+
+    def scores(self, paths: Iterable[str], terms: set[str]) -> dict[str, float]:
+        """BM25 scores of indexed documents for a set of query terms.
+
+        Only the postings of the query terms are read.
+
+        Args:
+            paths: Documents to score (unindexed ones score 0)
+            terms: Query terms
+
+        Returns:
+            Path -> score
+        """
+        scores = dict.fromkeys(paths, 0.0)
+        total_docs, total_length = self.db.execute(
+            "SELECT COUNT(*), TOTAL(length) FROM docs"
+        ).fetchone()
+        avg_length = total_length / total_docs if total_docs else 0.0
+
+        for term in terms:
+            rows = self._term_rows(term, "d.path, d.length, p.count").fetchall()
+            if not rows:
+                continue
+            df = len(rows)
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            for path, length, tf in rows:
+                if path not in scores:
+                    continue
+                norm = self.K1
+                if avg_length:
+                    norm *= 1 - self.B + self.B * length / avg_length
+                scores[path] += idf * tf * (self.K1 + 1) / (tf + norm)
+        return scores
+
+    def estimate_clause(self, clause: list[list[str]]) -> int:
+        """Upper bound on the documents a clause can match.
+
+        Args:
+            clause: Alternatives as produced by parse_text_query
+
+        Returns:
+            Sum over alternatives of the rarest term's document frequency
+        """
+        return sum(
+            min(self.document_frequency(term) for term in terms)
+            for terms in clause
+            if terms
+        )
+
+    def _phrase_paths(self, terms: list[str]) -> set[str]:
+        """Paths of documents containing the terms as a consecutive sequence."""
+        if not terms:
+            return set()
+        if len(terms) == 1:
+            return {row[0] for row in self._term_rows(terms[0], "d.path")}
+
+        postings: dict[str, dict[str, bytes]] = {
+            term: dict(self._term_rows(term, "d.path, p.positions"))
+            for term in set(terms)
+        }
+        shortest: dict[str, bytes] = min(postings.values(), key=len)
+        candidates = set(shortest)
+        for term_postings in postings.values():
+            candidates.intersection_update(term_postings)
+
+        matches = set()
+        for path in candidates:
+            first = _unpack(postings[terms[0]][path])
+            later = [set(_unpack(postings[term][path])) for term in terms[1:]]
+            for start in first:
+                if all(start + i + 1 in pos for i, pos in enumerate(later)):
+                    matches.add(path)
+                    break
+        return matches
+
+    def match_clause(self, clause: list[list[str]]) -> set[str]:
+        """Paths of documents matching any alternative of a clause."""
+        paths: set[str] = set()
+        for terms in clause:
+            paths |= self._phrase_paths(terms)
+        return paths
+
+    @staticmethod
+    def _hit_spans(
+        positions: dict[str, list[int]], clauses: list[list[list[str]]]
+    ) -> list[tuple[int, int]]:
+        """(first, last) token positions of every term or phrase occurrence."""
+        spans = set()
+        for clause in clauses:
+            for terms in clause:
+                if not all(t in positions for t in terms):
+                    continue
+                later = [set(positions[term]) for term in terms[1:]]
+                for start in positions[terms[0]]:
+                    if all(start + i + 1 in pos for i, pos in enumerate(later)):
+                        spans.add((start, start + len(terms) - 1))
+        return sorted(spans)
+
+    def snippets(
+        self, path: str, clauses: list[list[list[str]]], count: int
+    ) -> list[dict[str, Any]]:
+        """Highlighted context around the query hits in a document.
+
+        Hits are grouped into windows of SNIPPET_CONTEXT tokens on either
+        side, in document order. Each window is read by seeking to the
+        stored offset of the token stride it starts in, so only a few
+        hundred bytes of the file are read per snippet. Token numbers start
+        after the frontmatter's closing ---, so windows never include
+        metadata; markdown markup between tokens is dropped.
+
+        Args:
+            path: Indexed document path
+            clauses: Query clauses as produced by parse_text_query
+            count: Maximum number of snippets
+
+        Returns:
+            List of {"offset": byte offset, "text": snippet} dictionaries,
+            with hit terms wrapped in HIGHLIGHT marks
+        """
+        row = self.db.execute(
+            "SELECT id, offsets FROM docs WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or count <= 0:
+            return []
+        doc, offsets = row[0], _unpack(row[1])
+        if not offsets:
+            return []
+
+        terms = sorted({t for clause in clauses for alt in clause for t in alt})
+        positions = {
+            term: _unpack(term_pos)
+            for term, term_pos in self.db.execute(
+                "SELECT term, positions FROM postings WHERE doc = ?"
+                f" AND term IN ({', '.join('?' * len(terms))})",
+                (doc, *terms),
+            )
+        }
+
+        windows: list[tuple[int, int, set[int]]] = []
+        for first, last in self._hit_spans(positions, clauses):
+            if windows and first < windows[-1][1]:
+                start, end, hits = windows[-1]
+                windows[-1] = (start, max(end, last + 1 + SNIPPET_CONTEXT), hits)
+            elif len(windows) < count:
+                start = max(first - SNIPPET_CONTEXT, windows[-1][1] if windows else 0)
+                windows.append((start, last + 1 + SNIPPET_CONTEXT, set()))
+            else:
+                break
+            windows[-1][2].update(range(first, last + 1))
+
+        results = []
+        try:
+            with open(path, "rb") as f:
+                for start, end, hits in windows:
+                    snippet = self._read_snippet(f, offsets, start, end, hits)
+                    if snippet is not None:
+                        results.append(snippet)
+        except OSError:
+            return []
+        return results
+
+    @staticmethod
+    def _read_snippet(
+        f: Any, offsets: list[int], start: int, end: int, hits: set[int]
+    ) -> Optional[dict[str, Any]]:
+        """Read tokens [start, end) of a document and highlight the hits."""
+        stride = start // OFFSET_STRIDE
+        begin = offsets[stride]
+        last_stride = (end - 1) // OFFSET_STRIDE + 1
+        size = SNIPPET_MAX_BYTES
+        if last_stride < len(offsets):
+            size = min(offsets[last_stride] - begin, size)
+
+        f.seek(begin)
+        chunk = f.read(size).decode("utf-8", errors="replace")
+
+        parts: list[str] = []
+        snippet_offset: Optional[int] = None
+        previous_end = 0
+        tokens = TOKEN_PATTERN.finditer(chunk)
+        for i, match in enumerate(tokens, stride * OFFSET_STRIDE):
+            if i >= end:
+                break
+            if i < start:
+                previous_end = match.end()
+                continue
+            if snippet_offset is None:
+                snippet_offset = begin + len(chunk[: match.start()].encode("utf-8"))
+            else:
+                gap = chunk[previous_end : match.start()]
+                parts.append(SNIPPET_MARKUP_PATTERN.sub(" ", gap))
+            token = match.group()
+            parts.append(f"{HIGHLIGHT}{token}{HIGHLIGHT}" if i in hits else token)
+            previous_end = match.end()
+
+        if snippet_offset is None:
+            return None
+        return {"offset": snippet_offset, "text": " ".join("".join(parts).split())}
+
+    def score(self, path: str, terms: set[str]) -> float:
+        """BM25 score of an indexed document for a set of query terms."""
+        return self.scores([path], terms)[path]
+
+    def search(
+        self, query: str, limit: Optional[int] = None
+    ) -> list[tuple[str, float]]:
+        """Run a query and rank matching documents by BM25.
+
+        Args:
+            query: Query string (see parse_text_query)
+            limit: Maximum number of results
+
+        Returns:
+            List of (path, score) tuples, best match first
+        """
+        clauses = parse_text_query(query)
+        if not clauses:
+            return []
+
+        # Resolve cheapest clauses first so intersections shrink quickly
+        clauses_by_cost = sorted(clauses, key=self.estimate_clause)
+        matched = self.match_clause(clauses_by_cost[0])
+        for clause in clauses_by_cost[1:]:
+            if not matched:
+                break
+            matched &= self.match_clause(clause)
+
+        query_terms = {term for clause in clauses for terms in clause for term in terms}
+        ranked = sorted(
+            self.scores(matched, query_terms).items(),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return ranked[:limit] if limit is not None else ranked
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+eama_design_fuzzy.py - Trigram index for typo-tolerant design lookups.
+
+This module finds design documents even when a name is misspelled:
+- Each document contributes the words of its title, keywords and headings
+- Words are broken into padded character trigrams (as in pg_trgm)
+- A trigram -> word map finds similar words without scanning the vocabulary
+- Documents are ranked by how well their words match the query words
+
+Similarity between two words is the Jaccard index of their trigram sets,
+so "authetication" still matches "authentication" (about 0.7).
+
+Used by eama_design_index.py to keep the trigram index in sync with the
+design index, and by eama_design_search.py for --fuzzy.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Iterable, Optional
+
+from eama_design_fulltext import tokenize
+from eama_design_storage import write_json
+
+__all__ = [
+    "DEFAULT_THRESHOLD",
+    "trigrams",
+    "similarity",
+    "extract_headings",
+    "document_vocabulary",
+    "TrigramIndex",
+]
+
+# Minimum similarity for a word (and a document) to count as a match
+DEFAULT_THRESHOLD = 0.3
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$")
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+
+
+def trigrams(word: str) -> set[str]:
+    """Padded character trigrams of a lowercase word."""
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the trigram sets of two words."""
+    ta, tb = trigrams(a), trigrams(b)
+    union = len(ta | tb)
+    return len(ta & tb) / union if union else 0.0
+
+
+def extract_headings(content: str) -> list[str]:
+    """Markdown heading texts, skipping fenced code blocks."""
+    headings = []
+    in_fence = False
+    for line in content.splitlines():
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+            continue
+        if in_fence or not line.startswith("#"):
+            continue
+        match = HEADING_PATTERN.match(line)
+        if match:
+            headings.append(match.group(1))
+    return headings
+
+
+def document_vocabulary(
+    title: str, keywords: Iterable[str], headings: Iterable[str]
+) -> list[str]:
+    """Sorted distinct words of a document's title, keywords and headings."""
+    words: set[str] = set(tokenize(title))
+    for text in (*keywords, *headings):
+        words.update(tokenize(text))
+    return sorted(words)
+
+
+class TrigramIndex:
+    """Word vocabulary with a trigram index, mapped to documents."""
+
+    def __init__(self, path: Path, version: int):
+        """Initialize an empty index bound to a JSON file.
+
+        Args:
+            path: Location of the persisted index
+            version: Format version shared with the owning design index
+        """
+        self.path = path
+        self.version = version
+        # path -> words of the document
+        self.docs: dict[str, list[str]] = {}
+        # word -> paths of documents containing it
+        self.words: dict[str, list[str]] = {}
+        # trigram -> words containing it
+        self.grams: dict[str, list[str]] = {}
+        self.loaded = False
+
+    def load(self) -> bool:
+        """Load the index from disk.
+
+        Returns:
+            True if a compatible index was loaded
+        """
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return False
+
+        self.docs = data["docs"]
+        self.grams = data["grams"]
+        self.words = {}
+        for path, words in self.docs.items():
+            for word in words:
+                self.words.setdefault(word, []).append(path)
+        self.loaded = True
+        return True
+
+    def save(self) -> bool:
+        """Write the index to disk atomically.
+
+        Returns:
+            True if the index was written
+        """
+        data = {"version": self.version, "docs": self.docs, "grams": self.grams}
+        return write_json(self.path, data)
+
+    def clear(self) -> None:
+        """Drop all documents, words and trigrams."""
+        self.docs = {}
+        self.words = {}
+        self.grams = {}
+
+    def remove(self, path: str) -> None:
+        """Remove a document; words no longer used anywhere are dropped."""
+        for word in self.docs.pop(path, []):
+            paths = self.words.get(word)
+            if paths is None:
+                continue
+            paths.remove(path)
+            if paths:
+                continue
+            del self.words[word]
+            for gram in trigrams(word):
+                gram_words = self.grams.get(gram)
+                if gram_words is None:
+                    continue
+                gram_words.remove(word)
+                if not gram_words:
+                    del self.grams[gram]
+
+    def update(self, path: str, vocabulary: list[str]) -> None:
+        """Replace the words of a document.
+
+        Args:
+            path: Document path
+            vocabulary: Distinct words as returned by document_vocabulary()
+        """
+        self.remove(path)
+        self.docs[path] = vocabulary
+        for word in vocabulary:
+            paths = self.words.get(word)
+            if paths is not None:
+                paths.append(path)
+                continue
+            self.words[word] = [path]
+            for gram in trigrams(word):
+                self.grams.setdefault(gram, []).append(word)
+
+    def similar_words(self, word: str, threshold: float) -> dict[str, float]:
+        """Indexed words whose similarity to ``word`` reaches the threshold."""
+        query_grams = trigrams(word)
+        shared: dict[str, int] = {}
+        for gram in query_grams:
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        matches = {}
+        for candidate, common in shared.items():
+            score = common / (len(query_grams) + len(trigrams(candidate)) - common)
+            if score >= threshold:
+                matches[candidate] = score
+        return matches
+
+    def search(
+        self,
+        query: str,
+        threshold: float = DEFAULT_THRESHOLD,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, float]]:
+        """Rank documents by similarity to the query words.
+
+        A document scores the mean, over query words, of the best similarity
+        among its own words; documents below the threshold are dropped.
+
+        Args:
+            query: One or more (possibly misspelled) words
+            threshold: Minimum similarity in [0, 1]
+            limit: Maximum number of results
+
+        Returns:
+            List of (path, similarity) tuples, best match first
+        """
+        query_words = list(dict.fromkeys(tokenize(query)))
+        if not query_words:
+            return []
+
+        best: dict[str, list[float]] = {}
+        for i, word in enumerate(query_words):
+            for candidate, score in self.similar_words(word, threshold).items():
+                for path in self.words[candidate]:
+                    scores = best.setdefault(path, [0.0] * len(query_words))
+                    if score > scores[i]:
+                        scores[i] = score
+
+        ranked: list[tuple[str, float]] = []
+        for path, scores in best.items():
+            score = sum(scores) / len(scores)
+            if score >= threshold:
+                ranked.append((path, score))
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit is not None else ranked
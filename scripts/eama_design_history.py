@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+eama_design_history.py - Design document search over git history.
+
+This module reads design documents straight from git objects instead of the
+working tree:
+- The design documents of any revision come from one ``git ls-tree`` call
+- The versions of a document come from one ``git log --raw`` call over the
+  design directories
+- Blob contents are fetched in bulk through ``git cat-file --batch``
+- Parse results are cached by blob SHA in .eama/design-index/blobs.json, so
+  a revision or history query only parses blobs never seen before
+
+Used by eama_design_search.py for --at and --history.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from eama_design_storage import write_json
+
+__all__ = [
+    "BLOB_CACHE_VERSION",
+    "GitError",
+    "Revision",
+    "run_git",
+    "cat_blobs",
+    "BlobCache",
+    "DesignHistory",
+]
+
+# Bump whenever the cached record fields change
+BLOB_CACHE_VERSION = 1
+
+BLOB_CACHE_FILE = "blobs.json"
+
+# Raw diff status letters reported for each version
+CHANGES = {"A": "added", "M": "modified", "T": "modified", "D": "deleted"}
+
+# Builds the metadata record of a document from its path, content and stat
+ParseFunc = Callable[[Path, str, os.stat_result], Optional[dict[str, Any]]]
+
+
+class GitError(Exception):
+    """A git command failed (not a repository, unknown revision, ...)."""
+
+
+@dataclass
+class Revision:
+    """A resolved commit."""
+
+    commit: str
+    date: str
+
+
+def run_git(project_dir: Path, args: list[str], stdin: bytes = b"") -> bytes:
+    """Run git in the project directory and return its stdout.
+
+    Raises:
+        GitError: If git is missing or exits with an error
+    """
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(project_dir), *args],
+            input=stdin,
+            capture_output=True,
+        )
+    except OSError as e:
+        raise GitError(f"git is not available: {e}") from e
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", errors="replace").strip()
+        raise GitError(message or f"git {args[0]} failed")
+    return result.stdout
+
+
+def cat_blobs(project_dir: Path, shas: Iterable[str]) -> dict[str, Optional[bytes]]:
+    """Read blob contents with a single ``git cat-file --batch`` call.
+
+    Args:
+        project_dir: Directory inside a git work tree
+        shas: Blob SHAs (duplicates are read once)
+
+    Returns:
+        Blob SHA -> content, or None for missing objects and non-blobs
+
+    Raises:
+        GitError: If git is missing or fails
+    """
+    wanted = list(dict.fromkeys(shas))
+    if not wanted:
+        return {}
+
+    out = run_git(
+        project_dir,
+        ["cat-file", "--batch"],
+        stdin="".join(f"{sha}\n" for sha in wanted).encode("ascii"),
+    )
+    blobs: dict[str, Optional[bytes]] = {}
+    pos = 0
+    for sha in wanted:
+        header_end = out.index(b"\n", pos)
+        header = out[pos:header_end].split()
+        pos = header_end + 1
+        if len(header) != 3:
+            blobs[sha] = None
+            continue
+        size = int(header[2])
+        blobs[sha] = out[pos : pos + size] if header[1] == b"blob" else None
+        pos += size + 1
+    return blobs
+
+
+class BlobCache:
+    """Parsed records keyed by git blob SHA."""
+
+    def __init__(self, path: Path, version: int = BLOB_CACHE_VERSION):
+        """Initialize an empty cache bound to a JSON file.
+
+        Args:
+            path: Location of the persisted cache
+            version: Format version of the cached records
+        """
+        self.path = path
+        self.version = version
+        # blob SHA -> file name -> record (None for unreadable blobs)
+        self.records: dict[str, dict[str, Optional[dict[str, Any]]]] = {}
+        self.loaded = False
+
+    def load(self) -> bool:
+        """Load records from disk.
+
+        Returns:
+            True if a compatible cache was loaded
+        """
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return False
+
+        self.records = data["records"]
+        self.loaded = True
+        return True
+
+    def save(self) -> bool:
+        """Write records to disk atomically.
+
+        Returns:
+            True if the cache was written
+        """
+        data = {"version": self.version, "records": self.records}
+        return write_json(self.path, data)
+
+    def get(self, sha: str, path: str) -> tuple[bool, Optional[dict[str, Any]]]:
+        """Look up the record of a blob as found at a path.
+
+        Records are kept per file name, since titles fall back to the name.
+
+        Returns:
+            Tuple of (hit, record)
+        """
+        by_name = self.records.get(sha)
+        name = Path(path).name
+        if by_name is None or name not in by_name:
+            return False, None
+        return True, by_name[name]
+
+    def update(self, sha: str, path: str, record: Optional[dict[str, Any]]) -> None:
+        """Store the record of a blob as found at a path."""
+        self.records.setdefault(sha, {})[Path(path).name] = record
+
+
+class DesignHistory:
+    """Design documents of past revisions, read from git objects."""
+
+    def __init__(
+        self,
+        project_dir: Path,
+        pathspecs: list[str],
+        parse: ParseFunc,
+        index_dir: Path,
+        is_excluded: Callable[[str], bool] = lambda rel: False,
+    ):
+        """Bind the history to a project.
+
+        Args:
+            project_dir: Directory inside a git work tree
+            pathspecs: Design directory patterns relative to project_dir
+            parse: Callable building the record of a document
+            index_dir: Directory holding the blob cache
+            is_excluded: Whether a '/' path relative to project_dir is
+                excluded from the design corpus
+        """
+        self.project_dir = project_dir
+        self.pathspecs = pathspecs
+        self.parse = parse
+        self.is_excluded = is_excluded
+        self.cache = BlobCache(index_dir / BLOB_CACHE_FILE)
+        self.parsed = 0
+
+    def _is_design_file(self, rel: str) -> bool:
+        return (
+            rel.endswith(".md")
+            and not any(part.startswith(".") for part in rel.split("/"))
+            and not self.is_excluded(rel)
+        )
+
+    def resolve(self, rev: str) -> Revision:
+        """Resolve a revision to its commit SHA and committer date.
+
+        Raises:
+            GitError: If the revision does not name a commit
+        """
+        out = run_git(
+            self.project_dir, ["show", "-s", "--format=%H%x00%cI", f"{rev}^{{commit}}"]
+        )
+        commit, _, date = out.decode("utf-8").strip().partition("\0")
+        return Revision(commit, date)
+
+    def _load_blobs(self, blobs: Iterable[tuple[str, str]]) -> None:
+        """Parse the blobs missing from the cache with one git cat-file call.
+
+        Args:
+            blobs: (blob SHA, path relative to project_dir) pairs
+        """
+        if not self.cache.loaded:
+            self.cache.load()
+
+        missing: dict[tuple[str, str], str] = {}
+        for sha, rel in blobs:
+            if not self.cache.get(sha, rel)[0]:
+                missing.setdefault((sha, Path(rel).name), rel)
+        if not missing:
+            return
+
+        contents = cat_blobs(self.project_dir, [sha for sha, _ in missing])
+        stat = os.stat_result((0,) * 10)
+        for (sha, _), rel in missing.items():
+            data = contents[sha]
+            if data is None:
+                self.cache.update(sha, rel, None)
+                continue
+
+            try:
+                content = data.decode("utf-8")
+            except UnicodeDecodeError:
+                self.cache.update(sha, rel, None)
+                continue
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+            self.cache.update(sha, rel, self.parse(Path(rel), content, stat))
+            self.parsed += 1
+
+        self.cache.save()
+
+    def _record_at(self, sha: str, rel: str, date: str) -> Optional[dict[str, Any]]:
+        """A cached blob record, placed at a path and dated by its commit."""
+        record = self.cache.get(sha, rel)[1]
+        if record is None:
+            return None
+        path = str(self.project_dir / rel)
+        return {**record, "path": path, "created": date, "modified": date}
+
+    def documents_at(self, revision: Revision) -> list[dict[str, Any]]:
+        """Records of the design documents in a revision, in path order.
+
+        Timestamps are the commit date, since git does not track file times.
+        """
+        out = run_git(
+            self.project_dir,
+            ["ls-tree", "-r", "-z", revision.commit, "--", *self.pathspecs],
+        )
+        blobs = []
+        for item in out.decode("utf-8", errors="surrogateescape").split("\0"):
+            info, _, rel = item.partition("\t")
+            fields = info.split()
+            if len(fields) == 3 and fields[1] == "blob" and self._is_design_file(rel):
+                blobs.append((fields[2], rel))
+
+        self._load_blobs(blobs)
+        records = []
+        for sha, rel in sorted(blobs, key=lambda blob: blob[1]):
+            record = self._record_at(sha, rel, revision.date)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def versions(self, uuid: str) -> list[dict[str, Any]]:
+        """Every committed version of the documents carrying a UUID.
+
+        Args:
+            uuid: Document UUID (case-insensitive)
+
+        Returns:
+            Newest first: the document record plus "commit", "date",
+            "change" (added, modified or deleted) and "blob". A deletion
+            carries the record of the deleted content.
+        """
+        out = run_git(
+            self.project_dir,
+            [
+                "log",
+                "--relative",
+                "--format=%x01%H%x00%cI",
+                "--raw",
+                "-z",
+                "--no-abbrev",
+                "--no-renames",
+                "--",
+                *self.pathspecs,
+            ],
+        )
+
+        # (commit, date, change, blob, path)
+        changes: list[tuple[str, str, str, str, str]] = []
+        text = out.decode("utf-8", errors="surrogateescape")
+        for chunk in text.split("\x01")[1:]:
+            fields = chunk.split("\0")
+            commit, date = fields[0], fields[1]
+            for i in range(2, len(fields) - 1, 2):
+                raw = fields[i].strip().split()
+                rel = fields[i + 1]
+                if len(raw) != 5 or not self._is_design_file(rel):
+                    continue
+                old_sha, new_sha, status = raw[2], raw[3], raw[4][:1]
+                if status not in CHANGES:
+                    continue
+                blob = old_sha if status == "D" else new_sha
+                changes.append((commit, date, CHANGES[status], blob, rel))
+
+        self._load_blobs((blob, rel) for _, _, _, blob, rel in changes)
+        uuid = uuid.lower()
+        versions = []
+        for commit, date, change, blob, rel in changes:
+            record = self._record_at(blob, rel, date)
+            if record is None or (record.get("uuid") or "").lower() != uuid:
+                continue
+            version = {"commit": commit, "date": date, "change": change, "blob": blob}
+            versions.append({**record, **version})
+        return versions
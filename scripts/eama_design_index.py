@@ -0,0 +1,898 @@
+#!/usr/bin/env python3
+"""
+eama_design_index.py - Persistent incremental index for EAMA design documents.
+
+This module caches parsed design document metadata on disk so repeated
+searches only pay for what changed since the last scan:
+- Entries are keyed by path and validated against mtime, size and inode,
+  or optionally against git blob SHAs, so clean tracked files are not even
+  stat()ed
+- New or changed files are reparsed, deleted files are dropped
+- Derived tables (full-text postings, trigrams, references, signatures,
+  term vectors) are brought up to date lazily, on first use, and never
+  loaded by metadata-only queries. A shared manifest records the file version (stat key) every
+  document was last analyzed at; a document changed since is read and
+  tokenized once, and that one analysis updates every table built so far
+- Full-text postings (with token byte offsets for snippets) are kept in
+  SQLite by term, so a query reads only its own terms' postings
+- Changed files can be parsed over a process pool (see map_parallel)
+- A sorted UUID table answers prefix lookups and reports duplicate UUIDs
+- A trigram index over titles, keywords and headings serves fuzzy lookups
+- A GUUID reference graph answers which documents reference which
+- MinHash signatures find near-duplicate documents
+- TF-IDF term vectors, with their normalized weights cached in SQLite,
+  recommend related documents
+- The index is written atomically and rebuilt when the format version changes
+
+Used by eama_design_search.py for scanning.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Protocol, TypeVar
+
+from eama_design_fulltext import (
+    FullTextIndex,
+    body_start,
+    positions_of,
+    token_offsets,
+    tokenize,
+)
+from eama_design_fuzzy import (
+    DEFAULT_THRESHOLD,
+    TrigramIndex,
+    document_vocabulary,
+    extract_headings,
+)
+from eama_design_minhash import (
+    DEFAULT_DUPLICATE_THRESHOLD,
+    SignatureTable,
+    minhash_signature,
+)
+from eama_design_query import DocumentBitmaps
+from eama_design_refs import ReferenceGraph, extract_references
+from eama_design_related import DEFAULT_RELATED_LIMIT, TermVectors, topic_counts
+from eama_design_storage import write_json
+
+__all__ = [
+    "INDEX_VERSION",
+    "DEFAULT_INDEX_DIR",
+    "RefreshStats",
+    "DerivedTable",
+    "DERIVED_TABLES",
+    "UuidTable",
+    "DesignIndex",
+    "ParseFunc",
+    "stat_key",
+    "git_blob_shas",
+    "read_record",
+    "analyze_document",
+    "map_parallel",
+    "PARALLEL_MIN_FILES",
+]
+
+# Bump whenever the on-disk layout or the parsed record fields change
+INDEX_VERSION = 14
+
+# Index location relative to the project directory
+DEFAULT_INDEX_DIR = Path(".eama") / "design-index"
+
+DOCUMENTS_FILE = "documents.json"
+FULLTEXT_FILE = "fulltext.db"
+UUID_TABLE_FILE = "uuids.json"
+FUZZY_FILE = "trigrams.json"
+REFERENCES_FILE = "references.json"
+SIGNATURES_FILE = "signatures.json"
+VECTORS_FILE = "vectors.db"
+DERIVED_FILE = "derived.json"
+
+# Files and directories of earlier layouts, removed when the index is rebuilt
+STALE_FILES = ("fulltext.json", "fulltext", "vectors.json")
+
+# Below this many files a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 200
+
+# Upper bound on files handed to a worker per task
+PARALLEL_CHUNK_SIZE = 64
+
+# Builds the index record of a document from its path, content and stat
+ParseFunc = Callable[[Path, str, os.stat_result], Optional[dict[str, Any]]]
+
+T = TypeVar("T")
+
+# Derived tables, in the order they are brought up to date
+DERIVED_TABLES = ("fulltext", "fuzzy", "references", "signatures", "vectors")
+
+
+@dataclass
+class RefreshStats:
+    """Counters describing one incremental refresh of the index."""
+
+    mode: str
+    parsed: int = 0
+    reused: int = 0
+    removed: int = 0
+    seconds: float = 0.0
+    # Reused on a matching git blob SHA, without a stat() call
+    git_reused: int = 0
+
+
+class DerivedTable(Protocol):
+    """A table derived per document from the file contents."""
+
+    loaded: bool
+
+    def load(self) -> bool: ...
+
+    def save(self) -> bool: ...
+
+    def clear(self) -> None: ...
+
+    def remove(self, path: str) -> None: ...
+
+    @property
+    def update(self) -> Callable[..., None]: ...
+
+
+def stat_key(st: os.stat_result) -> list[int]:
+    """Build the change-detection key stored for each indexed file."""
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+def git_blob_shas(
+    project_dir: Path, pathspecs: Iterable[str] = ()
+) -> Optional[dict[str, str]]:
+    """Blob SHAs of tracked files whose working copy matches the git index.
+
+    One ``git ls-files --stage --modified -t`` call lists every tracked file
+    with its staged blob and repeats the modified ones with a ``C`` tag;
+    git answers from its own stat cache (or fsmonitor). Modified, unmerged
+    and symlinked files are left out, as are untracked ones, so callers
+    fall back to stat checks for them.
+
+    Args:
+        project_dir: Directory inside a git work tree
+        pathspecs: Paths relative to project_dir to limit the listing to
+
+    Returns:
+        Path (joined to project_dir) -> blob SHA, or None if git is not
+        available or project_dir is not in a work tree
+    """
+    try:
+        result = subprocess.run(
+            ["git", "--literal-pathspecs", "-C", str(project_dir)]
+            + ["ls-files", "-z", "-s", "-m", "-t"]
+            + ["--", *pathspecs],
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    base = str(project_dir)
+    blobs: dict[str, str] = {}
+    dirty: set[str] = set()
+    for item in result.stdout.decode("utf-8", errors="surrogateescape").split("\0"):
+        info, _, rel = item.partition("\t")
+        fields = info.split()
+        if len(fields) != 4:
+            continue
+        tag, mode, sha, stage = fields
+        path = os.path.join(base, rel)
+        if tag == "C" or stage != "0" or mode not in ("100644", "100755"):
+            dirty.add(path)
+        else:
+            blobs[path] = sha
+    for path in dirty:
+        blobs.pop(path, None)
+    return blobs
+
+
+def _read_document(file_path: Path) -> Optional[tuple[str, str]]:
+    """Content of a document with its original and with normalized newlines."""
+    try:
+        raw = file_path.read_bytes().decode("utf-8")
+    except (OSError, UnicodeDecodeError):
+        return None
+    return raw, raw.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def read_record(
+    file_path: Path, st: os.stat_result, parse: ParseFunc
+) -> Optional[dict[str, Any]]:
+    """Read a document and build its metadata record.
+
+    Args:
+        file_path: Document to read
+        st: Stat result of the document
+        parse: Callable building the metadata record
+
+    Returns:
+        The record, or None if the file is unreadable or not a design document
+    """
+    document = _read_document(file_path)
+    if document is None:
+        return None
+    # Parsing sees the same newline-translated text as read_text()
+    return parse(file_path, document[1], st)
+
+
+def analyze_document(
+    file_path: Path, record: Optional[dict[str, Any]], tables: Iterable[str]
+) -> dict[str, tuple[Any, ...]]:
+    """Read a document once and build the update() arguments of derived tables.
+
+    Args:
+        file_path: Document to analyze
+        record: Its metadata record (None if it is not a design document;
+            only the full-text postings cover such files)
+        tables: Names of the tables to build arguments for (DERIVED_TABLES)
+
+    Returns:
+        Table name -> update() arguments after the path; tables with nothing
+        for the document are left out
+    """
+    document = _read_document(file_path)
+    if document is None:
+        return {}
+    raw, content = document
+    tables = set(tables)
+    analysis: dict[str, tuple[Any, ...]] = {}
+
+    # Only the body is indexed for full-text search. Byte offsets need the
+    # original line endings, and tokens never span lines, so the raw text
+    # tokenizes like the normalized content
+    body = body_start(raw)
+    body_terms = tokenize(raw[body:])
+    positions = positions_of(body_terms)
+    if "fulltext" in tables:
+        analysis["fulltext"] = (positions, token_offsets(raw, body))
+    if record is None:
+        return analysis
+
+    if "fuzzy" in tables:
+        headings = extract_headings(content)
+        analysis["fuzzy"] = (
+            document_vocabulary(record["title"], record["keywords"], headings),
+        )
+    if "references" in tables:
+        analysis["references"] = (extract_references(content, record.get("uuid")),)
+    if "signatures" in tables:
+        signature = minhash_signature(tokenize(raw[:body]) + body_terms)
+        if signature is not None:
+            analysis["signatures"] = (signature,)
+    if "vectors" in tables:
+        counts = topic_counts(positions)
+        if counts:
+            analysis["vectors"] = (counts,)
+    return analysis
+
+
+def map_parallel(
+    func: Callable[..., T], *iterables: list[Any], jobs: int = 1
+) -> list[T]:
+    """Apply func across the iterables, in processes when it pays off.
+
+    Work is split into chunks over a process pool when ``jobs`` > 1 and
+    there are at least PARALLEL_MIN_FILES items; otherwise (or if a pool
+    cannot be started) it runs serially. Results keep the input order.
+
+    Args:
+        func: Picklable module-level function
+        iterables: Equal-length argument lists, as for map()
+        jobs: Worker processes to use (0 means one per CPU)
+
+    Returns:
+        Results in input order
+    """
+    count = len(iterables[0]) if iterables else 0
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs > 1 and count >= PARALLEL_MIN_FILES:
+        chunksize = max(1, min(PARALLEL_CHUNK_SIZE, count // (jobs * 4)))
+        try:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                return list(pool.map(func, *iterables, chunksize=chunksize))
+        except (OSError, BrokenProcessPool):
+            pass
+
+    return list(map(func, *iterables))
+
+
+class UuidTable:
+    """Sorted (uuid, path) table supporting O(log n + k) prefix lookups."""
+
+    def __init__(self, path: Path, version: int):
+        """Initialize an empty table bound to a JSON file.
+
+        Args:
+            path: Location of the persisted table
+            version: Format version shared with the owning design index
+        """
+        self.path = path
+        self.version = version
+        # Parallel sorted lists: lowercase uuids and the paths carrying them
+        self.keys: list[str] = []
+        self.paths: list[str] = []
+        # uuid -> every path carrying it, for uuids used more than once
+        self.duplicates: dict[str, list[str]] = {}
+        self.loaded = False
+
+    def load(self) -> bool:
+        """Load the table from disk.
+
+        Returns:
+            True if a compatible table was loaded
+        """
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return False
+
+        self.keys = data["keys"]
+        self.paths = data["paths"]
+        self.duplicates = data["duplicates"]
+        self.loaded = True
+        return True
+
+    def save(self) -> bool:
+        """Write the table to disk atomically.
+
+        Returns:
+            True if the table was written
+        """
+        data = {
+            "version": self.version,
+            "keys": self.keys,
+            "paths": self.paths,
+            "duplicates": self.duplicates,
+        }
+        return write_json(self.path, data)
+
+    def build(self, records: Iterable[dict[str, Any]]) -> None:
+        """Rebuild the table from index records, collecting duplicate UUIDs."""
+        rows = sorted(
+            (record["uuid"].lower(), record["path"], record["uuid"])
+            for record in records
+            if record.get("uuid")
+        )
+        self.keys = [row[0] for row in rows]
+        self.paths = [row[1] for row in rows]
+
+        # Equal keys are adjacent once sorted
+        self.duplicates = {}
+        for prev, row in zip(rows, rows[1:]):
+            if row[0] == prev[0]:
+                self.duplicates.setdefault(prev[2], [prev[1]]).append(row[1])
+        self.loaded = True
+
+    def prefix(self, query: str) -> list[str]:
+        """Paths of documents whose UUID starts with query (case-insensitive)."""
+        query = query.lower()
+        start = bisect.bisect_left(self.keys, query)
+        matches = []
+        for i in range(start, len(self.keys)):
+            if not self.keys[i].startswith(query):
+                break
+            matches.append(self.paths[i])
+        return matches
+
+    def exact(self, query: str) -> list[str]:
+        """Paths of documents whose UUID equals query (case-insensitive)."""
+        query = query.lower()
+        start = bisect.bisect_left(self.keys, query)
+        end = bisect.bisect_right(self.keys, query, lo=start)
+        return self.paths[start:end]
+
+    def substring(self, query: str) -> list[str]:
+        """Paths of documents whose UUID contains query (linear scan)."""
+        query = query.lower()
+        return [path for key, path in zip(self.keys, self.paths) if query in key]
+
+
+class DesignIndex:
+    """On-disk cache of parsed design document records keyed by path."""
+
+    def __init__(self, project_dir: Path, index_dir: Optional[Path] = None):
+        """Initialize the index for a project.
+
+        Args:
+            project_dir: Project root the design directories live in
+            index_dir: Override for the index directory (default: .eama/design-index)
+        """
+        self.project_dir = project_dir
+        self.index_dir = index_dir or project_dir / DEFAULT_INDEX_DIR
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.fulltext = FullTextIndex(self.index_dir / FULLTEXT_FILE, INDEX_VERSION)
+        self.uuids = UuidTable(self.index_dir / UUID_TABLE_FILE, INDEX_VERSION)
+        self.fuzzy = TrigramIndex(self.index_dir / FUZZY_FILE, INDEX_VERSION)
+        self.references = ReferenceGraph(
+            self.index_dir / REFERENCES_FILE, INDEX_VERSION
+        )
+        self.signatures = SignatureTable(
+            self.index_dir / SIGNATURES_FILE, INDEX_VERSION
+        )
+        self.vectors = TermVectors(self.index_dir / VECTORS_FILE, INDEX_VERSION)
+        self.tables: dict[str, DerivedTable] = {
+            "fulltext": self.fulltext,
+            "fuzzy": self.fuzzy,
+            "references": self.references,
+            "signatures": self.signatures,
+            "vectors": self.vectors,
+        }
+        self.loaded = False
+        self.last_refresh: Optional[RefreshStats] = None
+        # Worker processes for analyzing documents (set by refresh)
+        self.jobs = 1
+        # Derived tables built so far and their shared stamps (see _synced)
+        self._derived: Optional[tuple[set[str], dict[str, list[int]]]] = None
+        # Query bitmaps and the design directories they were built for
+        self._bitmaps: Optional[tuple[tuple[str, ...], DocumentBitmaps]] = None
+
+    @property
+    def documents_path(self) -> Path:
+        return self.index_dir / DOCUMENTS_FILE
+
+    def load(self) -> bool:
+        """Load entries from disk.
+
+        Returns:
+            True if a compatible index was loaded, False if it must be rebuilt
+        """
+        try:
+            data = json.loads(self.documents_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return False
+
+        entries = data.get("entries")
+        if not isinstance(entries, dict):
+            return False
+
+        # Without the UUID table nothing can be reused
+        if not self.uuids.path.exists():
+            return False
+
+        self.entries = entries
+        self.loaded = True
+        self._bitmaps = None
+        return True
+
+    def save(self) -> bool:
+        """Write entries and the UUID table to disk atomically.
+
+        Derived tables are written when they are brought up to date. The
+        index is only a cache, so failures are reported but never fatal.
+
+        Returns:
+            True if the index was written
+        """
+        if self.uuids.loaded and not self.uuids.save():
+            return False
+
+        data = {"version": INDEX_VERSION, "entries": self.entries}
+        return write_json(self.documents_path, data)
+
+    @property
+    def derived_path(self) -> Path:
+        return self.index_dir / DERIVED_FILE
+
+    def _load_derived(self) -> tuple[set[str], dict[str, list[int]]]:
+        """Names of the derived tables built so far and their shared stamps.
+
+        The stamps map every analyzed path to the stat key of the file
+        version all built tables hold for it. They are read from disk once;
+        afterwards they describe the tables this index holds in memory.
+        """
+        if self._derived is not None:
+            return set(self._derived[0]), self._derived[1]
+        try:
+            data = json.loads(self.derived_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return set(), {}
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return set(), {}
+        self._derived = (set(data["tables"]), data["stamps"])
+        return set(self._derived[0]), self._derived[1]
+
+    def _synced(self, name: str) -> Any:
+        """Return a derived table, with every built table brought up to date.
+
+        Documents whose stat key differs from the shared stamp are read and
+        analyzed once, and the analysis updates every table built so far;
+        documents no longer indexed are dropped from them. A table used for
+        the first time (or that cannot be loaded) is built from every
+        document in the same pass. Tables are saved before the stamps, so
+        a failed write only means documents are analyzed again.
+
+        Args:
+            name: Table to return (one of DERIVED_TABLES)
+        """
+        table = self.tables[name]
+        built, stamps = self._load_derived()
+        if not table.loaded:
+            if name not in built or not table.load():
+                table.clear()
+                table.loaded = True
+                built.discard(name)
+
+        stale = [
+            key
+            for key, entry in self.entries.items()
+            if stamps.get(key) != entry["stat"]
+        ]
+        removed = [key for key in stamps if key not in self.entries]
+        if name in built and not stale and not removed:
+            return table
+
+        # Other tables are only kept up to date once built
+        current: list[str] = []
+        for other in DERIVED_TABLES:
+            if other == name or other not in built:
+                continue
+            other_table = self.tables[other]
+            if other_table.loaded or other_table.load():
+                current.append(other)
+            else:
+                built.discard(other)
+
+        keys = stale
+        wanted = [current + [name]] * len(stale)
+        if name not in built:
+            stale_keys = set(stale)
+            keys = list(self.entries)
+            wanted = [current + [name] if key in stale_keys else [name] for key in keys]
+        current.append(name)
+
+        records = [self.entries[key]["record"] for key in keys]
+        analyzed = map_parallel(
+            analyze_document,
+            [Path(key) for key in keys],
+            records,
+            wanted,
+            jobs=self.jobs,
+        )
+        for table_name in current:
+            derived = self.tables[table_name]
+            for key in removed:
+                derived.remove(key)
+        for key, analysis, names in zip(keys, analyzed, wanted):
+            for table_name in names:
+                derived = self.tables[table_name]
+                derived.remove(key)
+                args = analysis.get(table_name)
+                if args is not None:
+                    derived.update(key, *args)
+
+        built = {table_name for table_name in current if self.tables[table_name].save()}
+        stamps = {key: entry["stat"] for key, entry in self.entries.items()}
+        self._derived = (built, stamps)
+        data = {"version": INDEX_VERSION, "tables": sorted(built), "stamps": stamps}
+        write_json(self.derived_path, data)
+        return table
+
+    def refresh(
+        self,
+        files: Iterable[Path],
+        parse: ParseFunc,
+        jobs: int = 1,
+        blobs: Optional[dict[str, str]] = None,
+    ) -> RefreshStats:
+        """Bring the index in line with the given set of files.
+
+        Files whose mtime, size and inode match the stored entry are reused,
+        everything else is read once and passed to ``parse``. Entries for
+        files that are no longer present are dropped. Files listed in
+        ``blobs`` are reused without a stat() when their entry was built from
+        the same blob. Only the entries and the UUID table are updated; the
+        derived tables catch up when a query first uses them.
+
+        Args:
+            files: Every design document currently on disk
+            parse: Callable building the record for a file, or None if unusable
+            jobs: Worker processes for parsing changed files, and later for
+                analyzing them for the derived tables (see map_parallel)
+            blobs: Blob SHAs of clean tracked files, from git_blob_shas()
+
+        Returns:
+            RefreshStats for this refresh
+        """
+        start = time.perf_counter()
+        files = list(files)
+
+        if not self.loaded:
+            self.load()
+        stats = RefreshStats(mode="warm" if self.loaded else "cold")
+
+        fresh: dict[str, dict[str, Any]] = {}
+        changed: list[Path] = []
+        changed_stats: list[os.stat_result] = []
+        for file_path in files:
+            key = str(file_path)
+            if key in fresh:
+                continue
+
+            entry = self.entries.get(key)
+            blob = blobs.get(key) if blobs else None
+            if blob is not None and entry is not None and entry.get("blob") == blob:
+                fresh[key] = entry
+                stats.reused += 1
+                stats.git_reused += 1
+                continue
+
+            try:
+                st = file_path.stat()
+            except OSError:
+                continue
+
+            current = stat_key(st)
+            if entry is not None and entry.get("stat") == current:
+                # Unchanged since parsed, so a clean file's entry is that blob
+                if blob and entry.get("blob") != blob:
+                    entry = {**entry, "blob": blob}
+                fresh[key] = entry
+                stats.reused += 1
+                continue
+
+            # Placeholder keeps the stable file order; filled in below
+            fresh[key] = {"stat": current, "record": None}
+            if blob:
+                fresh[key]["blob"] = blob
+            changed.append(file_path)
+            changed_stats.append(st)
+
+        self.jobs = jobs
+        parsed = map_parallel(
+            read_record, changed, changed_stats, [parse] * len(changed), jobs=jobs
+        )
+        for file_path, record in zip(changed, parsed):
+            # Unreadable files keep a None record so they are not retried
+            # until they change on disk
+            fresh[str(file_path)]["record"] = record
+        stats.parsed = len(changed)
+
+        removed = [key for key in self.entries if key not in fresh]
+        stats.removed = len(removed)
+
+        if stats.mode == "cold":
+            for name in STALE_FILES:
+                stale_path = self.index_dir / name
+                if stale_path.is_dir():
+                    shutil.rmtree(stale_path, ignore_errors=True)
+                    continue
+                try:
+                    stale_path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+        upgraded = any(fresh[key] is not self.entries.get(key) for key in fresh)
+        self.entries = fresh
+        if stats.parsed or stats.removed or stats.mode == "cold" or upgraded:
+            self.uuids.build(self.records())
+            self._bitmaps = None
+            self.save()
+        self.loaded = True
+
+        stats.seconds = time.perf_counter() - start
+        self.last_refresh = stats
+        return stats
+
+    def search_text(self, query: str) -> list[tuple[str, float]]:
+        """Run a full-text query against the postings.
+
+        Args:
+            query: Query string with AND/OR clauses and quoted phrases
+
+        Returns:
+            List of (path, BM25 score) tuples, best match first
+        """
+        return self.load_fulltext().search(query)
+
+    def load_fulltext(self) -> FullTextIndex:
+        """Return the full-text postings, brought up to date if needed."""
+        return self._synced("fulltext")
+
+    def search_fuzzy(
+        self, query: str, threshold: float = DEFAULT_THRESHOLD
+    ) -> list[tuple[str, float]]:
+        """Find documents whose title, keywords or headings resemble query.
+
+        Args:
+            query: One or more (possibly misspelled) words
+            threshold: Minimum trigram similarity in [0, 1]
+
+        Returns:
+            List of (path, similarity) tuples, best match first
+        """
+        fuzzy: TrigramIndex = self._synced("fuzzy")
+        return fuzzy.search(query, threshold)
+
+    def load_references(self) -> ReferenceGraph:
+        """Return the reference graph, brought up to date if needed."""
+        return self._synced("references")
+
+    def _uuid_of(self, path: str) -> Optional[str]:
+        record = self.record(path)
+        return record["uuid"].upper() if record and record.get("uuid") else None
+
+    def references_to(self, guuid: str, transitive: bool = False) -> dict[str, int]:
+        """Documents that reference a GUUID, directly or through other documents.
+
+        Args:
+            guuid: GUUID being referenced
+            transitive: Also follow references to the referencing documents
+
+        Returns:
+            Path -> hop count (1 for direct references), nearest first; the
+            documents carrying the GUUID itself are never included
+        """
+        graph = self.load_references()
+        owners = set(self.load_uuids().exact(guuid))
+        depths: dict[str, int] = {}
+        seen = {guuid.upper()}
+        frontier = [guuid.upper()]
+        depth = 1
+        while frontier:
+            found = [
+                path
+                for path in graph.referencing(frontier)
+                if path not in depths and path not in owners
+            ]
+            for path in found:
+                depths[path] = depth
+            if not transitive:
+                break
+            frontier = []
+            for path in found:
+                uuid = self._uuid_of(path)
+                if uuid and uuid not in seen:
+                    seen.add(uuid)
+                    frontier.append(uuid)
+            depth += 1
+        return depths
+
+    def referenced_by(self, guuid: str, transitive: bool = False) -> dict[str, int]:
+        """Documents referenced by the document(s) carrying a GUUID.
+
+        Args:
+            guuid: GUUID of the referencing document
+            transitive: Also follow the references of referenced documents
+
+        Returns:
+            Path -> hop count (1 for direct references), nearest first;
+            references to GUUIDs no document carries are skipped
+        """
+        graph = self.load_references()
+        uuids = self.load_uuids()
+        frontier = uuids.exact(guuid)
+        seen = set(frontier)
+        depths: dict[str, int] = {}
+        depth = 1
+        while frontier:
+            found = []
+            for ref in sorted({r for p in frontier for r in graph.references_of(p)}):
+                for path in uuids.exact(ref):
+                    if path not in seen:
+                        seen.add(path)
+                        depths[path] = depth
+                        found.append(path)
+            if not transitive:
+                break
+            frontier = found
+            depth += 1
+        return depths
+
+    def duplicate_clusters(
+        self,
+        paths: Optional[Iterable[str]] = None,
+        threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+    ) -> list[list[tuple[str, float]]]:
+        """Group near-duplicate documents by their MinHash signatures.
+
+        Args:
+            paths: Documents to consider (default: every indexed document)
+            threshold: Minimum estimated Jaccard similarity
+
+        Returns:
+            Clusters of (path, similarity to the cluster's first path)
+        """
+        signatures: SignatureTable = self._synced("signatures")
+        return signatures.clusters(paths, threshold)
+
+    def related(
+        self,
+        paths: list[str],
+        limit: Optional[int] = DEFAULT_RELATED_LIMIT,
+    ) -> list[tuple[str, float]]:
+        """Documents most similar to a document by TF-IDF cosine similarity.
+
+        Args:
+            paths: The document, first, and any others carrying the same
+                UUID (left out of the results)
+            limit: Maximum number of results (None for all)
+
+        Returns:
+            List of (path, similarity) tuples, most similar first
+        """
+        if not paths:
+            return []
+        vectors: TermVectors = self._synced("vectors")
+        return vectors.related(paths[0], limit, exclude=set(paths[1:]))
+
+    def lookup_uuid(self, query: str, substring: bool = False) -> list[str]:
+        """Find documents by UUID through the sorted UUID table.
+
+        Args:
+            query: UUID or UUID prefix
+            substring: Match anywhere in the UUID instead (linear scan)
+
+        Returns:
+            Paths of matching documents in UUID order
+        """
+        uuids = self.load_uuids()
+        if substring:
+            return uuids.substring(query)
+        return uuids.prefix(query)
+
+    def duplicate_uuids(self) -> dict[str, list[str]]:
+        """UUIDs carried by more than one document, with their paths."""
+        return self.load_uuids().duplicates
+
+    def load_uuids(self) -> UuidTable:
+        """Return the UUID table, loading it from disk if needed."""
+        if not self.uuids.loaded:
+            self.uuids.load()
+        return self.uuids
+
+    def record(self, path: str) -> Optional[dict[str, Any]]:
+        """Return the parsed record of an indexed document, if readable."""
+        entry = self.entries.get(path)
+        return entry.get("record") if entry else None
+
+    def records(self) -> Iterator[dict[str, Any]]:
+        """Yield the parsed records of all readable indexed documents.
+
+        Records are yielded straight from the entries, without a copy. The
+        entries themselves (one decoded JSON object per document) stay in
+        memory for as long as the index is loaded.
+        """
+        for entry in self.entries.values():
+            record = entry.get("record")
+            if record is not None:
+                yield record
+
+    def record_count(self) -> int:
+        """Number of readable indexed documents."""
+        return sum(
+            1 for entry in self.entries.values() if entry.get("record") is not None
+        )
+
+    def bitmaps(self, design_dirs: list[str]) -> DocumentBitmaps:
+        """Return the query bitmaps over the records, built once per refresh.
+
+        A long-running daemon answers every structured query from the same
+        bitmaps until a refresh changes the records.
+
+        Args:
+            design_dirs: Design directory paths, used to derive type folders
+        """
+        key = tuple(design_dirs)
+        if self._bitmaps is None or self._bitmaps[0] != key:
+            self._bitmaps = (key, DocumentBitmaps(list(self.records()), design_dirs))
+        return self._bitmaps[1]
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+eama_design_minhash.py - Near-duplicate detection for EAMA design documents.
+
+Copy-pasted documents that drift apart are found without comparing every
+pair of documents:
+- Each document is reduced to overlapping word shingles
+- A MinHash signature (one-permutation hashing with rotation densification)
+  estimates the Jaccard similarity of two shingle sets
+- LSH banding puts documents sharing any band of their signature into the
+  same bucket; only documents sharing a bucket are compared
+- Similar pairs are merged into clusters with union-find
+
+Signatures are stored base64-encoded, keyed by path, so the design index
+can persist them and only rehash changed files.
+
+Used by eama_design_index.py and eama_design_search.py (--duplicates).
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import struct
+from pathlib import Path
+from typing import Iterable, Optional
+
+from eama_design_storage import write_json
+
+__all__ = [
+    "NUM_BINS",
+    "BANDS",
+    "SHINGLE_SIZE",
+    "DEFAULT_DUPLICATE_THRESHOLD",
+    "minhash_signature",
+    "decode_signature",
+    "estimate_similarity",
+    "SignatureTable",
+]
+
+# Signature length; bins are split into BANDS bands of ROWS values each.
+# 16 bands of 4 rows make documents with similarity 0.5 candidates half of
+# the time, and those with 0.8 practically always.
+NUM_BINS = 64
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+
+# Words per shingle
+SHINGLE_SIZE = 4
+
+# Estimated Jaccard similarity at which two documents count as duplicates
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+
+# Bin values keep 24 hash bits; densified bins add their rotation distance
+# above that, so every value fits in 32 bits
+VALUE_BITS = 24
+VALUE_MASK = (1 << VALUE_BITS) - 1
+
+SIGNATURE_FORMAT = struct.Struct(f"<{NUM_BINS}I")
+
+
+def _shingle_hashes(tokens: list[str]) -> set[int]:
+    """64-bit hashes of the document's word shingles."""
+    if not tokens:
+        return set()
+    count = max(1, len(tokens) - SHINGLE_SIZE + 1)
+    return {
+        int.from_bytes(
+            hashlib.blake2b(
+                " ".join(tokens[i : i + SHINGLE_SIZE]).encode("utf-8"), digest_size=8
+            ).digest(),
+            "little",
+        )
+        for i in range(count)
+    }
+
+
+def minhash_signature(tokens: list[str]) -> Optional[str]:
+    """Encoded MinHash signature of a token sequence.
+
+    One hash per shingle picks the bin (low bits) and the value (next bits);
+    each bin keeps its minimum. Empty bins borrow the value of the next
+    non-empty bin to the right, offset by the distance, so short documents
+    still get comparable signatures.
+
+    Args:
+        tokens: Document terms in order (see eama_design_fulltext.tokenize)
+
+    Returns:
+        Base64 signature, or None for documents without any words
+    """
+    hashes = _shingle_hashes(tokens)
+    if not hashes:
+        return None
+
+    empty = VALUE_MASK + 1
+    bins = [empty] * NUM_BINS
+    for h in hashes:
+        b = h % NUM_BINS
+        value = (h // NUM_BINS) & VALUE_MASK
+        if value < bins[b]:
+            bins[b] = value
+
+    signature = list(bins)
+    for b in range(NUM_BINS):
+        if bins[b] != empty:
+            continue
+        for step in range(1, NUM_BINS):
+            donor = bins[(b + step) % NUM_BINS]
+            if donor != empty:
+                signature[b] = donor + (step << VALUE_BITS)
+                break
+
+    return base64.b64encode(SIGNATURE_FORMAT.pack(*signature)).decode("ascii")
+
+
+def decode_signature(encoded: str) -> tuple[int, ...]:
+    """Bin values of an encoded signature."""
+    return SIGNATURE_FORMAT.unpack(base64.b64decode(encoded))
+
+
+def estimate_similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity: the fraction of equal bins."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_BINS
+
+
+class SignatureTable:
+    """MinHash signatures keyed by document path, with LSH clustering."""
+
+    def __init__(self, path: Path, version: int):
+        """Initialize an empty table bound to a JSON file.
+
+        Args:
+            path: Location of the persisted signatures
+            version: Format version shared with the owning design index
+        """
+        self.path = path
+        self.version = version
+        # path -> base64 signature
+        self.signatures: dict[str, str] = {}
+        self.loaded = False
+
+    def load(self) -> bool:
+        """Load signatures from disk.
+
+        Returns:
+            True if a compatible table was loaded
+        """
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != self.version
+            or data.get("bins") != NUM_BINS
+            or data.get("shingle_size") != SHINGLE_SIZE
+        ):
+            return False
+
+        self.signatures = data["signatures"]
+        self.loaded = True
+        return True
+
+    def save(self) -> bool:
+        """Write signatures to disk atomically.
+
+        Returns:
+            True if the table was written
+        """
+        data = {
+            "version": self.version,
+            "bins": NUM_BINS,
+            "shingle_size": SHINGLE_SIZE,
+            "signatures": self.signatures,
+        }
+        return write_json(self.path, data)
+
+    def clear(self) -> None:
+        """Drop all signatures."""
+        self.signatures = {}
+
+    def remove(self, path: str) -> None:
+        """Drop a document's signature."""
+        self.signatures.pop(path, None)
+
+    def update(self, path: str, signature: str) -> None:
+        """Store a document's signature."""
+        self.signatures[path] = signature
+
+    def clusters(
+        self,
+        paths: Optional[Iterable[str]] = None,
+        threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+    ) -> list[list[tuple[str, float]]]:
+        """Group near-duplicate documents.
+
+        Documents sharing an LSH bucket are compared with the documents
+        already grouped from that bucket, so a bucket full of copies of one
+        template costs a linear number of comparisons.
+
+        Args:
+            paths: Documents to consider (default: all with a signature)
+            threshold: Minimum estimated Jaccard similarity
+
+        Returns:
+            Clusters of two or more documents, largest first. Each lists
+            (path, similarity to the cluster's first path) in path order.
+        """
+        candidates = sorted(self.signatures if paths is None else paths)
+        signatures = {
+            path: decode_signature(self.signatures[path])
+            for path in candidates
+            if path in self.signatures
+        }
+
+        buckets: dict[tuple[int, tuple[int, ...]], list[str]] = {}
+        for path, signature in signatures.items():
+            for band in range(BANDS):
+                key = (band, signature[band * ROWS : (band + 1) * ROWS])
+                buckets.setdefault(key, []).append(path)
+
+        parent: dict[str, str] = {}
+
+        def find(path: str) -> str:
+            root = path
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while path != root:
+                parent[path], path = root, parent[path]
+            return root
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            groups = [members[0]]
+            for path in members[1:]:
+                for other in groups:
+                    if find(path) == find(other):
+                        break
+                    similarity = estimate_similarity(
+                        signatures[path], signatures[other]
+                    )
+                    if similarity >= threshold:
+                        parent[find(path)] = find(other)
+                        break
+                else:
+                    groups.append(path)
+
+        grouped: dict[str, list[str]] = {}
+        for path in signatures:
+            grouped.setdefault(find(path), []).append(path)
+
+        clusters = []
+        for members in grouped.values():
+            if len(members) < 2:
+                continue
+            first = signatures[members[0]]
+            clusters.append(
+                [
+                    (path, round(estimate_similarity(first, signatures[path]), 4))
+                    for path in members
+                ]
+            )
+        clusters.sort(key=lambda cluster: (-len(cluster), cluster[0][0]))
+        return clusters
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+eama_design_query.py - Structured queries and query planning for design search.
+
+This module lets a single query string combine every design search filter:
+- Field predicates: status:, type:, uuid:, keyword: (alias tag:)
+- Date ranges: created and modified with >, >=, <, <= (e.g. modified>2026-09-01)
+- Free text: terms, "quoted phrases" and OR alternatives (see eama_design_fulltext)
+
+A small planner estimates how many documents each predicate can match from
+the index structures (status/type/keyword bitmaps, the sorted UUID table,
+term postings), evaluates the most selective one first and intersects the
+rest. Date ranges have no index and are applied last as filters.
+
+Example:
+    status:approved type:pdr modified>2026-09-01 auth OR login
+
+Used by eama_design_search.py for --query.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
+
+from eama_design_fulltext import parse_text_query
+
+if TYPE_CHECKING:
+    from eama_design_index import DesignIndex
+
+__all__ = [
+    "Predicate",
+    "ParsedQuery",
+    "DocumentBitmaps",
+    "parse_query",
+    "document_type",
+    "execute_query",
+    "merge_facets",
+]
+
+# Fields answered by an index lookup
+INDEXED_FIELDS = {"status", "type", "uuid", "keyword", "tag"}
+
+# Fields compared against ISO timestamps, evaluated as filters
+DATE_FIELDS = {"created", "modified"}
+
+# A field predicate, optionally with a quoted value: keyword:"token refresh"
+PREDICATE_PATTERN = re.compile(r'^(\w+)(:|>=|<=|>|<)(?:"([^"]*)"|(.+))$')
+
+# Query tokens: predicates with quoted values, quoted phrases, bare words
+QUERY_TOKEN_PATTERN = re.compile(r'(\w+(?::|>=|<=|>|<)"[^"]*")|("[^"]*")|(\S+)')
+
+DATE_OPERATORS: dict[str, Callable[[str, str], bool]] = {
+    "=": lambda a, b: a == b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+
+@dataclass
+class Predicate:
+    """A single field condition of a structured query."""
+
+    name: str
+    op: str
+    value: str
+
+    def __str__(self) -> str:
+        return f"{self.name}{self.op}{self.value}"
+
+
+@dataclass
+class ParsedQuery:
+    """A structured query split into field predicates and free-text clauses."""
+
+    predicates: list[Predicate] = field(default_factory=list)
+    text_clauses: list[list[list[str]]] = field(default_factory=list)
+
+
+def parse_query(query: str) -> ParsedQuery:
+    """Parse a structured query string.
+
+    Args:
+        query: Query such as ``status:approved modified>2026-09-01 auth OR login``
+
+    Returns:
+        ParsedQuery with predicates and free-text clauses
+
+    Raises:
+        ValueError: If a predicate is malformed or OR is applied to a predicate
+    """
+    parsed = ParsedQuery()
+    text_parts: list[str] = []
+    previous_was_predicate = False
+    pending_or = False
+
+    for match in QUERY_TOKEN_PATTERN.finditer(query):
+        quoted_predicate, phrase, word = match.groups()
+        token = quoted_predicate or phrase or word
+
+        predicate_match = PREDICATE_PATTERN.match(token) if not phrase else None
+        if predicate_match and predicate_match.group(1).lower() in (
+            INDEXED_FIELDS | DATE_FIELDS
+        ):
+            if pending_or:
+                raise ValueError(f"OR can only join text terms, not '{token}'")
+            name, op, quoted_value, value = predicate_match.groups()
+            parsed.predicates.append(
+                _make_predicate(name.lower(), op, quoted_value or value or "")
+            )
+            previous_was_predicate = True
+            continue
+
+        if token == "OR":
+            if previous_was_predicate:
+                raise ValueError("OR can only join text terms, not field predicates")
+            pending_or = True
+        else:
+            pending_or = False
+        previous_was_predicate = False
+        text_parts.append(token)
+
+    if pending_or:
+        raise ValueError("Query ends with a dangling OR")
+
+    parsed.text_clauses = parse_text_query(" ".join(text_parts))
+    return parsed
+
+
+def _make_predicate(name: str, op: str, value: str) -> Predicate:
+    """Validate and normalize a field predicate."""
+    if not value:
+        raise ValueError(f"Missing value for '{name}{op}'")
+
+    if name in DATE_FIELDS:
+        if op == ":":
+            op = "="
+        elif op not in DATE_OPERATORS:
+            raise ValueError(f"Unsupported operator '{op}' for {name}")
+        if not re.match(r"^\d{4}(-\d{2}(-\d{2})?)?$", value):
+            raise ValueError(
+                f"Invalid date '{value}' for {name}, expected YYYY-MM-DD"
+            )
+        return Predicate(name, op, value)
+
+    if op != ":":
+        raise ValueError(f"Field '{name}' only supports ':'")
+    if name == "tag":
+        name = "keyword"
+    return Predicate(name, op, value.lower() if name != "uuid" else value)
+
+
+def document_type(path: str, design_dirs: list[str]) -> Optional[str]:
+    """Type folder of a document: the first folder below its design directory.
+
+    Args:
+        path: Document path
+        design_dirs: Design directory paths, as strings
+
+    Returns:
+        Folder name (e.g. ``pdr``), or None for documents at a design root
+    """
+    best: Optional[str] = None
+    for design_dir in design_dirs:
+        prefix = design_dir.rstrip("/") + "/"
+        if path.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    if best is None:
+        return None
+
+    parts = path[len(best) :].split("/")
+    return parts[0] if len(parts) > 1 else None
+
+
+def popcount(bitmap: int) -> int:
+    """Number of documents in a bitmap."""
+    return bin(bitmap).count("1")
+
+
+class DocumentBitmaps:
+    """Per-value document bitmaps over index record ordinals.
+
+    Bit i of a bitmap is set when the i-th record has the value. Bitmaps are
+    plain Python ints, so intersections and counts are single operations.
+    Each bitmap is materialized from its ordinal list on first use.
+    """
+
+    # Record attributes with one bitmap per distinct value
+    FIELDS = ("status", "type", "keyword")
+
+    # Counted by facets(): the bitmap fields plus the month last modified
+    FACETS = (*FIELDS, "month")
+
+    def __init__(
+        self, records: list[dict[str, Any]], design_dirs: list[str]
+    ) -> None:
+        """Collect status, type, keyword and month ordinals in one pass.
+
+        Args:
+            records: Index records in ordinal order
+            design_dirs: Design directory paths, used to derive type folders
+        """
+        self.records = records
+        self.paths = [record["path"] for record in records]
+        self.ordinals = {path: i for i, path in enumerate(self.paths)}
+        self.all = (1 << len(records)) - 1
+        self.types: list[Optional[str]] = []
+        self.values: dict[str, dict[str, list[int]]] = {f: {} for f in self.FACETS}
+        self._bitmaps: dict[tuple[str, str], int] = {}
+
+        status_values = self.values["status"]
+        type_values = self.values["type"]
+        keyword_values = self.values["keyword"]
+        month_values = self.values["month"]
+        for i, record in enumerate(records):
+            status_values.setdefault(record["status"], []).append(i)
+            doc_type = document_type(record["path"], design_dirs)
+            self.types.append(doc_type)
+            if doc_type:
+                type_values.setdefault(doc_type, []).append(i)
+            for keyword in {k.lower() for k in record["keywords"]}:
+                keyword_values.setdefault(keyword, []).append(i)
+            if record.get("modified"):
+                month_values.setdefault(record["modified"][:7], []).append(i)
+
+    def bitmap(self, field_name: str, value: str) -> int:
+        """Bitmap of the documents whose field has the given value."""
+        key = (field_name, value)
+        if key not in self._bitmaps:
+            ordinals = self.values[field_name].get(value, [])
+            self._bitmaps[key] = self.from_ordinals(ordinals)
+        return self._bitmaps[key]
+
+    def from_ordinals(self, ordinals: Iterable[int]) -> int:
+        """Bitmap with the given ordinals set."""
+        size = len(self.paths)
+        digits = bytearray(b"0" * (size or 1))
+        for ordinal in ordinals:
+            digits[size - 1 - ordinal] = ord("1")
+        return int(digits, 2)
+
+    def from_paths(self, paths: Iterable[str]) -> int:
+        """Bitmap of the given document paths (unknown paths are ignored)."""
+        return self.from_ordinals(
+            self.ordinals[path] for path in paths if path in self.ordinals
+        )
+
+    @staticmethod
+    def members(bitmap: int) -> list[int]:
+        """Ordinals set in a bitmap, ascending."""
+        return [i for i, bit in enumerate(reversed(bin(bitmap)[2:])) if bit == "1"]
+
+    def facets(self) -> dict[str, dict[str, int]]:
+        """Document counts per value of each facet, read off the ordinal lists.
+
+        Returns:
+            Facet name -> value -> count, ordered as by merge_facets()
+        """
+        return merge_facets(
+            [
+                {
+                    name: {value: len(ordinals) for value, ordinals in values.items()}
+                    for name, values in self.values.items()
+                }
+            ]
+        )
+
+
+def merge_facets(
+    facets: Iterable[dict[str, dict[str, int]]]
+) -> dict[str, dict[str, int]]:
+    """Sum facet counts (e.g. from several project roots) and order them.
+
+    Values are ordered by count, most first, then by value; months are in
+    chronological order.
+    """
+    totals: dict[str, dict[str, int]] = {name: {} for name in DocumentBitmaps.FACETS}
+    for counts in facets:
+        for name, values in counts.items():
+            total = totals.setdefault(name, {})
+            for value, count in values.items():
+                total[value] = total.get(value, 0) + count
+
+    merged = {}
+    for name, total in totals.items():
+        if name == "month":
+            ordered = sorted(total.items())
+        else:
+            ordered = sorted(total.items(), key=lambda item: (-item[1], item[0]))
+        merged[name] = dict(ordered)
+    return merged
+
+
+@dataclass
+class _Step:
+    """One planned stage: an index lookup or a filter."""
+
+    label: str
+    source: str
+    estimate: int
+    run: Callable[[int], int]
+    is_filter: bool = False
+
+
+def _intersect(bitmap: int) -> Callable[[int], int]:
+    """Step keeping the candidates set in a bitmap."""
+    return lambda candidates: candidates & bitmap
+
+
+def _date_filter(
+    predicate: Predicate, bitmaps: DocumentBitmaps
+) -> Callable[[int], int]:
+    """Step keeping the candidates whose dates satisfy a predicate."""
+    return lambda candidates: _filter_dates(candidates, predicate, bitmaps)
+
+
+def _intersect_paths(
+    match: Callable[[list[list[str]]], Iterable[str]],
+    clause: list[list[str]],
+    bitmaps: DocumentBitmaps,
+) -> Callable[[int], int]:
+    """Step keeping the candidates matching a full-text clause.
+
+    The clause is only matched when the step runs, after cheaper steps.
+    """
+    return lambda candidates: candidates & bitmaps.from_paths(match(clause))
+
+
+def _plan(
+    parsed: ParsedQuery, bitmaps: DocumentBitmaps, index: DesignIndex
+) -> list[_Step]:
+    """Build the execution steps for a query, most selective first."""
+    steps: list[_Step] = []
+    total = len(bitmaps.paths)
+
+    for predicate in parsed.predicates:
+        label = str(predicate)
+        if predicate.name in DocumentBitmaps.FIELDS:
+            bitmap = bitmaps.bitmap(predicate.name, predicate.value)
+            steps.append(
+                _Step(
+                    label,
+                    f"{predicate.name} bitmap",
+                    popcount(bitmap),
+                    _intersect(bitmap),
+                )
+            )
+        elif predicate.name == "uuid":
+            bitmap = bitmaps.from_paths(index.lookup_uuid(predicate.value))
+            steps.append(
+                _Step(
+                    label,
+                    "uuid table",
+                    popcount(bitmap),
+                    _intersect(bitmap),
+                )
+            )
+        else:
+            steps.append(
+                _Step(
+                    label,
+                    "scan filter",
+                    total,
+                    _date_filter(predicate, bitmaps),
+                    is_filter=True,
+                )
+            )
+
+    if parsed.text_clauses:
+        fulltext = index.load_fulltext()
+        for clause in parsed.text_clauses:
+            label = " OR ".join(
+                f'"{" ".join(terms)}"' if len(terms) > 1 else terms[0]
+                for terms in clause
+            )
+            steps.append(
+                _Step(
+                    label,
+                    "term postings",
+                    fulltext.estimate_clause(clause),
+                    _intersect_paths(fulltext.match_clause, clause, bitmaps),
+                )
+            )
+
+    steps.sort(key=lambda step: (step.is_filter, step.estimate))
+    return steps
+
+
+def _filter_dates(
+    candidates: int, predicate: Predicate, bitmaps: DocumentBitmaps
+) -> int:
+    """Keep candidates whose date field satisfies a date predicate."""
+    compare = DATE_OPERATORS[predicate.op]
+    width = len(predicate.value)
+    kept = []
+    for ordinal in bitmaps.members(candidates):
+        stamp = bitmaps.records[ordinal].get(predicate.name)
+        if stamp and compare(stamp[:width], predicate.value):
+            kept.append(ordinal)
+    return bitmaps.from_ordinals(kept)
+
+
+def _elapsed_ms(start: float) -> float:
+    """Milliseconds since a perf_counter() start, rounded for output."""
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def execute_query(
+    parsed: ParsedQuery, bitmaps: DocumentBitmaps, index: DesignIndex
+) -> tuple[list[str], dict[str, float], list[dict[str, Any]]]:
+    """Plan and run a structured query.
+
+    Args:
+        parsed: Query from parse_query()
+        bitmaps: Bitmaps over the refreshed index records
+        index: Refreshed design index (UUID table and term postings)
+
+    Returns:
+        Tuple of (matching paths, BM25 scores by path when the query has
+        free text, plan stages with estimates, match counts and timings)
+    """
+    stages: list[dict[str, Any]] = []
+    if parsed.text_clauses:
+        start = time.perf_counter()
+        index.load_fulltext()
+        stages.append({"stage": "load postings", "ms": _elapsed_ms(start)})
+
+    start = time.perf_counter()
+    steps = _plan(parsed, bitmaps, index)
+    stages.append({"stage": "plan", "ms": _elapsed_ms(start)})
+
+    candidates = bitmaps.all
+    for step in steps:
+        stage: dict[str, Any] = {
+            "stage": step.label,
+            "index": step.source,
+            "estimate": step.estimate,
+        }
+        if not candidates:
+            stage.update({"matched": 0, "ms": 0.0, "skipped": True})
+            stages.append(stage)
+            continue
+
+        start = time.perf_counter()
+        candidates = step.run(candidates)
+        stage["matched"] = popcount(candidates)
+        stage["ms"] = _elapsed_ms(start)
+        stages.append(stage)
+
+    paths = [bitmaps.paths[i] for i in bitmaps.members(candidates)]
+    scores: dict[str, float] = {}
+    if parsed.text_clauses and paths:
+        start = time.perf_counter()
+        fulltext = index.load_fulltext()
+        terms = {t for clause in parsed.text_clauses for alt in clause for t in alt}
+        scores = fulltext.scores(paths, terms)
+        paths.sort(key=lambda path: (-scores[path], path))
+        stages.append({"stage": "rank", "ms": _elapsed_ms(start)})
+
+    return paths, scores, stages
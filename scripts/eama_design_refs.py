@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+eama_design_refs.py - GUUID reference graph between EAMA design documents.
+
+Design documents refer to each other by GUUID (GUUID-YYYYMMDD-NNNN). This
+module keeps those links as a graph:
+- Outgoing references are extracted from each document's content
+- Forward (path -> GUUIDs) and reverse (GUUID -> paths) adjacency lists
+- Incremental per-document updates and removals
+
+Resolving a GUUID to the documents that carry it is left to the owner
+(eama_design_index.py uses its sorted UUID table), which keeps this graph
+independent of document metadata.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Iterable, Optional
+
+from eama_design_storage import write_json
+
+__all__ = [
+    "GUUID_PATTERN",
+    "extract_references",
+    "ReferenceGraph",
+]
+
+GUUID_PATTERN = re.compile(r"\bGUUID-\d{8}-\d{4}\b", re.IGNORECASE)
+
+
+def extract_references(content: str, own_uuid: Optional[str] = None) -> list[str]:
+    """Sorted distinct GUUIDs mentioned in content, excluding the document's own.
+
+    GUUIDs are normalized to upper case.
+    """
+    refs = {match.upper() for match in GUUID_PATTERN.findall(content)}
+    if own_uuid:
+        refs.discard(own_uuid.upper())
+    return sorted(refs)
+
+
+class ReferenceGraph:
+    """Forward and reverse GUUID adjacency lists keyed by document path."""
+
+    def __init__(self, path: Path, version: int):
+        """Initialize an empty graph bound to a JSON file.
+
+        Args:
+            path: Location of the persisted graph
+            version: Format version shared with the owning design index
+        """
+        self.path = path
+        self.version = version
+        # path -> GUUIDs the document references
+        self.outgoing: dict[str, list[str]] = {}
+        # GUUID -> paths of documents referencing it
+        self.incoming: dict[str, list[str]] = {}
+        self.loaded = False
+
+    def load(self) -> bool:
+        """Load the graph from disk; the reverse lists are rebuilt.
+
+        Returns:
+            True if a compatible graph was loaded
+        """
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return False
+
+        self.outgoing = data["outgoing"]
+        self.incoming = {}
+        for path, refs in self.outgoing.items():
+            for ref in refs:
+                self.incoming.setdefault(ref, []).append(path)
+        self.loaded = True
+        return True
+
+    def save(self) -> bool:
+        """Write the graph to disk atomically.
+
+        Returns:
+            True if the graph was written
+        """
+        data = {"version": self.version, "outgoing": self.outgoing}
+        return write_json(self.path, data)
+
+    def clear(self) -> None:
+        """Drop all edges."""
+        self.outgoing = {}
+        self.incoming = {}
+
+    def remove(self, path: str) -> None:
+        """Remove a document's outgoing edges."""
+        for ref in self.outgoing.pop(path, []):
+            paths = self.incoming.get(ref)
+            if paths is None:
+                continue
+            paths.remove(path)
+            if not paths:
+                del self.incoming[ref]
+
+    def update(self, path: str, references: list[str]) -> None:
+        """Replace the outgoing edges of a document.
+
+        Args:
+            path: Document path
+            references: GUUIDs as returned by extract_references()
+        """
+        self.remove(path)
+        if not references:
+            return
+        self.outgoing[path] = references
+        for ref in references:
+            self.incoming.setdefault(ref, []).append(path)
+
+    def references_of(self, path: str) -> list[str]:
+        """GUUIDs referenced by a document."""
+        return self.outgoing.get(path, [])
+
+    def referencing(self, guuids: Iterable[str]) -> list[str]:
+        """Paths of documents referencing any of the GUUIDs, in path order."""
+        paths: set[str] = set()
+        for guuid in guuids:
+            paths.update(self.incoming.get(guuid.upper(), ()))
+        return sorted(paths)
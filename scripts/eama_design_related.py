@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+eama_design_related.py - "Related documents" by TF-IDF cosine similarity.
+
+This module recommends the designs most similar to a given one:
+- Each design document is a sparse term-count vector over its body's topic
+  terms, a derived table of the design index updated only for changed paths
+- Term weights are sublinear TF times smoothed IDF, row-normalized and
+  stored with the vectors, so a query never reweights the collection
+- A changed document is weighted with the current document frequencies;
+  the other rows keep theirs until the document count drifts by more than
+  REWEIGHT_DRIFT, when every row is reweighted in one pass
+- The weights are also stored by term (the columns of the sparse matrix),
+  so a query reads only the columns of its own terms
+- Cosine similarity over those columns is one batch of NumPy operations
+  when NumPy is installed, and a walk over them in pure Python otherwise
+
+Used by eama_design_index.py and eama_design_search.py (--related).
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Optional
+
+try:
+    import numpy as np  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+__all__ = [
+    "DEFAULT_RELATED_LIMIT",
+    "is_topic_term",
+    "topic_counts",
+    "TermVectors",
+]
+
+# Neighbours returned by --related when no --limit is given
+DEFAULT_RELATED_LIMIT = 10
+
+# Shorter terms carry no topic and are left out of the vectors
+MIN_TERM_LENGTH = 3
+
+# Every row is reweighted once the document count has moved this fraction
+# away from the count the stored weights were computed with
+REWEIGHT_DRIFT = 0.1
+
+# Seconds to wait for another process (daemon or CLI) writing the database
+DB_TIMEOUT_SECONDS = 30.0
+
+
+def is_topic_term(term: str) -> bool:
+    """Whether a term counts towards document vectors (not short or numeric)."""
+    return len(term) >= MIN_TERM_LENGTH and not term.isdigit()
+
+
+def topic_counts(positions: dict[str, list[int]]) -> dict[str, int]:
+    """Vector of a document: the number of occurrences of its topic terms.
+
+    Args:
+        positions: Term positions as returned by term_positions()
+    """
+    return {term: len(pos) for term, pos in positions.items() if is_topic_term(term)}
+
+
+def _weigh(counts: list[int], df: list[int], total: int) -> list[float]:
+    """Row-normalized TF-IDF weights of a vector's terms."""
+    row = [
+        (1 + math.log(count)) * (math.log((1 + total) / (1 + freq)) + 1)
+        for count, freq in zip(counts, df)
+    ]
+    norm = math.sqrt(sum(w * w for w in row)) or 1.0
+    return [w / norm for w in row]
+
+
+def _ids(blob: bytes) -> array:
+    numbers = array("I")
+    numbers.frombytes(blob)
+    return numbers
+
+
+def _floats(blob: bytes) -> array:
+    numbers = array("d")
+    numbers.frombytes(blob)
+    return numbers
+
+
+_SCHEMA = """
+DROP TABLE IF EXISTS meta;
+DROP TABLE IF EXISTS terms;
+DROP TABLE IF EXISTS docs;
+DROP TABLE IF EXISTS columns;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT NOT NULL UNIQUE,
+    df INTEGER NOT NULL
+);
+CREATE TABLE docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    terms BLOB NOT NULL,
+    counts BLOB NOT NULL,
+    weights BLOB NOT NULL
+);
+CREATE TABLE columns (
+    term INTEGER PRIMARY KEY,
+    docs BLOB NOT NULL,
+    weights BLOB NOT NULL
+);
+"""
+
+
+class TermVectors:
+    """Weighted term vectors of the design documents, kept in SQLite.
+
+    Rows (one per document) hold term ids, counts and normalized weights;
+    columns (one per term) hold the ids and weights of the documents that
+    contain it. update() and remove() only touch the changed document's
+    row; its columns are patched by save(), which commits the changes.
+    """
+
+    def __init__(self, path: Path, version: int):
+        """Initialize a table bound to a SQLite database file.
+
+        Args:
+            path: Location of the database
+            version: Format version shared with the owning design index
+        """
+        self.path = path
+        self.version = version
+        self._db: Optional[sqlite3.Connection] = None
+        # Vocabulary of the open write transaction (see _write)
+        self._term_ids: dict[str, int] = {}
+        self._terms: list[str] = []
+        self._df: list[int] = []
+        self._changed_terms: set[int] = set()
+        self._total = 0
+        # Column changes applied by save(): doc id -> term ids (and weights)
+        self._removed: dict[int, array] = {}
+        self._added: dict[int, tuple[array, list[float]]] = {}
+        self.loaded = False
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Connection to the database, opened on first use."""
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=DB_TIMEOUT_SECONDS)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        return self._db
+
+    def load(self) -> bool:
+        """Open the database and check its format version.
+
+        Returns:
+            True if a compatible table was found
+        """
+        try:
+            row = self.db.execute(
+                "SELECT value FROM meta WHERE key = 'version'"
+            ).fetchone()
+        except (OSError, sqlite3.Error):
+            return False
+
+        if row is None or row[0] != self.version:
+            return False
+        self.loaded = True
+        return True
+
+    def save(self) -> bool:
+        """Patch the columns of the changed documents and commit.
+
+        Returns:
+            True if the changes were written
+        """
+        try:
+            if self.db.in_transaction:
+                weighted = self.db.execute(
+                    "SELECT value FROM meta WHERE key = 'weighted'"
+                ).fetchone()[0]
+                if abs(self._total - weighted) > REWEIGHT_DRIFT * weighted:
+                    self._reweight()
+                else:
+                    self._patch_columns()
+                self.db.executemany(
+                    "INSERT INTO terms (id, term, df) VALUES (?, ?, ?)"
+                    " ON CONFLICT (id) DO UPDATE SET df = excluded.df",
+                    (
+                        (term_id, self._terms[term_id], self._df[term_id])
+                        for term_id in self._changed_terms
+                    ),
+                )
+            self.db.commit()
+        except (OSError, sqlite3.Error):
+            self._rollback()
+            return False
+        finally:
+            self._removed, self._added = {}, {}
+            self._changed_terms = set()
+        return True
+
+    def _rollback(self) -> None:
+        try:
+            self.db.rollback()
+        except (OSError, sqlite3.Error):
+            pass
+
+    def clear(self) -> None:
+        """Drop all vectors.
+
+        If the database file cannot be written, the table is kept in memory
+        for the lifetime of this object.
+        """
+        script = (
+            f"BEGIN IMMEDIATE;{_SCHEMA}"
+            "INSERT INTO meta (key, value) VALUES"
+            f" ('version', {self.version:d}), ('weighted', 0);"
+            "COMMIT;"
+        )
+        try:
+            self.db.executescript(script)
+        except (OSError, sqlite3.Error):
+            self._db = sqlite3.connect(":memory:")
+            self._db.executescript(script)
+        self._removed, self._added = {}, {}
+
+    def _write(self) -> sqlite3.Connection:
+        """The connection, inside a write transaction until save().
+
+        The vocabulary and document count are read once the write lock is
+        held, so another process's committed changes are never overwritten.
+        """
+        db = self.db
+        if not db.in_transaction:
+            db.execute("BEGIN IMMEDIATE")
+            self._term_ids, self._terms, self._df = {}, [], []
+            for term_id, term, df in db.execute(
+                "SELECT id, term, df FROM terms ORDER BY id"
+            ):
+                self._term_ids[term] = term_id
+                self._terms.append(term)
+                self._df.append(df)
+            self._total = db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            self._changed_terms = set()
+        return db
+
+    def remove(self, path: str) -> None:
+        """Remove a document's vector."""
+        db = self._write()
+        row = db.execute(
+            "SELECT id, terms FROM docs WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return
+        doc, term_ids = row[0], _ids(row[1])
+        for term_id in term_ids:
+            self._df[term_id] -= 1
+        self._changed_terms.update(term_ids)
+        self._total -= 1
+        self._added.pop(doc, None)
+        self._removed[doc] = term_ids
+        db.execute("DELETE FROM docs WHERE id = ?", (doc,))
+
+    def update(self, path: str, counts: dict[str, int]) -> None:
+        """Replace the vector of a document.
+
+        Args:
+            path: Document path
+            counts: Topic term counts as returned by topic_counts()
+        """
+        self.remove(path)
+        db = self._write()
+        term_ids = array("I")
+        for term in counts:
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                term_id = self._term_ids[term] = len(self._terms)
+                self._terms.append(term)
+                self._df.append(0)
+            self._df[term_id] += 1
+            term_ids.append(term_id)
+        self._changed_terms.update(term_ids)
+        self._total += 1
+
+        weights = _weigh(
+            list(counts.values()), [self._df[i] for i in term_ids], self._total
+        )
+        cursor = db.execute(
+            "INSERT INTO docs (path, terms, counts, weights) VALUES (?, ?, ?, ?)",
+            (
+                path,
+                term_ids.tobytes(),
+                array("I", counts.values()).tobytes(),
+                array("d", weights).tobytes(),
+            ),
+        )
+        assert cursor.lastrowid is not None
+        self._added[cursor.lastrowid] = (term_ids, weights)
+
+    def _patch_columns(self) -> None:
+        """Apply the pending row changes to the columns of their terms."""
+        if not self._removed and not self._added:
+            return
+        removed = set(self._removed)
+        added: dict[int, list[tuple[int, float]]] = {}
+        for doc, (term_ids, weights) in self._added.items():
+            for term_id, weight in zip(term_ids, weights):
+                added.setdefault(term_id, []).append((doc, weight))
+        touched = set(added).union(*self._removed.values())
+
+        rows = []
+        for term_id in touched:
+            row = self.db.execute(
+                "SELECT docs, weights FROM columns WHERE term = ?", (term_id,)
+            ).fetchone()
+            entries = []
+            if row is not None:
+                column = zip(_ids(row[0]), _floats(row[1]))
+                entries = [(d, w) for d, w in column if d not in removed]
+            entries.extend(added.get(term_id, ()))
+            rows.append(
+                (
+                    term_id,
+                    array("I", (d for d, _ in entries)).tobytes(),
+                    array("d", (w for _, w in entries)).tobytes(),
+                )
+            )
+        self.db.executemany(
+            "INSERT OR REPLACE INTO columns (term, docs, weights) VALUES (?, ?, ?)",
+            rows,
+        )
+
+    def _reweight(self) -> None:
+        """Reweight every row with the current frequencies and rebuild columns."""
+        db = self.db
+        total = self._total
+        rows = []
+        columns: dict[int, tuple[array, array]] = {}
+        for doc, blob, count_blob in db.execute(
+            "SELECT id, terms, counts FROM docs"
+        ).fetchall():
+            term_ids = _ids(blob)
+            weights = _weigh(
+                _ids(count_blob).tolist(), [self._df[i] for i in term_ids], total
+            )
+            rows.append((array("d", weights).tobytes(), doc))
+            for term_id, weight in zip(term_ids, weights):
+                column = columns.get(term_id)
+                if column is None:
+                    column = columns[term_id] = (array("I"), array("d"))
+                column[0].append(doc)
+                column[1].append(weight)
+
+        db.executemany("UPDATE docs SET weights = ? WHERE id = ?", rows)
+        db.execute("DELETE FROM columns")
+        db.executemany(
+            "INSERT INTO columns (term, docs, weights) VALUES (?, ?, ?)",
+            (
+                (term_id, docs.tobytes(), weights.tobytes())
+                for term_id, (docs, weights) in columns.items()
+            ),
+        )
+        db.execute("UPDATE meta SET value = ? WHERE key = 'weighted'", (total,))
+
+    def _similarities(self, term_ids: array, weights: array) -> dict[int, float]:
+        """Cosine similarity of a row to every row sharing a term with it."""
+        columns = [
+            self.db.execute(
+                "SELECT docs, weights FROM columns WHERE term = ?", (term_id,)
+            ).fetchone()
+            for term_id in term_ids
+        ]
+        if np is not None:
+            docs = [np.frombuffer(c[0], dtype=np.uint32) for c in columns if c]
+            if not docs:
+                return {}
+            products = [
+                np.frombuffer(c[1], dtype=np.float64) * w
+                for c, w in zip(columns, weights)
+                if c
+            ]
+            scores = np.bincount(np.concatenate(docs), weights=np.concatenate(products))
+            hits = np.flatnonzero(scores > 0)
+            return dict(zip(hits.tolist(), scores[hits].tolist()))
+
+        totals: dict[int, float] = {}
+        for column, w in zip(columns, weights):
+            if column is None:
+                continue
+            for doc, other in zip(_ids(column[0]), _floats(column[1])):
+                totals[doc] = totals.get(doc, 0.0) + w * other
+        return totals
+
+    def related(
+        self,
+        path: str,
+        limit: Optional[int] = DEFAULT_RELATED_LIMIT,
+        exclude: Optional[set[str]] = None,
+    ) -> list[tuple[str, float]]:
+        """Documents most similar to an indexed one.
+
+        Args:
+            path: Document to find neighbours for
+            limit: Maximum number of results (None for all with a shared term)
+            exclude: Further paths to leave out (the document itself always is)
+
+        Returns:
+            List of (path, cosine similarity) tuples, most similar first
+        """
+        row = self.db.execute(
+            "SELECT id, terms, weights FROM docs WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return []
+
+        similarities = self._similarities(_ids(row[1]), _floats(row[2]))
+        paths: dict[int, str] = dict(self.db.execute("SELECT id, path FROM docs"))
+        skip = {path} | (exclude or set())
+        scored = (
+            (paths[doc], score)
+            for doc, score in similarities.items()
+            if paths[doc] not in skip
+        )
+        key = lambda item: (-item[1], item[0])  # noqa: E731
+        if limit is None:
+            return sorted(scored, key=key)
+        return heapq.nsmallest(limit, scored, key=key)
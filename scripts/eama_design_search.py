@@ -5,41 +5,251 @@ EAMA Design Search Script
 Search design documents in the project for:
 - UUID matches
 - Keyword/text matches
+- Fuzzy (typo-tolerant) matches on titles, keywords and headings
+- GUUID references between documents (both directions, optionally transitive)
+- Near-duplicate document clusters
+- Related documents (TF-IDF cosine similarity to a given document)
+- Past revisions and the version history of a document, read from git
+- Facet counts (status, type folder, keyword, month modified) for any search
 - Status filtering (draft, approved, deprecated)
 
 Usage:
     python eama_design_search.py --uuid abc123
+    python eama_design_search.py --uuid 23 --uuid-substring
     python eama_design_search.py --keyword "authentication"
     python eama_design_search.py --status approved
     python eama_design_search.py --list
     python eama_design_search.py --keyword "auth" --status draft
-
-Output: JSON for programmatic use, human-readable summary to stderr
+    python eama_design_search.py --text '"token refresh" auth OR login'
+    python eama_design_search.py --text "token refresh" --snippets 2
+    python eama_design_search.py --fuzzy "authetication servise" --fuzzy-threshold 0.4
+    python eama_design_search.py --references-to GUUID-20260901-0003
+    python eama_design_search.py --referenced-by GUUID-20260901-0003 --transitive
+    python eama_design_search.py --duplicates --duplicate-threshold 0.7
+    python eama_design_search.py --related GUUID-20260901-0003 --limit 5
+    python eama_design_search.py --related design/pdr/auth.md --status approved
+    python eama_design_search.py --at v1.2 --uuid GUUID-20260901-0003
+    python eama_design_search.py --history GUUID-20260901-0003 --status approved
+    python eama_design_search.py --facets --limit 0
+    python eama_design_search.py --facets --query 'type:pdr auth' --limit 0
+    python eama_design_search.py --project-dir ~/repo-a ~/repo-b --keyword auth
+    python eama_design_search.py --roots-file roots.txt --text "token refresh"
+    python eama_design_search.py --query 'status:approved type:pdr auth OR login'
+    python eama_design_search.py --list --sort modified --limit 10
+    python eama_design_search.py --keyword auth --format ndjson --offset 20 --limit 20
+
+Which folders are searched, and which paths are skipped, can be configured in
+.eama/design-search.json (see eama_design_walk.py); .gitignore is honoured.
+
+Parsed metadata is cached in .eama/design-index under the project directory,
+so repeated searches only reparse new or changed files (--no-index disables).
+With "git_index": true in the config, clean tracked files are recognised by
+their git blob SHA without being stat()ed.
+
+    python eama_design_search.py serve
+
+keeps the index in memory and answers searches over a Unix socket; while it
+runs, the normal CLI transparently forwards queries to it (--no-daemon skips).
+
+Output: JSON for programmatic use (or NDJSON with --format ndjson),
+human-readable summary to stderr
 """
 
 import argparse
+import heapq
+import io
+import itertools
 import json
 import os
 import re
 import sys
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Optional, cast
+from typing import Any, Callable, Iterable, Iterator, Optional, cast
+
+from eama_design_daemon import query_daemon, serve
+from eama_design_fulltext import parse_text_query
+from eama_design_fuzzy import DEFAULT_THRESHOLD
+from eama_design_minhash import DEFAULT_DUPLICATE_THRESHOLD
+from eama_design_history import DesignHistory, GitError
+from eama_design_index import (
+    DEFAULT_INDEX_DIR,
+    DesignIndex,
+    RefreshStats,
+    git_blob_shas,
+    map_parallel,
+)
+from eama_design_related import DEFAULT_RELATED_LIMIT
+from eama_design_query import (
+    DocumentBitmaps,
+    ParsedQuery,
+    execute_query,
+    merge_facets,
+    parse_query,
+)
+from eama_design_walk import (
+    CONFIG_FILE,
+    find_design_roots,
+    is_ignored,
+    load_walk_config,
+    parse_ignore_lines,
+    walk_design_files,
+)
+
+# Upper bound on project roots searched at the same time
+FEDERATION_MAX_WORKERS = 16
+
+# Options the federated search applies itself instead of passing to shards,
+# with the number of values each takes ("+" for one or more)
+FEDERATION_OPTIONS: dict[str, int | str] = {
+    "--project-dir": "+",
+    "--roots-file": 1,
+    "--limit": 1,
+    "--offset": 1,
+    "--format": 1,
+    "--summary": 0,
+}
+
+# Document statuses recognised in frontmatter and body markers
+STATUS_PATTERN = r"(draft|approved|review|deprecated|archived)"
+
+# Frontmatter uuid values: GUUID-YYYYMMDD-NNNN or hex UUIDs
+UUID_VALUE_PATTERN = re.compile(r"(GUUID-\d{8}-\d{4}|[a-f0-9-]+)", re.IGNORECASE)
+
+BODY_UUID_PATTERN = re.compile(r"EAMA-UUID:\s*([a-f0-9-]+)", re.IGNORECASE)
+STANDALONE_UUID_PATTERN = re.compile(
+    r"\b([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})\b",
+    re.IGNORECASE,
+)
+
+# Standalone UUIDs are only recognised this close to the start of a document
+EARLY_UUID_CHARS = 500
+
+H1_PATTERN = re.compile(r"^#\s+(.+)$")
+
+# Body status markers, highest priority first
+BODY_STATUS_PATTERNS: list[tuple[re.Pattern[str], Any]] = [
+    (re.compile(r"\*\*Status\*\*:\s*" + STATUS_PATTERN, re.IGNORECASE), 1),
+    (re.compile(r"Status:\s*" + STATUS_PATTERN, re.IGNORECASE), 1),
+    (re.compile(r"\[DRAFT\]", re.IGNORECASE), "draft"),
+    (re.compile(r"\[APPROVED\]", re.IGNORECASE), "approved"),
+    (re.compile(r"\[DEPRECATED\]", re.IGNORECASE), "deprecated"),
+]
+
+SUMMARY_MAX_CHARS = 200
+
+
+class StringTable:
+    """Append-only table of shared strings, addressed by offset."""
+
+    __slots__ = ("strings", "offsets", "_lock")
+
+    def __init__(self) -> None:
+        self.strings: list[str] = []
+        self.offsets: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, value: str) -> int:
+        """Offset of a string, appending it on first use."""
+        offset = self.offsets.get(value)
+        if offset is None:
+            # Federated searches may build documents from several threads
+            with self._lock:
+                offset = self.offsets.get(value)
+                if offset is None:
+                    self.strings.append(value)
+                    offset = self.offsets[value] = len(self.strings) - 1
+        return offset
+
+    def __getitem__(self, offset: int) -> str:
+        return self.strings[offset]
+
+
+# Directory part of every document path; documents keep an offset into it
+DIRECTORIES = StringTable()
 
 
-@dataclass
 class DesignDocument:
-    """Represents a design document with metadata."""
+    """Represents a design document with metadata.
+
+    A scan builds one instance per document, so instances are kept small:
+    slots instead of a __dict__, interned status and keyword strings, and
+    the directory of the path stored once in DIRECTORIES.
+    """
+
+    __slots__ = (
+        "_directory",
+        "_name",
+        "uuid",
+        "title",
+        "status",
+        "created",
+        "modified",
+        "keywords",
+        "summary",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        uuid: Optional[str],
+        title: str,
+        status: str,
+        created: Optional[str],
+        modified: Optional[str],
+        keywords: Iterable[str],
+        summary: str,
+    ):
+        split = path.rfind(os.sep) + 1
+        self._directory = DIRECTORIES.add(path[:split])
+        self._name = path[split:]
+        self.uuid = uuid
+        self.title = title
+        self.status = sys.intern(status)
+        self.created = created
+        self.modified = modified
+        self.keywords = tuple(sys.intern(kw) for kw in keywords)
+        self.summary = summary
+
+    @property
+    def path(self) -> str:
+        return DIRECTORIES[self._directory] + self._name
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # DIRECTORIES offsets are per process: send the full path across
+        # process boundaries (--jobs workers) so the receiver interns it
+        return (
+            DesignDocument,
+            (
+                self.path,
+                self.uuid,
+                self.title,
+                self.status,
+                self.created,
+                self.modified,
+                self.keywords,
+                self.summary,
+            ),
+        )
 
-    path: str
-    uuid: Optional[str]
-    title: str
-    status: str
-    created: Optional[str]
-    modified: Optional[str]
-    keywords: list[str]
-    summary: str
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DesignDocument):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"DesignDocument(path={self.path!r}, uuid={self.uuid!r}, "
+            f"title={self.title!r}, status={self.status!r})"
+        )
 
 
 def get_project_dir() -> Path:
@@ -49,248 +259,562 @@ def get_project_dir() -> Path:
 
 
 def find_design_directories(project_dir: Path) -> list[Path]:
-    """Find all design-related directories in the project."""
-    design_dirs = []
-
-    # Common design directory names
-    design_patterns = [
-        "design",
-        "designs",
-        "specs",
-        "specifications",
-        "architecture",
-        "docs/design",
-        "docs/specs",
-        "docs/architecture",
+    """Find all design-related directories in the project.
+
+    The directories come from the include globs of the project config
+    (.eama/design-search.json), defaulting to the common design, specs and
+    architecture folders.
+    """
+    return find_design_roots(project_dir)
+
+
+def _strip_quotes(value: str) -> str:
+    """Strip one optional quote character from each end of a value."""
+    if value[:1] in ("'", '"'):
+        value = value[1:]
+    if value[-1:] in ("'", '"'):
+        value = value[:-1]
+    return value.strip()
+
+
+def _parse_inline_list(value: str) -> list[str]:
+    """Parse a ``[a, b, c]`` frontmatter value into its items."""
+    if not value.startswith("[") or "]" not in value:
+        return []
+    return [
+        k.strip().strip("'\"") for k in value[1 : value.index("]")].split(",")
     ]
 
-    for pattern in design_patterns:
-        design_path = project_dir / pattern
-        if design_path.is_dir():
-            design_dirs.append(design_path)
 
-    return design_dirs
+def _paragraph_summary(lines: list[str]) -> Optional[str]:
+    """Summarize a paragraph, or return None for headings, lists and code."""
+    para = "".join(lines).strip()
+    if para.startswith(("#", "-", "```")):
+        return None
+    return para[:SUMMARY_MAX_CHARS] + ("..." if len(para) > SUMMARY_MAX_CHARS else "")
 
 
-def extract_uuid_from_content(content: str) -> Optional[str]:
-    """Extract UUID from document content (frontmatter or body)."""
-    # Check YAML frontmatter for uuid field
-    frontmatter_match = re.search(r"^---\s*\n(.*?)\n---", content, re.DOTALL)
-    if frontmatter_match:
-        frontmatter = frontmatter_match.group(1)
-        uuid_match = re.search(r"uuid:\s*([a-f0-9-]+)", frontmatter, re.IGNORECASE)
-        if uuid_match:
-            return uuid_match.group(1)
+def build_design_document(
+    file_path: Path, lines: Iterable[str], stat: os.stat_result
+) -> DesignDocument:
+    """Build a DesignDocument in a single pass over a document's lines.
 
-    # Check for UUID in document body (EAMA-UUID: format)
-    body_uuid_match = re.search(r"EAMA-UUID:\s*([a-f0-9-]+)", content, re.IGNORECASE)
-    if body_uuid_match:
-        return body_uuid_match.group(1)
+    Frontmatter and leading body lines are tokenized once. Reading stops as
+    soon as every field is known, which is normally right after the
+    frontmatter and the first paragraph. The rest of the body is only
+    scanned when no status (for body status markers) or no title (for the
+    first H1) has been found yet.
 
-    # Check for standalone UUID format in first 500 chars
-    early_uuid_match = re.search(
-        r"\b([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})\b",
-        content[:500],
-        re.IGNORECASE,
-    )
-    if early_uuid_match:
-        return early_uuid_match.group(1)
+    Args:
+        file_path: Path of the document
+        lines: Lines of the document, e.g. an open text file
+        stat: Stat result used for the created/modified timestamps
 
-    return None
+    Returns:
+        Parsed DesignDocument
+    """
+    fields: dict[str, str] = {}
+    keywords: set[str] = set()
+    line_iter = iter(lines)
+    body_lines: Iterable[str] = line_iter
+
+    # Frontmatter: key/value lines between the opening and closing ---
+    first_line = next(line_iter, "")
+    early_text = first_line
+    if first_line.rstrip() == "---":
+        frontmatter_lines = []
+        closed = False
+        for line in line_iter:
+            if line.startswith("---"):
+                closed = True
+                break
+            frontmatter_lines.append(line)
+        early_text += "".join(frontmatter_lines)
+
+        if closed:
+            for line in frontmatter_lines:
+                key, sep, value = line.partition(":")
+                key = key.strip().lower()
+                value = value.strip()
+                if not sep or key in fields:
+                    continue
+                if key in ("keywords", "tags"):
+                    keywords.update(_parse_inline_list(value))
+                    continue
+                fields[key] = value
+        else:
+            # Unterminated frontmatter is ordinary body text
+            body_lines = itertools.chain([first_line], frontmatter_lines)
+    else:
+        body_lines = itertools.chain([first_line], line_iter)
+
+    uuid = None
+    uuid_match = UUID_VALUE_PATTERN.match(fields.get("uuid", ""))
+    if uuid_match:
+        uuid = uuid_match.group(1)
+
+    status = None
+    status_match = re.match(STATUS_PATTERN, fields.get("status", ""), re.IGNORECASE)
+    if status_match:
+        status = status_match.group(1).lower()
+
+    title = _strip_quotes(fields["title"]) if fields.get("title") else None
+    summary = None
+    if fields.get("description"):
+        summary = _strip_quotes(fields["description"])[:SUMMARY_MAX_CHARS]
+
+    # Body: first H1, first plain paragraph, uuid and status markers
+    best_marker: Optional[tuple[int, str]] = None
+    paragraph: list[str] = []
+    for line in body_lines:
+        if len(early_text) < EARLY_UUID_CHARS:
+            early_text += line
+        if uuid is None:
+            body_uuid = BODY_UUID_PATTERN.search(line)
+            if body_uuid:
+                uuid = body_uuid.group(1)
+        if title is None:
+            h1_match = H1_PATTERN.match(line.rstrip("\n"))
+            if h1_match:
+                title = h1_match.group(1).strip()
+        if status is None:
+            for priority, (pattern, group_or_value) in enumerate(
+                BODY_STATUS_PATTERNS[: best_marker[0] if best_marker else None]
+            ):
+                match = pattern.search(line)
+                if match:
+                    if isinstance(group_or_value, int):
+                        value = match.group(group_or_value).lower()
+                    else:
+                        value = cast(str, group_or_value)
+                    best_marker = (priority, value)
+                    break
+            if best_marker and best_marker[0] == 0:
+                status = best_marker[1]
+        if summary is None:
+            if line.strip():
+                paragraph.append(line)
+            elif paragraph:
+                summary = _paragraph_summary(paragraph)
+                paragraph = []
 
+        if (
+            title is not None
+            and summary is not None
+            and status is not None
+            and (uuid is not None or len(early_text) >= EARLY_UUID_CHARS)
+        ):
+            break
+    else:
+        if summary is None and paragraph:
+            summary = _paragraph_summary(paragraph)
 
-def extract_status_from_content(content: str) -> str:
-    """Extract status from document content."""
-    # Check frontmatter for status
-    frontmatter_match = re.search(r"^---\s*\n(.*?)\n---", content, re.DOTALL)
-    if frontmatter_match:
-        frontmatter = frontmatter_match.group(1)
-        status_match = re.search(
-            r"status:\s*(draft|approved|review|deprecated|archived)",
-            frontmatter,
-            re.IGNORECASE,
-        )
-        if status_match:
-            return status_match.group(1).lower()
-
-    # Check body for status markers
-    status_patterns = [
-        (r"\*\*Status\*\*:\s*(draft|approved|review|deprecated|archived)", 1),
-        (r"Status:\s*(draft|approved|review|deprecated|archived)", 1),
-        (r"\[DRAFT\]", "draft"),
-        (r"\[APPROVED\]", "approved"),
-        (r"\[DEPRECATED\]", "deprecated"),
-    ]
+    if uuid is None:
+        early_match = STANDALONE_UUID_PATTERN.search(early_text[:EARLY_UUID_CHARS])
+        if early_match:
+            uuid = early_match.group(1)
 
-    for pattern, group_or_value in status_patterns:
-        match = re.search(pattern, content, re.IGNORECASE)
-        if match:
-            if isinstance(group_or_value, int):
-                return match.group(group_or_value).lower()
-            return cast(str, group_or_value)
+    if status is None:
+        status = best_marker[1] if best_marker else "unknown"
 
-    return "unknown"
+    if title is None:
+        title = (
+            file_path.name.replace(".md", "").replace("-", " ").replace("_", " ")
+        ).title()
 
+    return DesignDocument(
+        path=str(file_path),
+        uuid=uuid,
+        title=title,
+        status=status,
+        created=datetime.fromtimestamp(stat.st_ctime).isoformat(),
+        modified=datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        keywords=sorted(keywords),
+        summary=summary or "",
+    )
 
-def extract_title_from_content(content: str, filename: str) -> str:
-    """Extract title from document content."""
-    # Check frontmatter for title
-    frontmatter_match = re.search(r"^---\s*\n(.*?)\n---", content, re.DOTALL)
-    if frontmatter_match:
-        frontmatter = frontmatter_match.group(1)
-        title_match = re.search(
-            r'title:\s*["\']?(.+?)["\']?\s*$', frontmatter, re.MULTILINE
-        )
-        if title_match:
-            return title_match.group(1).strip()
 
-    # Check for first H1 heading
-    h1_match = re.search(r"^#\s+(.+)$", content, re.MULTILINE)
-    if h1_match:
-        return h1_match.group(1).strip()
+def parse_design_content(
+    file_path: Path, content: str, stat: os.stat_result
+) -> DesignDocument:
+    """Build a DesignDocument from already-read content."""
+    return build_design_document(file_path, io.StringIO(content), stat)
 
-    # Fall back to filename
-    return filename.replace(".md", "").replace("-", " ").replace("_", " ").title()
 
+def parse_design_document(file_path: Path) -> Optional[DesignDocument]:
+    """Parse a design document and extract metadata.
 
-def extract_keywords_from_content(content: str) -> list[str]:
-    """Extract keywords from document content."""
-    keywords: set[str] = set()
+    Only the frontmatter and leading body lines are read unless the body
+    has to be scanned for a status marker or title heading.
+    """
+    try:
+        with file_path.open(encoding="utf-8") as f:
+            return build_design_document(file_path, f, os.fstat(f.fileno()))
+    except (OSError, UnicodeDecodeError):
+        return None
 
-    # Check frontmatter for keywords/tags
-    frontmatter_match = re.search(r"^---\s*\n(.*?)\n---", content, re.DOTALL)
-    if frontmatter_match:
-        frontmatter = frontmatter_match.group(1)
 
-        # keywords: [a, b, c] or keywords: - a format
-        keywords_match = re.search(r"keywords:\s*\[([^\]]+)\]", frontmatter)
-        if keywords_match:
-            keywords.update(
-                k.strip().strip("'\"") for k in keywords_match.group(1).split(",")
+def iter_design_files(project_dir: Path) -> list[Path]:
+    """List all markdown files under the project's design directories.
+
+    Excluded and .gitignored paths are pruned, nested design directories
+    are walked once, and files are returned in stable path order so results
+    are deterministic.
+    """
+    return walk_design_files(project_dir)
+
+
+def _parse_record(
+    file_path: Path, content: str, stat: os.stat_result
+) -> Optional[dict[str, Any]]:
+    """Parse design document content into its index record."""
+    return document_to_dict(parse_design_content(file_path, content, stat))
+
+
+def iter_design_documents(
+    project_dir: Path, index: Optional[DesignIndex] = None, jobs: int = 1
+) -> Iterator[DesignDocument]:
+    """Scan all design directories, yielding documents as they are parsed.
+
+    With an index, the index is refreshed before this returns, which stats
+    every file whatever the consumer later takes, and documents are built
+    from its records on demand. Without one, each file is parsed
+    only when the next document is requested, so consumers that stop early
+    never read the remaining files (unless jobs > 1 parses them up front).
+
+    Args:
+        project_dir: Project root to scan
+        index: Optional persistent index; when given only new or changed
+            files are parsed and the index is updated in place
+        jobs: Worker processes for parsing (small scans always run serially)
+
+    Returns:
+        Iterator over parsed design documents in path order
+    """
+    config = load_walk_config(project_dir)
+    files = walk_design_files(project_dir, config)
+
+    if index is not None:
+        blobs = None
+        if config.git_index:
+            roots = find_design_roots(project_dir, config)
+            blobs = git_blob_shas(
+                project_dir, [str(root.relative_to(project_dir)) for root in roots]
             )
+        index.refresh(files, _parse_record, jobs=jobs, blobs=blobs)
+        return indexed_documents(index)
 
-        tags_match = re.search(r"tags:\s*\[([^\]]+)\]", frontmatter)
-        if tags_match:
-            keywords.update(
-                k.strip().strip("'\"") for k in tags_match.group(1).split(",")
-            )
+    if jobs != 1:
+        parsed = map_parallel(parse_design_document, files, jobs=jobs)
+        return (doc for doc in parsed if doc)
 
-    return list(keywords)
+    return (doc for doc in map(parse_design_document, files) if doc)
 
 
-def extract_summary_from_content(content: str) -> str:
-    """Extract summary/description from document content."""
-    # Check frontmatter for description
-    frontmatter_match = re.search(r"^---\s*\n(.*?)\n---", content, re.DOTALL)
-    if frontmatter_match:
-        frontmatter = frontmatter_match.group(1)
-        desc_match = re.search(
-            r'description:\s*["\']?(.+?)["\']?\s*$', frontmatter, re.MULTILINE
-        )
-        if desc_match:
-            return desc_match.group(1).strip()[:200]
+def indexed_documents(index: DesignIndex) -> Iterator[DesignDocument]:
+    """Build documents from the index records one at a time, in path order.
 
-    # Get first non-heading, non-empty paragraph after frontmatter
-    content_after_frontmatter = re.sub(
-        r"^---\s*\n.*?\n---\s*\n", "", content, flags=re.DOTALL
-    )
-    paragraphs = re.split(r"\n\n+", content_after_frontmatter)
+    Nothing is kept between documents, so a search only holds on to the
+    documents its filters let through. The index itself still holds every
+    record while it is loaded (see DesignIndex.records).
+    """
+    for record in index.records():
+        yield DesignDocument(**record)
 
-    for para in paragraphs:
-        para = para.strip()
-        # Skip headings, lists, code blocks
-        if (
-            para
-            and not para.startswith("#")
-            and not para.startswith("-")
-            and not para.startswith("```")
-        ):
-            return para[:200] + ("..." if len(para) > 200 else "")
 
-    return ""
+def scan_design_documents(
+    project_dir: Path, index: Optional[DesignIndex] = None, jobs: int = 1
+) -> list[DesignDocument]:
+    """Scan all design directories and parse documents.
 
+    Args:
+        project_dir: Project root to scan
+        index: Optional persistent index; when given only new or changed
+            files are parsed and the index is updated in place
+        jobs: Worker processes for parsing (small scans always run serially)
 
-def parse_design_document(file_path: Path) -> Optional[DesignDocument]:
-    """Parse a design document and extract metadata."""
-    try:
-        content = file_path.read_text(encoding="utf-8")
-    except (OSError, UnicodeDecodeError):
-        return None
+    Returns:
+        Parsed design documents in path order
+    """
+    return list(iter_design_documents(project_dir, index=index, jobs=jobs))
 
-    stat = file_path.stat()
 
-    return DesignDocument(
-        path=str(file_path),
-        uuid=extract_uuid_from_content(content),
-        title=extract_title_from_content(content, file_path.name),
-        status=extract_status_from_content(content),
-        created=datetime.fromtimestamp(stat.st_ctime).isoformat(),
-        modified=datetime.fromtimestamp(stat.st_mtime).isoformat(),
-        keywords=extract_keywords_from_content(content),
-        summary=extract_summary_from_content(content),
-    )
+def uuid_matcher(
+    uuid_query: str, index: Optional[DesignIndex] = None, substring: bool = False
+) -> Callable[[DesignDocument], bool]:
+    """Build a predicate matching documents by UUID prefix (or substring).
 
+    Args:
+        uuid_query: UUID or UUID prefix (case-insensitive)
+        index: Refreshed design index; its sorted UUID table is used if given
+        substring: Match anywhere in the UUID instead of only the prefix
 
-def scan_design_documents(project_dir: Path) -> list[DesignDocument]:
-    """Scan all design directories and parse documents."""
-    documents = []
-    design_dirs = find_design_directories(project_dir)
+    Returns:
+        Predicate taking a DesignDocument
+    """
+    if index is not None:
+        matched = set(index.lookup_uuid(uuid_query, substring=substring))
+        return lambda doc: doc.path in matched
 
-    for design_dir in design_dirs:
-        for md_file in design_dir.rglob("*.md"):
-            doc = parse_design_document(md_file)
-            if doc:
-                documents.append(doc)
+    uuid_query = uuid_query.lower()
 
-    return documents
+    def matches(doc: DesignDocument) -> bool:
+        if not doc.uuid:
+            return False
+        uuid = doc.uuid.lower()
+        return uuid_query in uuid if substring else uuid.startswith(uuid_query)
+
+    return matches
 
 
 def search_by_uuid(
-    documents: list[DesignDocument], uuid_query: str
+    documents: Iterable[DesignDocument],
+    uuid_query: str,
+    index: Optional[DesignIndex] = None,
+    substring: bool = False,
 ) -> list[DesignDocument]:
-    """Search documents by UUID (partial match supported)."""
-    uuid_query = uuid_query.lower()
-    return [doc for doc in documents if doc.uuid and uuid_query in doc.uuid.lower()]
+    """Search documents by UUID prefix (or substring).
+
+    Args:
+        documents: Documents to search
+        uuid_query: UUID or UUID prefix (case-insensitive)
+        index: Refreshed design index; its sorted UUID table is used if given
+        substring: Match anywhere in the UUID instead of only the prefix
+
+    Returns:
+        Matching documents in their original order
+    """
+    matches = uuid_matcher(uuid_query, index=index, substring=substring)
+    return [doc for doc in documents if matches(doc)]
+
+
+def keyword_matches(doc: DesignDocument, keyword: str) -> bool:
+    """Check a lowercase keyword against title, summary, keywords and path."""
+    return (
+        keyword in doc.title.lower()
+        or keyword in doc.summary.lower()
+        or any(keyword in kw.lower() for kw in doc.keywords)
+        or keyword in doc.path.lower()
+    )
 
 
 def search_by_keyword(
-    documents: list[DesignDocument], keyword: str
+    documents: Iterable[DesignDocument], keyword: str
 ) -> list[DesignDocument]:
     """Search documents by keyword in title, summary, or keywords list."""
     keyword = keyword.lower()
-    results = []
+    return [doc for doc in documents if keyword_matches(doc, keyword)]
 
-    for doc in documents:
-        # Search in title
-        if keyword in doc.title.lower():
-            results.append(doc)
-            continue
-
-        # Search in summary
-        if keyword in doc.summary.lower():
-            results.append(doc)
-            continue
 
-        # Search in keywords
-        if any(keyword in kw.lower() for kw in doc.keywords):
-            results.append(doc)
-            continue
+def _documents_for_paths(
+    index: DesignIndex, paths: Iterable[str]
+) -> list[DesignDocument]:
+    """Build documents for indexed paths, skipping unreadable ones."""
+    documents = []
+    for path in paths:
+        record = index.record(path)
+        if record:
+            documents.append(DesignDocument(**record))
+    return documents
 
-        # Search in file path
-        if keyword in doc.path.lower():
-            results.append(doc)
 
-    return results
+def search_by_text(
+    index: DesignIndex, query: str
+) -> tuple[list[DesignDocument], dict[str, float]]:
+    """Search full document bodies through the index's inverted index.
+
+    Args:
+        index: Refreshed design index holding the postings
+        query: Terms, quoted phrases and OR alternatives (all clauses must match)
+
+    Returns:
+        Tuple of (matching documents best first, BM25 score by path)
+    """
+    ranked = index.search_text(query)
+    scores = dict(ranked)
+    return _documents_for_paths(index, (path for path, _ in ranked)), scores
+
+
+def search_by_fuzzy(
+    index: DesignIndex, query: str, threshold: float = DEFAULT_THRESHOLD
+) -> tuple[list[DesignDocument], dict[str, float]]:
+    """Typo-tolerant search over titles, keywords and headings.
+
+    Args:
+        index: Refreshed design index holding the trigram index
+        query: One or more (possibly misspelled) words
+        threshold: Minimum trigram similarity in [0, 1]
+
+    Returns:
+        Tuple of (matching documents most similar first, similarity by path)
+    """
+    ranked = index.search_fuzzy(query, threshold)
+    scores = dict(ranked)
+    return _documents_for_paths(index, (path for path, _ in ranked)), scores
+
+
+def search_by_references(
+    index: DesignIndex,
+    references_to: Optional[str] = None,
+    referenced_by: Optional[str] = None,
+    transitive: bool = False,
+) -> tuple[list[DesignDocument], dict[str, int]]:
+    """Follow GUUID references through the index's reference graph.
+
+    Args:
+        index: Refreshed design index holding the reference graph
+        references_to: Find documents referencing this GUUID
+        referenced_by: Find documents referenced by the document with this GUUID
+        transitive: Follow references through intermediate documents
+
+    Returns:
+        Tuple of (matching documents nearest first, hop count by path); with
+        both directions given, only documents found in both are returned
+    """
+    depths: Optional[dict[str, int]] = None
+    if references_to:
+        depths = index.references_to(references_to, transitive=transitive)
+    if referenced_by:
+        found = index.referenced_by(referenced_by, transitive=transitive)
+        if depths is None:
+            depths = found
+        else:
+            depths = {p: max(d, found[p]) for p, d in depths.items() if p in found}
+    depths = depths or {}
+    ordered = sorted(depths, key=lambda path: (depths[path], path))
+    return _documents_for_paths(index, ordered), depths
+
+
+def resolve_document(index: DesignIndex, target: str, project_dir: Path) -> list[str]:
+    """Indexed paths of the document named by a path or UUID.
+
+    A UUID may be carried by several documents; all of them are returned.
+    Paths may be absolute, or relative to the working or project directory.
+    """
+    if not target.endswith(".md"):
+        paths = index.load_uuids().exact(target)
+        if paths:
+            return paths
+
+    candidates = [target, os.path.abspath(target), str(project_dir / target)]
+    for candidate in candidates:
+        if index.record(candidate) is not None:
+            return [candidate]
+
+    # Different spelling of the same file (symlinks, ..)
+    real_target = os.path.realpath(project_dir / target)
+    for record in index.records():
+        if os.path.realpath(record["path"]) == real_target:
+            return [record["path"]]
+    return []
+
+
+def search_by_related(
+    index: DesignIndex,
+    target: str,
+    project_dir: Path,
+    limit: Optional[int] = None,
+) -> tuple[list[DesignDocument], dict[str, float]]:
+    """Rank documents by TF-IDF cosine similarity to a given document.
+
+    Args:
+        index: Refreshed design index holding the term vectors
+        target: Path or UUID of the document to find neighbours for
+        project_dir: Base for relative paths
+        limit: Nearest neighbours to keep (None for every document sharing
+            a term), selected with a bounded heap
+
+    Returns:
+        Tuple of (other documents most similar first, similarity by path);
+        empty if the target is not an indexed design document
+    """
+    ranked = index.related(resolve_document(index, target, project_dir), limit)
+    scores = dict(ranked)
+    return _documents_for_paths(index, (path for path, _ in ranked)), scores
+
+
+def search_by_query(
+    index: DesignIndex, design_dirs: list[Path], query: ParsedQuery
+) -> tuple[list[DesignDocument], dict[str, float], list[dict[str, Any]]]:
+    """Run a structured query through the query planner.
+
+    Args:
+        index: Refreshed design index
+        design_dirs: Design directories, used to derive type folders
+        query: Query from parse_query()
+
+    Returns:
+        Tuple of (matching documents, BM25 score by path for free-text
+        queries, executed plan stages)
+    """
+    bitmaps = index.bitmaps([str(d) for d in design_dirs])
+    paths, scores, plan = execute_query(query, bitmaps, index)
+    return _documents_for_paths(index, paths), scores, plan
 
 
 def filter_by_status(
-    documents: list[DesignDocument], status: str
+    documents: Iterable[DesignDocument], status: str
 ) -> list[DesignDocument]:
     """Filter documents by status."""
     status = status.lower()
     return [doc for doc in documents if doc.status == status]
 
 
+def order_documents(
+    documents: Iterable[DesignDocument],
+    sort: Optional[str],
+    scores: dict[str, float],
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Iterator[DesignDocument]:
+    """Apply sorting and offset/limit pagination.
+
+    Without a sort key the input order is kept and iteration stops as soon
+    as ``offset + limit`` documents have been taken, so an upstream lazy
+    scan stops early too. With a sort key and a limit, only the best
+    ``offset + limit`` documents are kept in a bounded heap.
+
+    Args:
+        documents: Documents in their natural order
+        sort: None, "modified" (newest first), "title" or "relevance"
+        scores: Relevance scores by path (for "relevance")
+        offset: Documents to skip
+        limit: Maximum documents to return
+
+    Returns:
+        Iterator over the selected documents
+    """
+    stop = offset + limit if limit is not None else None
+    if sort is None:
+        return itertools.islice(documents, offset, stop)
+
+    key: Callable[[DesignDocument], Any]
+    if sort == "title":
+        key = lambda doc: doc.title.casefold()  # noqa: E731
+        reverse = False
+    elif sort == "modified":
+        key = lambda doc: doc.modified or ""  # noqa: E731
+        reverse = True
+    else:
+        key = lambda doc: scores.get(doc.path, 0.0)  # noqa: E731
+        reverse = True
+
+    if stop is None:
+        ordered = sorted(documents, key=key, reverse=reverse)
+    elif reverse:
+        ordered = heapq.nlargest(stop, documents, key=key)
+    else:
+        ordered = heapq.nsmallest(stop, documents, key=key)
+    return iter(ordered[offset:])
+
+
+def result_limit(args: argparse.Namespace) -> Optional[int]:
+    """The --limit in effect; --related defaults to its nearest neighbours."""
+    if args.limit is None and args.related:
+        return DEFAULT_RELATED_LIMIT
+    return args.limit
+
+
 def document_to_dict(doc: DesignDocument) -> dict[str, Any]:
     """Convert DesignDocument to dictionary for JSON output."""
     return {
@@ -300,28 +824,180 @@ def document_to_dict(doc: DesignDocument) -> dict[str, Any]:
         "status": doc.status,
         "created": doc.created,
         "modified": doc.modified,
-        "keywords": doc.keywords,
+        "keywords": list(doc.keywords),
         "summary": doc.summary,
     }
 
 
-def main() -> int:
-    """Main entry point."""
+def duplicate_cluster_to_dict(
+    index: DesignIndex, cluster: list[tuple[str, float]]
+) -> dict[str, Any]:
+    """Convert a near-duplicate cluster to an output dictionary."""
+    documents = []
+    for path, similarity in cluster:
+        record = index.record(path)
+        if record:
+            documents.append(
+                {**document_to_dict(DesignDocument(**record)), "similarity": similarity}
+            )
+    return {"size": len(documents), "documents": documents}
+
+
+def format_scan_timing(seconds: float, index: Optional[DesignIndex]) -> str:
+    """Describe how long the scan took and how much of the index was reused."""
+    stats: Optional[RefreshStats] = index.last_refresh if index else None
+    if stats is None:
+        return f"Scan: {seconds:.3f}s (no index)"
+    reused = f"reused {stats.reused}"
+    if stats.git_reused:
+        reused += f" ({stats.git_reused} by git blob)"
+    return (
+        f"Scan: {seconds:.3f}s ({stats.mode} index: parsed {stats.parsed}, "
+        f"{reused}, removed {stats.removed})"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line parser shared by the CLI and the daemon."""
     parser = argparse.ArgumentParser(
         description="Search design documents in the project",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
-  %(prog)s --uuid abc123              Search by UUID (partial match)
+  %(prog)s --uuid abc123              Search by UUID prefix
+  %(prog)s --uuid 0003 --uuid-substring  Match anywhere in the UUID
   %(prog)s --keyword authentication   Search by keyword
   %(prog)s --status approved          Filter by status
   %(prog)s --list                     List all design documents
   %(prog)s --keyword auth --status draft  Combined search
+  %(prog)s --text '"token refresh" auth OR login'
+                                      Ranked full-text search of document bodies
+  %(prog)s --text "token refresh" --snippets 2
+                                      Show why each hit matched: up to two
+                                      highlighted passages per document
+  %(prog)s --fuzzy authetication      Typo-tolerant title/keyword/heading search
+  %(prog)s --references-to GUUID-20260901-0003 --transitive
+                                      Everything that depends on a design
+  %(prog)s --duplicates --status approved
+                                      Clusters of near-duplicate approved docs
+  %(prog)s --facets --status approved --limit 0
+                                      Counts by status, type, keyword and month
+                                      of the approved docs, without the docs
+  %(prog)s --related GUUID-20260901-0003 --limit 5
+                                      The five designs closest to a design
+                                      (TF-IDF cosine similarity)
+  %(prog)s --at v1.2 --keyword auth    Search the design docs as of a tag,
+                                      branch or commit (read from git)
+  %(prog)s --history GUUID-20260901-0003 --status approved
+                                      Committed versions of a design in
+                                      which it was approved, newest first
+  %(prog)s --query 'status:approved type:pdr modified>2026-09-01 auth OR login'
+                                      Structured query (fields: status, type,
+                                      uuid, keyword, created, modified)
+  %(prog)s --list --sort modified --limit 10
+                                      Ten most recently modified documents
+  %(prog)s --keyword auth --format ndjson --limit 20 --offset 20
+                                      Second page, streamed one per line
+  %(prog)s --roots-file roots.txt --keyword auth
+                                      Search many projects at once; results
+                                      carry their "root"
+  %(prog)s serve                      Keep the index hot and answer searches
+                                      over a Unix socket (used automatically)
         """,
     )
 
-    parser.add_argument("--uuid", help="Search by UUID (partial match supported)")
+    parser.add_argument("--uuid", help="Search by UUID prefix")
+    parser.add_argument(
+        "--uuid-substring",
+        action="store_true",
+        help="With --uuid, match anywhere in the UUID (linear scan)",
+    )
     parser.add_argument("--keyword", help="Search by keyword in title/summary/keywords")
+    parser.add_argument(
+        "--text",
+        help="Full-text search of document bodies, BM25 ranked "
+        '(terms must all match; supports OR and "quoted phrases")',
+    )
+    parser.add_argument(
+        "--snippets",
+        type=int,
+        default=0,
+        metavar="N",
+        help="With --text or a --query with free text, add up to N highlighted "
+        "passages around the matched terms to each result",
+    )
+    parser.add_argument(
+        "--fuzzy",
+        help="Typo-tolerant search of titles, keywords and headings, ranked "
+        "by trigram similarity",
+    )
+    parser.add_argument(
+        "--fuzzy-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        metavar="F",
+        help=f"Minimum similarity for --fuzzy, 0-1 (default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--references-to",
+        metavar="GUUID",
+        help="Documents that reference this GUUID",
+    )
+    parser.add_argument(
+        "--referenced-by",
+        metavar="GUUID",
+        help="Documents referenced by the document with this GUUID",
+    )
+    parser.add_argument(
+        "--transitive",
+        action="store_true",
+        help="With --references-to/--referenced-by, follow references through "
+        "intermediate documents (results carry their hop count as 'depth')",
+    )
+    parser.add_argument(
+        "--duplicates",
+        action="store_true",
+        help="Group near-duplicate documents (MinHash/LSH); other search "
+        "options narrow the documents considered",
+    )
+    parser.add_argument(
+        "--duplicate-threshold",
+        type=float,
+        default=DEFAULT_DUPLICATE_THRESHOLD,
+        metavar="F",
+        help="Minimum estimated similarity for --duplicates, 0-1 "
+        f"(default: {DEFAULT_DUPLICATE_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--related",
+        metavar="PATH|UUID",
+        help="Documents most similar to this one by TF-IDF cosine similarity, "
+        f"most similar first (default --limit {DEFAULT_RELATED_LIMIT})",
+    )
+    parser.add_argument(
+        "--facets",
+        action="store_true",
+        help="Count the matching documents by status, type folder, keyword "
+        "and month modified (alone: all documents; --limit 0 skips the list)",
+    )
+    parser.add_argument(
+        "--query",
+        help="Structured query combining field predicates and free text, e.g. "
+        "'status:approved type:pdr modified>2026-09-01 auth OR login'",
+    )
+    parser.add_argument(
+        "--at",
+        metavar="REV",
+        help="Search the design documents as committed at a git revision "
+        "instead of the working tree (--uuid, --keyword, --status, --facets "
+        "and --list apply)",
+    )
+    parser.add_argument(
+        "--history",
+        metavar="UUID",
+        help="List every committed version of the document with this UUID, "
+        "newest first, with its commit and change (narrow with --status)",
+    )
     parser.add_argument(
         "--status",
         choices=["draft", "approved", "review", "deprecated", "archived", "unknown"],
@@ -329,74 +1005,931 @@ Examples:
     )
     parser.add_argument("--list", action="store_true", help="List all design documents")
     parser.add_argument(
-        "--project-dir", help="Project directory (default: $CLAUDE_PROJECT_DIR or cwd)"
+        "--project-dir",
+        nargs="+",
+        action="extend",
+        metavar="DIR",
+        help="Project directory (default: $CLAUDE_PROJECT_DIR or cwd); several "
+        "directories are searched together, each with its own index",
+    )
+    parser.add_argument(
+        "--roots-file",
+        type=Path,
+        help="File listing project directories to search, one per line "
+        "(relative paths are relative to the file; # starts a comment)",
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Parse every document instead of using the .eama/design-index cache",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Parse changed documents with N processes (0 = one per CPU; "
+        "small scans always run serially)",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Search in-process even if a search daemon is running",
+    )
+    parser.add_argument(
+        "--sort",
+        choices=["modified", "title", "relevance"],
+        help="Order results (modified: newest first; relevance: needs --text, "
+        "--fuzzy or --query)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        metavar="N",
+        help="Return at most N results (with --no-index, scanning stops once "
+        "enough are found; the index is always refreshed in full)",
+    )
+    parser.add_argument(
+        "--offset",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Skip the first N results (for paging with --limit)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="json: one document (default); ndjson: one result per line, "
+        "streamed, then a summary line",
     )
     parser.add_argument("--json", action="store_true", help="Output as JSON (default)")
     parser.add_argument(
         "--summary", action="store_true", help="Print human-readable summary to stderr"
     )
 
-    args = parser.parse_args()
-
-    # Validate arguments
-    if not any([args.uuid, args.keyword, args.status, args.list]):
+    return parser
+
+
+def validate_args(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> Optional[ParsedQuery]:
+    """Check argument combinations, exiting via parser.error on problems.
+
+    Returns:
+        The parsed --query, if one was given
+    """
+    if not any(
+        [
+            args.uuid,
+            args.keyword,
+            args.text,
+            args.fuzzy,
+            args.references_to,
+            args.referenced_by,
+            args.duplicates,
+            args.related,
+            args.facets,
+            args.query,
+            args.status,
+            args.at,
+            args.history,
+            args.list,
+        ]
+    ):
         parser.error(
-            "At least one search option required: --uuid, --keyword, --status, or --list"
+            "At least one search option required: --uuid, --keyword, --text, "
+            "--fuzzy, --references-to, --referenced-by, --duplicates, --related, "
+            "--facets, --query, --status, --at, --history, or --list"
         )
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or a positive number")
+    if args.limit is not None and args.limit < 0:
+        parser.error("--limit must be 0 or a positive number")
+    if args.offset < 0:
+        parser.error("--offset must be 0 or a positive number")
+    if args.snippets < 0:
+        parser.error("--snippets must be 0 or a positive number")
+    if args.snippets and not (args.text or args.query):
+        parser.error("--snippets requires --text or --query")
+    if args.sort == "relevance" and not (
+        args.text or args.fuzzy or args.related or args.query
+    ):
+        parser.error("--sort relevance requires --text, --fuzzy, --related or --query")
+    index_options = [
+        args.text,
+        args.fuzzy,
+        args.references_to,
+        args.referenced_by,
+        args.duplicates,
+        args.related,
+        args.query,
+    ]
+    if args.no_index and any(index_options):
+        parser.error(
+            "--text, --fuzzy, --references-to, --referenced-by, --duplicates, "
+            "--related and --query require the design index (drop --no-index)"
+        )
+    if args.at and args.history:
+        parser.error("--history already covers every revision; drop --at")
+    if (args.at or args.history) and any(index_options):
+        parser.error(
+            "--at and --history read git objects and cannot be combined with "
+            "--text, --fuzzy, --references-to, --referenced-by, --duplicates, "
+            "--related or --query"
+        )
+    if args.history and (
+        args.uuid or args.keyword or args.facets or args.list or args.sort
+    ):
+        parser.error("--history only combines with --status and paging options")
+    if not 0 < args.duplicate_threshold <= 1:
+        parser.error("--duplicate-threshold must be greater than 0 and at most 1")
+    if args.duplicates and args.sort:
+        parser.error("--duplicates lists clusters largest first; drop --sort")
+    if args.transitive and not (args.references_to or args.referenced_by):
+        parser.error("--transitive requires --references-to or --referenced-by")
+    if not 0 < args.fuzzy_threshold <= 1:
+        parser.error("--fuzzy-threshold must be greater than 0 and at most 1")
+
+    if not args.query:
+        return None
+    try:
+        return parse_query(args.query)
+    except ValueError as e:
+        parser.error(f"Invalid --query: {e}")
+    return None
 
-    # Get project directory
-    if args.project_dir:
-        project_dir = Path(args.project_dir)
-    else:
-        project_dir = get_project_dir()
-
-    if not project_dir.is_dir():
-        print(json.dumps({"error": f"Project directory not found: {project_dir}"}))
-        return 1
 
-    # Scan documents
-    documents = scan_design_documents(project_dir)
+def stream_search(
+    args: argparse.Namespace,
+    query: Optional[ParsedQuery],
+    project_dir: Path,
+    documents: Iterable[DesignDocument],
+    index: Optional[DesignIndex],
+    scan_seconds: float,
+    meta: dict[str, Any],
+) -> Iterator[dict[str, Any]]:
+    """Apply the requested searches, filters and paging, yielding results.
+
+    Documents are pulled from ``documents`` only as they are needed, so an
+    unsorted search with --limit stops reading as soon as the page is full.
+    That saves parsing only with --no-index: on the indexed path,
+    DesignIndex.refresh has already stat()ed every file (and reparsed the
+    changed ones) before the first document is pulled, and paging only
+    skips building DesignDocuments from the records.
+    Once the results are exhausted, ``meta`` holds the remaining output
+    fields (count, total_scanned, project_dir, facets, plan, duplicate_uuids).
+    """
+    meta.clear()
+    documents = iter(documents)
+    first = next(documents, None)
+    if first is None:
+        meta.update({"count": 0, "message": "No design documents found"})
+        return
+
+    scanned = 1
+
+    def counted(docs: Iterator[DesignDocument]) -> Iterator[DesignDocument]:
+        nonlocal scanned
+        for doc in docs:
+            scanned += 1
+            yield doc
+
+    results: Iterable[DesignDocument] = itertools.chain([first], counted(documents))
+    scores: dict[str, float] = {}
+    plan: list[dict[str, Any]] = []
+
+    # Index-driven searches narrow each other; the last one sets the order
+    matched: Optional[set[str]] = None
+
+    def narrow(docs: list[DesignDocument]) -> list[DesignDocument]:
+        nonlocal matched
+        if matched is not None:
+            docs = [doc for doc in docs if doc.path in matched]
+        matched = {doc.path for doc in docs}
+        return docs
+
+    if query and index:
+        query_results, scores, plan = search_by_query(
+            index, find_design_directories(project_dir), query
+        )
+        results = narrow(query_results)
 
-    if not documents:
-        result = {"results": [], "count": 0, "message": "No design documents found"}
-        print(json.dumps(result, indent=2))
-        return 0
+    if args.text and index:
+        text_results, scores = search_by_text(index, args.text)
+        results = narrow(text_results)
 
-    # Apply filters
-    results = documents
+    if args.fuzzy and index:
+        fuzzy_results, scores = search_by_fuzzy(
+            index, args.fuzzy, args.fuzzy_threshold
+        )
+        results = narrow(fuzzy_results)
+
+    if args.related and index:
+        # Only the neighbours on the requested page are needed unless other
+        # selectors narrow them further or another sort order applies
+        related_limit = None
+        narrowed = (
+            args.references_to
+            or args.referenced_by
+            or args.uuid
+            or args.keyword
+            or args.status
+            or args.facets
+            or args.duplicates
+        )
+        page = result_limit(args)
+        if (
+            matched is None
+            and not narrowed
+            and args.sort in (None, "relevance")
+            and page is not None
+        ):
+            related_limit = args.offset + page
+        related_results, scores = search_by_related(
+            index, args.related, project_dir, related_limit
+        )
+        results = narrow(related_results)
+
+    depths: dict[str, int] = {}
+    if (args.references_to or args.referenced_by) and index:
+        ref_results, depths = search_by_references(
+            index,
+            references_to=args.references_to,
+            referenced_by=args.referenced_by,
+            transitive=args.transitive,
+        )
+        results = narrow(ref_results)
 
     if args.uuid:
-        results = search_by_uuid(results, args.uuid)
+        results = filter(
+            uuid_matcher(args.uuid, index=index, substring=args.uuid_substring),
+            results,
+        )
 
     if args.keyword:
-        results = search_by_keyword(results, args.keyword)
+        keyword = args.keyword.lower()
+        results = (doc for doc in results if keyword_matches(doc, keyword))
 
     if args.status:
-        results = filter_by_status(results, args.status)
-
-    # Output results
-    output = {
-        "results": [document_to_dict(doc) for doc in results],
-        "count": len(results),
-        "total_scanned": len(documents),
-        "project_dir": str(project_dir),
-    }
+        results = (doc for doc in results if doc.status == args.status)
+
+    # Facets count every match, so paging cannot stop the scan early
+    facets: Optional[dict[str, dict[str, int]]] = None
+    if args.facets:
+        results = list(results)
+        bitmaps = DocumentBitmaps(
+            [document_to_dict(doc) for doc in results],
+            [str(d) for d in find_design_directories(project_dir)],
+        )
+        facets = bitmaps.facets()
 
+    if args.duplicates and index:
+        clusters = index.duplicate_clusters(
+            [doc.path for doc in results], args.duplicate_threshold
+        )
+        stop = args.offset + args.limit if args.limit is not None else None
+        count = 0
+        for cluster in itertools.islice(clusters, args.offset, stop):
+            count += 1
+            yield duplicate_cluster_to_dict(index, cluster)
+        meta["count"] = count
+        meta["total_clusters"] = len(clusters)
+        meta["total_scanned"] = index.record_count()
+        meta["project_dir"] = str(project_dir)
+        if facets is not None:
+            meta["facets"] = facets
+        return
+
+    text_clauses: list[list[list[str]]] = []
+    if args.snippets and index:
+        text_clauses = parse_text_query(args.text or "")
+        if query:
+            text_clauses += query.text_clauses
+
+    count = 0
+    limit = result_limit(args)
+    for doc in order_documents(results, args.sort, scores, args.offset, limit):
+        count += 1
+        result = document_to_dict(doc)
+        if scores:
+            result["score"] = round(scores[doc.path], 4)
+        if depths:
+            result["depth"] = depths[doc.path]
+        if text_clauses and index:
+            result["snippets"] = index.load_fulltext().snippets(
+                doc.path, text_clauses, args.snippets
+            )
+        yield result
+
+    meta["count"] = count
+    meta["total_scanned"] = index.record_count() if index else scanned
+    meta["project_dir"] = str(project_dir)
+    if facets is not None:
+        meta["facets"] = facets
+    if query:
+        meta["plan"] = {
+            "scan_ms": round(scan_seconds * 1000, 3),
+            "stages": plan,
+        }
+    duplicates = index.duplicate_uuids() if index else {}
+    if duplicates:
+        meta["duplicate_uuids"] = duplicates
+
+
+def search_documents(
+    args: argparse.Namespace,
+    query: Optional[ParsedQuery],
+    project_dir: Path,
+    documents: Iterable[DesignDocument],
+    index: Optional[DesignIndex],
+    scan_seconds: float,
+) -> dict[str, Any]:
+    """Apply the requested searches and filters and build the JSON output."""
+    meta: dict[str, Any] = {}
+    results = list(
+        stream_search(args, query, project_dir, documents, index, scan_seconds, meta)
+    )
+    return {"results": results, **meta}
+
+
+def design_history(project_dir: Path) -> DesignHistory:
+    """Git history reader for the project's configured design directories.
+
+    Include patterns become git pathspecs and exclude patterns still apply;
+    .gitignore does not, since only committed files are read.
+    """
+    config = load_walk_config(project_dir)
+    excludes = parse_ignore_lines(config.exclude)
+
+    def is_excluded(rel: str) -> bool:
+        parts = rel.split("/")
+        return is_ignored(rel, False, excludes) or any(
+            is_ignored("/".join(parts[:depth]), True, excludes)
+            for depth in range(1, len(parts))
+        )
+
+    pathspecs = [p.strip("/") for p in config.include if p.strip("/")]
+    return DesignHistory(
+        project_dir,
+        pathspecs,
+        _parse_record,
+        project_dir / DEFAULT_INDEX_DIR,
+        is_excluded,
+    )
+
+
+def stream_history(
+    args: argparse.Namespace,
+    query: Optional[ParsedQuery],
+    project_dir: Path,
+    history: DesignHistory,
+    meta: dict[str, Any],
+) -> Iterator[dict[str, Any]]:
+    """Search a past revision (--at) or list a document's versions (--history).
+
+    Git is queried before the first result is yielded, so a GitError is
+    raised before any output is produced.
+
+    Raises:
+        GitError: If the project is not in a git work tree or the revision
+            is unknown
+    """
+    start = time.perf_counter()
+    if args.at:
+        revision = history.resolve(args.at)
+        records = history.documents_at(revision)
+        documents = (DesignDocument(**record) for record in records)
+        yield from stream_search(
+            args,
+            query,
+            project_dir,
+            documents,
+            None,
+            time.perf_counter() - start,
+            meta,
+        )
+        meta["revision"] = {
+            "rev": args.at,
+            "commit": revision.commit,
+            "date": revision.date,
+        }
+        return
+
+    meta.clear()
+    versions = history.versions(args.history)
+    total = len(versions)
+    if args.status:
+        versions = [v for v in versions if v["status"] == args.status]
+    stop = args.offset + args.limit if args.limit is not None else None
+    count = 0
+    for version in itertools.islice(versions, args.offset, stop):
+        count += 1
+        yield version
+    meta["count"] = count
+    meta["total_versions"] = total
+    meta["uuid"] = args.history
+    meta["project_dir"] = str(project_dir)
+
+
+def format_history_timing(seconds: float, history: DesignHistory) -> str:
+    """Describe how long reading git history took and what was parsed."""
+    return (
+        f"History: {seconds:.3f}s (git objects: parsed {history.parsed} new "
+        "blobs, the rest cached by blob SHA)"
+    )
+
+
+def write_output(
+    results: Iterable[dict[str, Any]], meta: dict[str, Any], output_format: str
+) -> dict[str, Any]:
+    """Print search output to stdout.
+
+    ``json`` prints one document once all results are known. ``ndjson``
+    prints each result on its own line as soon as it is produced, followed
+    by a final ``{"summary": {...}}`` line with the remaining fields; the
+    results are not kept, and ``meta["count"]`` says how many were printed.
+
+    Args:
+        results: Result dictionaries (possibly a lazy stream)
+        meta: Remaining output fields, complete once results are exhausted
+        output_format: "json" or "ndjson"
+
+    Returns:
+        The output dictionary, without "results" for ndjson
+    """
+    if output_format == "ndjson":
+        for result in results:
+            print(json.dumps(result), flush=True)
+        print(json.dumps({"summary": meta}))
+        return dict(meta)
+
+    output = {"results": list(results), **meta}
     print(json.dumps(output, indent=2))
+    return output
+
+
+def print_facets(facets: dict[str, dict[str, int]], top: int = 10) -> None:
+    """Print the most frequent values (latest months) of each facet to stderr."""
+    for name, counts in facets.items():
+        if not counts:
+            continue
+        values = list(counts.items())
+        shown_values = values[-top:] if name == "month" else values[:top]
+        shown = ", ".join(f"{value} ({count})" for value, count in shown_values)
+        more = f", ... {len(values) - top} more" if len(values) > top else ""
+        print(f"  {name}: {shown}{more}", file=sys.stderr)
+
+
+def print_summary(output: dict[str, Any], timing: str) -> None:
+    """Print a human-readable summary of the search output to stderr.
+
+    Results are listed only when the output holds them (json); ndjson
+    results were printed as they were produced, so only counts are shown.
+    """
+    results = output.get("results", [])
+    found = output.get("count", len(results))
+    print("\n--- Design Search Results ---", file=sys.stderr)
+    if "facets" in output:
+        print("Facets:", file=sys.stderr)
+        print_facets(output["facets"])
+    if "total_clusters" in output:
+        print(
+            f"Found: {output['total_clusters']} duplicate clusters in "
+            f"{output.get('total_scanned', 0)} documents",
+            file=sys.stderr,
+        )
+        print(timing, file=sys.stderr)
+        for cluster in results:
+            print(f"  Cluster of {cluster['size']}:", file=sys.stderr)
+            for doc in cluster["documents"]:
+                print(
+                    f"    {doc['similarity']:.2f}  {doc['path']}", file=sys.stderr
+                )
+        print(file=sys.stderr)
+        return
+
+    if "total_versions" in output:
+        print(
+            f"Found: {found} of {output['total_versions']} versions",
+            file=sys.stderr,
+        )
+    else:
+        print(
+            f"Found: {found} of {output.get('total_scanned', 0)} documents",
+            file=sys.stderr,
+        )
+    print(timing, file=sys.stderr)
+    for doc in results:
+        status_icon = {"approved": "[+]", "draft": "[.]", "deprecated": "[-]"}.get(
+            doc["status"], "[?]"
+        )
+        print(f"  {status_icon} {doc['title']}", file=sys.stderr)
+        print(f"      Path: {doc['path']}", file=sys.stderr)
+        if "commit" in doc:
+            print(
+                f"      Commit: {doc['commit'][:12]} {doc['date']} ({doc['change']})",
+                file=sys.stderr,
+            )
+        if doc["uuid"]:
+            print(f"      UUID: {doc['uuid']}", file=sys.stderr)
+    print(file=sys.stderr)
+
+
+def serve_searches(project_dir: Path, jobs: int) -> int:
+    """Run the search daemon for a project, keeping its index in memory.
+
+    The tree is only rescanned when the watcher reports changes, so a query
+    against an unchanged tree costs just the search itself.
+
+    Args:
+        project_dir: Project to serve
+        jobs: Worker processes for parsing changed documents
+
+    Returns:
+        Process exit code
+    """
+    parser = build_parser()
+    index = DesignIndex(project_dir)
+    scan_seconds = 0.0
+
+    def handle(argv: list[str], changed: bool) -> dict[str, Any]:
+        nonlocal scan_seconds
+        try:
+            args = parser.parse_args(argv)
+            query = validate_args(parser, args)
+        except SystemExit:
+            return {"output": {"error": "Invalid arguments"}, "exit_code": 2}
+
+        if changed:
+            scan_start = time.perf_counter()
+            documents = iter_design_documents(project_dir, index=index, jobs=jobs)
+            scan_seconds = time.perf_counter() - scan_start
+            timing = "Daemon " + format_scan_timing(scan_seconds, index)
+        else:
+            documents = indexed_documents(index)
+            timing = "Daemon scan: skipped (no changes since last query)"
+
+        output = search_documents(
+            args, query, project_dir, documents, index, scan_seconds
+        )
+        return {"output": output, "exit_code": 0, "timing": timing}
+
+    return serve(
+        project_dir,
+        handle,
+        lambda: find_design_directories(project_dir),
+        [project_dir / CONFIG_FILE],
+    )
+
+
+def serve_main(argv: list[str]) -> int:
+    """Entry point for the ``serve`` subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="eama_design_search.py serve",
+        description="Keep the design index in memory and answer searches "
+        "over a Unix socket in the project's .eama directory",
+    )
+    parser.add_argument(
+        "--project-dir", help="Project directory (default: $CLAUDE_PROJECT_DIR or cwd)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Parse changed documents with N processes (0 = one per CPU)",
+    )
+    args = parser.parse_args(argv)
+
+    project_dir = Path(args.project_dir) if args.project_dir else get_project_dir()
+    if not project_dir.is_dir():
+        print(f"Error: Project directory not found: {project_dir}", file=sys.stderr)
+        return 1
+
+    return serve_searches(project_dir, args.jobs)
+
+
+def read_roots_file(path: Path) -> list[Path]:
+    """Read project directories from a roots file.
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    roots = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            root = Path(line).expanduser()
+            roots.append(root if root.is_absolute() else path.parent / root)
+    return roots
+
+
+def project_roots(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> list[Path]:
+    """Project directories to search, in the order given, without repeats."""
+    roots = [Path(d) for d in args.project_dir or []]
+    if args.roots_file:
+        try:
+            roots += read_roots_file(args.roots_file)
+        except (OSError, UnicodeDecodeError) as e:
+            parser.error(f"Cannot read --roots-file: {e}")
+    if not roots:
+        roots = [get_project_dir()]
+    return list(dict.fromkeys(roots))
+
+
+def strip_options(argv: list[str], options: dict[str, int | str]) -> list[str]:
+    """Remove options (and their values) from a command line.
+
+    Args:
+        argv: Command-line arguments
+        options: Option -> number of values, or "+" for all values up to the
+            next option
+
+    Returns:
+        The remaining arguments
+    """
+    kept = []
+    i = 0
+    while i < len(argv):
+        name = argv[i].split("=", 1)[0]
+        if name not in options:
+            kept.append(argv[i])
+            i += 1
+            continue
+
+        i += 1
+        if "=" in argv[i - 1]:
+            continue
+        values = options[name]
+        if values == "+":
+            while i < len(argv) and not argv[i].startswith("-"):
+                i += 1
+        else:
+            i += cast(int, values)
+    return kept
+
+
+def search_shard(argv: list[str], root: str, use_daemon: bool) -> dict[str, Any]:
+    """Search one project root of a federated search.
+
+    Runs in a worker process: the root's daemon answers if one is running,
+    otherwise the root's own index is refreshed and searched in-process.
+
+    Args:
+        argv: Search arguments for this root (including --project-dir root)
+        root: Project directory, as given on the command line
+        use_daemon: Whether to try the root's search daemon first
+
+    Returns:
+        Dictionary with the root and either its "output" and "timing", or
+        an "error"
+    """
+    project_dir = Path(root)
+    if not project_dir.is_dir():
+        return {"root": root, "error": f"Project directory not found: {root}"}
+
+    if use_daemon:
+        response = query_daemon(project_dir, argv)
+        if response is not None and "error" not in response["output"]:
+            return {
+                "root": root,
+                "output": response["output"],
+                "timing": response.get("timing", ""),
+            }
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    query = validate_args(parser, args)
+
+    if args.at or args.history:
+        history = design_history(project_dir)
+        start = time.perf_counter()
+        meta: dict[str, Any] = {}
+        try:
+            results = list(stream_history(args, query, project_dir, history, meta))
+        except GitError as e:
+            return {"root": root, "error": f"git: {e}"}
+        return {
+            "root": root,
+            "output": {"results": results, **meta},
+            "timing": format_history_timing(time.perf_counter() - start, history),
+        }
+
+    index = None if args.no_index else DesignIndex(project_dir)
+    scan_start = time.perf_counter()
+    documents = iter_design_documents(project_dir, index=index, jobs=args.jobs)
+    scan_seconds = time.perf_counter() - scan_start
+    output = search_documents(args, query, project_dir, documents, index, scan_seconds)
+    if index is None:
+        scan_seconds = time.perf_counter() - scan_start
+    return {
+        "root": root,
+        "output": output,
+        "timing": format_scan_timing(scan_seconds, index),
+    }
+
+
+def _fan_out(
+    shard_argvs: list[list[str]], roots: list[str], use_daemon: bool
+) -> list[dict[str, Any]]:
+    """Run search_shard for every root concurrently, keeping root order.
+
+    Shards run in processes when there is more than one CPU (parsing and
+    ranking are CPU bound), otherwise in threads, which still overlap the
+    I/O of daemon queries and index loads.
+    """
+    workers = min(len(roots), FEDERATION_MAX_WORKERS)
+    daemon_flags = [use_daemon] * len(roots)
+
+    executor: Executor
+    if (os.cpu_count() or 1) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(
+                    executor.map(search_shard, shard_argvs, roots, daemon_flags)
+                )
+        except (OSError, BrokenProcessPool):
+            pass
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(search_shard, shard_argvs, roots, daemon_flags))
+
+
+def merge_shards(
+    args: argparse.Namespace, shards: list[dict[str, Any]]
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """Merge per-root outputs into one result list.
+
+    Every result carries the root it came from. A document (or document
+    version) reachable from several roots (nested or symlinked checkouts)
+    is kept once, from the first root listing it. Sorting and paging apply
+    to the merged list. Facet counts are summed over the roots.
+
+    Returns:
+        Tuple of (results, remaining output fields)
+    """
+    results: list[dict[str, Any]] = []
+    seen: set[tuple[str, Optional[str]]] = set()
+    roots_meta = []
+    facets = []
+    total_scanned = 0
+
+    for shard in shards:
+        root = shard["root"]
+        if "error" in shard:
+            roots_meta.append({"root": root, "error": shard["error"]})
+            continue
+
+        output = shard["output"]
+        for result in output.get("results", []):
+            if "path" in result:
+                key = (os.path.realpath(result["path"]), result.get("commit"))
+                if key in seen:
+                    continue
+                seen.add(key)
+            results.append({**result, "root": root})
+
+        shard_meta = {k: v for k, v in output.items() if k != "results"}
+        shard_meta.pop("project_dir", None)
+        if "facets" in shard_meta:
+            facets.append(shard_meta.pop("facets"))
+        roots_meta.append({"root": root, **shard_meta})
+        total_scanned += output.get("total_scanned", 0)
+
+    if args.sort == "title":
+        results.sort(key=lambda r: r["title"].casefold())
+    elif args.sort == "modified":
+        results.sort(key=lambda r: r["modified"] or "", reverse=True)
+    elif args.sort == "relevance":
+        results.sort(key=lambda r: r.get("score", 0.0), reverse=True)
+
+    limit = result_limit(args)
+    stop = args.offset + limit if limit is not None else None
+    results = results[args.offset : stop]
+    meta = {"count": len(results), "total_scanned": total_scanned, "roots": roots_meta}
+    if args.facets:
+        meta["facets"] = merge_facets(facets)
+    return results, meta
+
+
+def federated_main(
+    args: argparse.Namespace, argv: list[str], roots: list[Path]
+) -> int:
+    """Search several project roots concurrently and merge the results.
+
+    Each root is searched with its own design index (or its own daemon);
+    shards return up to offset + limit results so paging stays correct
+    after the merge.
+    """
+    shard_base = strip_options(argv, FEDERATION_OPTIONS)
+    limit = result_limit(args)
+    if limit is not None:
+        shard_base += ["--limit", str(args.offset + limit)]
+
+    root_names = [str(root) for root in roots]
+    shard_argvs = [shard_base + ["--project-dir", root] for root in root_names]
+    use_daemon = not (args.no_index or args.no_daemon or args.at or args.history)
+
+    start = time.perf_counter()
+    shards = _fan_out(shard_argvs, root_names, use_daemon)
+    seconds = time.perf_counter() - start
+
+    results, meta = merge_shards(args, shards)
+    output = write_output(results, meta, args.format)
 
-    # Print summary to stderr if requested
     if args.summary:
-        print("\n--- Design Search Results ---", file=sys.stderr)
-        print(f"Found: {len(results)} of {len(documents)} documents", file=sys.stderr)
-        for doc in results:
-            status_icon = {"approved": "[+]", "draft": "[.]", "deprecated": "[-]"}.get(
-                doc.status, "[?]"
+        timing = "\n".join(
+            f"  {shard['root']}: {shard.get('timing') or shard.get('error')}"
+            for shard in shards
+        )
+        print_summary(
+            output, f"Federated search of {len(roots)} roots: {seconds:.3f}s\n{timing}"
+        )
+
+    ok = any("error" not in shard for shard in shards)
+    return 0 if ok else 1
+
+
+def history_main(
+    args: argparse.Namespace, query: Optional[ParsedQuery], project_dir: Path
+) -> int:
+    """Run an --at or --history search and print its output."""
+    history = design_history(project_dir)
+    start = time.perf_counter()
+    meta: dict[str, Any] = {}
+    try:
+        output = write_output(
+            stream_history(args, query, project_dir, history, meta),
+            meta,
+            args.format,
+        )
+    except GitError as e:
+        print(json.dumps({"error": f"git: {e}"}))
+        return 1
+
+    if args.summary and "message" not in output:
+        print_summary(
+            output, format_history_timing(time.perf_counter() - start, history)
+        )
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Main entry point."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["serve"]:
+        return serve_main(argv[1:])
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    query = validate_args(parser, args)
+
+    roots = project_roots(parser, args)
+    if len(roots) > 1:
+        return federated_main(args, argv, roots)
+
+    project_dir = roots[0]
+    if not project_dir.is_dir():
+        print(json.dumps({"error": f"Project directory not found: {project_dir}"}))
+        return 1
+
+    # Past revisions are read from git objects, never from the daemon
+    if args.at or args.history:
+        return history_main(args, query, project_dir)
+
+    # A running daemon answers with the same output, minus the startup cost
+    if not args.no_index and not args.no_daemon:
+        response = query_daemon(project_dir, argv)
+        if response is not None:
+            daemon_output = response["output"]
+            output = write_output(
+                daemon_output.pop("results", []), daemon_output, args.format
             )
-            print(f"  {status_icon} {doc.title}", file=sys.stderr)
-            print(f"      Path: {doc.path}", file=sys.stderr)
-            if doc.uuid:
-                print(f"      UUID: {doc.uuid}", file=sys.stderr)
-        print(file=sys.stderr)
+            if args.summary:
+                print_summary(output, response.get("timing", ""))
+            return int(response.get("exit_code", 0))
+
+    # Scan documents; without an index they are parsed as results are consumed
+    index = None if args.no_index else DesignIndex(project_dir)
+    scan_start = time.perf_counter()
+    documents = iter_design_documents(project_dir, index=index, jobs=args.jobs)
+    scan_seconds = time.perf_counter() - scan_start
+
+    meta: dict[str, Any] = {}
+    results = stream_search(
+        args, query, project_dir, documents, index, scan_seconds, meta
+    )
+    output = write_output(results, meta, args.format)
+
+    # Print summary to stderr if requested
+    if args.summary and "message" not in output:
+        if index is None:
+            scan_seconds = time.perf_counter() - scan_start
+        print_summary(output, format_scan_timing(scan_seconds, index))
 
     return 0
 
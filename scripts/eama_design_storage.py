@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+eama_design_storage.py - Atomic JSON writes for the design search caches.
+
+Every cache under .eama/ (the document index and its derived tables, the
+blob cache, the validation cache) is rewritten whole. Each write goes to a
+uniquely named temporary file in the target directory and is then renamed
+over the target, so readers never see a partial file and concurrent writers
+(a daemon and a CLI run, two hooks) never interleave in a shared temp file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+__all__ = [
+    "write_json",
+]
+
+# NamedTemporaryFile creates files 0600; caches are made readable like
+# other files, with the process umask applied when it can be read
+FILE_MODE = 0o644
+
+_file_mode: Optional[int] = None
+_file_mode_lock = threading.Lock()
+
+
+def _cache_file_mode() -> int:
+    """FILE_MODE with the umask applied, read once on first use.
+
+    The umask is read from /proc/self/status rather than by setting it,
+    which would briefly change the mode of files other threads create.
+    Where it cannot be read, FILE_MODE is used as is.
+    """
+    global _file_mode
+    with _file_mode_lock:
+        if _file_mode is None:
+            umask = 0
+            try:
+                with open("/proc/self/status", encoding="ascii") as status:
+                    for line in status:
+                        if line.startswith("Umask:"):
+                            umask = int(line.split()[1], 8)
+                            break
+            except (OSError, ValueError, IndexError):
+                pass
+            _file_mode = FILE_MODE & ~umask
+        return _file_mode
+
+
+def write_json(path: Path, data: Any) -> bool:
+    """Serialize data to path atomically.
+
+    Args:
+        path: Destination file; its directory is created if missing
+        data: JSON-serializable value
+
+    Returns:
+        True if the file was written
+    """
+    tmp_name: Optional[str] = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=path.parent,
+            prefix=f".{path.name}.",
+            suffix=".tmp",
+            delete=False,
+        ) as tmp:
+            tmp_name = tmp.name
+            tmp.write(json.dumps(data))
+        os.chmod(tmp_name, _cache_file_mode())
+        os.replace(tmp_name, path)
+    except OSError:
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+        return False
+    return True
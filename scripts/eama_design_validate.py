@@ -8,11 +8,30 @@ This script validates design documents for the emasoft-assistant-manager-agent:
 3. Valid status enum values
 4. Date format compliance (YYYY-MM-DD)
 5. Document type consistency with folder location
+6. GUUID uniqueness across all documents (with --all), plus per-day sequence
+   gaps and the next free GUUID
 
 Usage:
     python eama_design_validate.py design/pdr/auth-system.md
     python eama_design_validate.py --all
     python eama_design_validate.py --type pdr
+    python eama_design_validate.py --all --no-cache
+    python eama_design_validate.py --all --jobs 0 --fail-fast --format ndjson
+    python eama_design_validate.py --staged
+
+With --all, results are cached in .eama/design-validation.json next to the
+design directory, keyed by a hash of each document's frontmatter bytes and
+the validation rules version, so only documents whose frontmatter changed
+are validated again. Unchanged size and mtime skip even the hash.
+
+Only the frontmatter of a document is read: reading stops at the closing
+'---' delimiter, or after --max-frontmatter-bytes (64 KiB by default).
+
+With --staged, only the design documents added or changed in the git index
+are validated, using their staged content rather than the working tree.
+
+With --format ndjson, each result is printed on its own line as soon as it
+is known, followed by a line with the overall "valid" flag and summary.
 
 Output Format (JSON):
     {
@@ -24,11 +43,202 @@ Output Format (JSON):
 """
 
 import argparse
+import hashlib
+import io
 import json
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from eama_design_history import GitError, cat_blobs, run_git
+from eama_design_storage import write_json
+
+# Cache location, relative to the parent of the design directory
+DEFAULT_CACHE_FILE = Path(".eama") / "design-validation.json"
+
+# Bump whenever the cache layout changes
+CACHE_VERSION = 3
+
+# Frontmatter is only looked for in this many leading bytes of a document
+FRONTMATTER_MAX_BYTES = 64 * 1024
+
+# Highest sequence number a GUUID-YYYYMMDD-NNNN can carry
+MAX_SEQUENCE = 9999
+
+# With --jobs, fewer documents than this are still validated serially
+PARALLEL_MIN_FILES = 200
+
+# Upper bound on the documents handed to a worker process per task
+PARALLEL_CHUNK_SIZE = 64
+
+
+def content_hash(data: bytes) -> str:
+    """Hash identifying a document's content in the validation cache."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _stat_key(st: os.stat_result) -> List[int]:
+    """Stat information that lets the cache skip reading a document."""
+    return [st.st_mtime_ns, st.st_size]
+
+
+class ValidationCache:
+    """Validation results keyed by document path, content hash and rules."""
+
+    def __init__(self, path: Path, rules_version: str):
+        """Initialize an empty cache bound to a JSON file.
+
+        Args:
+            path: Location of the persisted cache
+            rules_version: Version of the rules and settings that produced
+                the results
+        """
+        self.path = path
+        self.rules_version = rules_version
+        # relative path -> {"stat", "hash" of the frontmatter bytes, "result",
+        # "frontmatter"}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.changed = False
+        self.reused = 0
+        self.validated = 0
+
+    def load(self) -> bool:
+        """Load entries from disk.
+
+        Returns:
+            True if results of the current rules were loaded
+        """
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != CACHE_VERSION
+            or data.get("rules") != self.rules_version
+        ):
+            return False
+
+        self.entries = data["entries"]
+        return True
+
+    def save(self) -> bool:
+        """Write entries to disk atomically, if any changed.
+
+        Returns:
+            True if the cache is up to date on disk
+        """
+        if not self.changed:
+            return True
+        data = {
+            "version": CACHE_VERSION,
+            "rules": self.rules_version,
+            "entries": self.entries,
+        }
+        if not write_json(self.path, data):
+            return False
+        self.changed = False
+        return True
+
+    def peek(self, key: str, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Cached entry of a document whose stat information is unchanged.
+
+        Unlike lookup(), a changed document is never read.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        try:
+            st = file_path.stat()
+        except OSError:
+            return None
+        if entry["stat"] != _stat_key(st):
+            return None
+        return entry
+
+    def lookup(
+        self, key: str, file_path: Path, digest_of: Callable[[Path], str]
+    ) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """Find the cached entry of a document.
+
+        Unchanged size and mtime reuse the entry without reading the file;
+        otherwise the hash of the bytes validation depends on decides.
+
+        Args:
+            key: Document path relative to the design root
+            file_path: Document location
+            digest_of: Callable hashing the document's frontmatter bytes
+
+        Returns:
+            Tuple of (entry with "result" and "frontmatter", or None; state
+            to pass to store())
+        """
+        try:
+            st = file_path.stat()
+        except OSError:
+            return None, None
+        stat = _stat_key(st)
+
+        entry = self.entries.get(key)
+        if entry is not None and entry["stat"] == stat:
+            self.reused += 1
+            return entry, None
+
+        try:
+            digest = digest_of(file_path)
+        except OSError:
+            return None, None
+        if entry is not None and entry["hash"] == digest:
+            entry["stat"] = stat
+            self.changed = True
+            self.reused += 1
+            return entry, None
+        return None, (stat, digest)
+
+    def store(
+        self,
+        key: str,
+        state: Any,
+        result: Dict[str, Any],
+        frontmatter: Optional[Dict[str, Any]],
+    ) -> None:
+        """Remember a fresh result, given the state returned by lookup()."""
+        self.validated += 1
+        if state is None:
+            return
+        stat, digest = state
+        self.entries[key] = {
+            "stat": stat,
+            "hash": digest,
+            "result": result,
+            "frontmatter": frontmatter,
+        }
+        self.changed = True
+
+    def prune(self, prefix: str, keep: set) -> None:
+        """Drop the entries below a relative directory that are not kept."""
+        stale = [
+            key for key in self.entries if key.startswith(prefix) and key not in keep
+        ]
+        for key in stale:
+            del self.entries[key]
+        self.changed = self.changed or bool(stale)
 
 
 class DesignDocumentValidator:
@@ -56,21 +266,102 @@ class DesignDocumentValidator:
     # Date format: YYYY-MM-DD
     DATE_PATTERN = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
 
-    def __init__(self, design_root: Path):
+    # Bump whenever a rule or message changes, so cached results are redone
+    RULES_VERSION = 2
+
+    def __init__(
+        self,
+        design_root: Path,
+        use_cache: bool = True,
+        cache_path: Optional[Path] = None,
+        max_frontmatter_bytes: int = FRONTMATTER_MAX_BYTES,
+    ):
         """Initialize validator with design root directory.
 
         Args:
             design_root: Path to the design/ directory
+            use_cache: Reuse cached results of unchanged documents in
+                validate_all()
+            cache_path: Cache file (default: DEFAULT_CACHE_FILE next to the
+                design directory)
+            max_frontmatter_bytes: Bytes read at most while looking for the
+                closing frontmatter delimiter
         """
         self.design_root = design_root
+        self.max_frontmatter_bytes = max_frontmatter_bytes
+        self._root_len = len(str(design_root / "_")) - 1
+        self.cache: Optional[ValidationCache] = None
+        if use_cache:
+            self.cache = ValidationCache(
+                cache_path or design_root.parent / DEFAULT_CACHE_FILE,
+                f"{self.RULES_VERSION}/{max_frontmatter_bytes}",
+            )
+
+    def _read_frontmatter_lines(
+        self, f: BinaryIO
+    ) -> Tuple[List[str], Optional[int], bool]:
+        """Read lines up to the closing frontmatter delimiter.
+
+        Reading stops after the opening line if it is not a delimiter, at
+        the closing delimiter, or after max_frontmatter_bytes bytes, so the
+        body is never decoded. Lines split as in universal newlines mode.
+
+        Args:
+            f: Binary stream positioned at the start of the document
+
+        Returns:
+            Tuple of (lines read, line number of the closing delimiter or
+            None, whether the byte cap was reached)
+        """
+        lines: List[str] = []
+        header = b""
+        budget = self.max_frontmatter_bytes
+        while budget > 0:
+            raw = f.readline(budget)
+            if not raw:
+                return lines, None, False
+            budget -= len(raw)
+            if budget == 0 and not raw.endswith(b"\n") and f.read(1):
+                return lines, None, True
+
+            header += raw
+            try:
+                text = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                # Report the position within the document, not the line
+                header.decode("utf-8")
+                raise
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+            for line in text.split("\n")[: -1 if text.endswith("\n") else None]:
+                lines.append(line)
+                if len(lines) == 1:
+                    if line.strip() != "---":
+                        return lines, None, False
+                elif line.strip() == "---":
+                    return lines, len(lines), False
+        return lines, None, bool(f.read(1))
+
+    def _header_hash(self, file_path: Path) -> str:
+        """Hash of the leading bytes of a document that validation reads."""
+        with file_path.open("rb") as f:
+            try:
+                self._read_frontmatter_lines(f)
+            except UnicodeDecodeError:
+                # Validation reports the error from the same bytes
+                pass
+            size = f.tell()
+            f.seek(0)
+            return content_hash(f.read(size))
 
     def parse_frontmatter(
-        self, file_path: Path
+        self, file_path: Path, data: Optional[bytes] = None
     ) -> Tuple[Optional[Dict[str, Any]], int, List[str]]:
         """Parse YAML frontmatter from a markdown file with line tracking.
 
         Args:
             file_path: Path to the markdown file
+            data: Content to parse instead of reading the file (e.g. a
+                staged blob)
 
         Returns:
             Tuple of (frontmatter dict, end line number, parse errors)
@@ -78,26 +369,23 @@ class DesignDocumentValidator:
         parse_errors: List[str] = []
 
         try:
-            content = file_path.read_text(encoding="utf-8")
+            with file_path.open("rb") if data is None else io.BytesIO(data) as f:
+                lines, end_idx, capped = self._read_frontmatter_lines(f)
         except OSError as e:
             return None, 0, [f"Line 1: Cannot read file: {e}"]
         except UnicodeDecodeError as e:
             return None, 0, [f"Line 1: File encoding error: {e}"]
 
-        lines = content.split("\n")
-
         # Check for opening delimiter
         if not lines or lines[0].strip() != "---":
             return None, 0, ["Line 1: Missing frontmatter opening delimiter '---'"]
 
-        # Find closing delimiter
-        end_idx = None
-        for i, line in enumerate(lines[1:], start=2):
-            if line.strip() == "---":
-                end_idx = i
-                break
-
         if end_idx is None:
+            if capped:
+                return None, 0, [
+                    "Frontmatter: Missing closing delimiter '---' within the "
+                    f"first {self.max_frontmatter_bytes} bytes"
+                ]
             return None, 0, ["Frontmatter: Missing closing delimiter '---'"]
 
         # Parse frontmatter
@@ -204,17 +492,34 @@ class DesignDocumentValidator:
         Returns:
             Validation result dictionary
         """
+        return self.check_file(file_path)[0]
+
+    def check_file(
+        self, file_path: Path, data: Optional[bytes] = None
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Validate a single design document, keeping its frontmatter.
+
+        Args:
+            file_path: Path to the document to validate
+            data: Content to validate instead of the file's (the path is
+                then only used for messages and the folder type check)
+
+        Returns:
+            Tuple of (validation result dictionary, parsed frontmatter or
+            None if it could not be parsed)
+        """
         errors: List[str] = []
         warnings: List[str] = []
 
         # Check file exists
-        if not file_path.exists():
-            return {
+        if data is None and not file_path.exists():
+            result = {
                 "valid": False,
                 "file_path": str(file_path),
                 "errors": [f"File not found: {file_path}"],
                 "warnings": [],
             }
+            return result, None
 
         # Check file extension
         if file_path.suffix != ".md":
@@ -223,16 +528,17 @@ class DesignDocumentValidator:
             )
 
         # Parse frontmatter
-        frontmatter, end_line, parse_errors = self.parse_frontmatter(file_path)
+        frontmatter, end_line, parse_errors = self.parse_frontmatter(file_path, data)
         errors.extend(parse_errors)
 
         if frontmatter is None:
-            return {
+            result = {
                 "valid": False,
                 "file_path": str(file_path),
                 "errors": errors,
                 "warnings": warnings,
             }
+            return result, None
 
         # Check required fields
         for field in self.REQUIRED_FIELDS:
@@ -290,30 +596,240 @@ class DesignDocumentValidator:
             if field not in frontmatter:
                 warnings.append(f"Frontmatter: Missing recommended field '{field}'")
 
-        # Compute relative path for output
+        result = {
+            "valid": len(errors) == 0,
+            "file_path": self._result_path(file_path),
+            "errors": errors,
+            "warnings": warnings,
+        }
+        del frontmatter["_file_path"]
+        return result, frontmatter
+
+    def _result_path(self, file_path: Path) -> str:
+        """Path of a document as reported in results (relative if possible)."""
         try:
-            relative_path = file_path.relative_to(self.design_root.parent)
+            return str(file_path.relative_to(self.design_root.parent))
         except ValueError:
-            relative_path = file_path
+            return str(file_path)
+
+    @staticmethod
+    def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the overall output for a list of per-document results."""
+        total_errors = sum(len(r["errors"]) for r in results)
+        total_warnings = sum(len(r["warnings"]) for r in results)
+        valid_count = sum(1 for r in results if r["valid"])
 
         return {
-            "valid": len(errors) == 0,
-            "file_path": str(relative_path),
-            "errors": errors,
-            "warnings": warnings,
+            "valid": total_errors == 0,
+            "results": results,
+            "summary": {
+                "total": len(results),
+                "valid": valid_count,
+                "invalid": len(results) - valid_count,
+                "total_errors": total_errors,
+                "total_warnings": total_warnings,
+            },
         }
 
-    def validate_all(self, doc_type: Optional[str] = None) -> Dict[str, Any]:
+    def staged_documents(self) -> List[Tuple[Path, Optional[bytes]]]:
+        """Staged contents of the design documents added or changed in git.
+
+        The staged blobs are listed with ``git diff --cached`` and read with
+        one ``git cat-file --batch`` call, so neither the working tree nor
+        the unchanged documents are touched.
+
+        Returns:
+            (path, staged content or None if unreadable) tuples in path order
+
+        Raises:
+            GitError: If the design root is not in a git work tree
+        """
+        # Outside a work tree, git diff would silently turn into --no-index
+        run_git(self.design_root, ["rev-parse", "--git-dir"])
+        out = run_git(
+            self.design_root,
+            [
+                "diff",
+                "--cached",
+                "--relative",
+                "--raw",
+                "-z",
+                "--no-abbrev",
+                "--no-renames",
+                "--diff-filter=AMT",
+                "--",
+                ".",
+            ],
+        )
+        staged: List[Tuple[str, str]] = []
+        fields = out.decode("utf-8", errors="surrogateescape").split("\0")
+        for i in range(0, len(fields) - 1, 2):
+            raw = fields[i].split()
+            rel = fields[i + 1]
+            # Regular files only: no symlinks or submodules
+            if len(raw) == 5 and raw[1].startswith("100") and rel.endswith(".md"):
+                staged.append((rel, raw[3]))
+
+        blobs = cat_blobs(self.design_root, [sha for _, sha in staged])
+        return [(self.design_root / rel, blobs[sha]) for rel, sha in sorted(staged)]
+
+    def validate_staged(self) -> Dict[str, Any]:
+        """Validate the staged versions of added or changed design documents.
+
+        Cost depends on the size of the change only, not of the corpus, so
+        corpus-wide rules (GUUID uniqueness) are left to validate_all().
+
+        Returns:
+            Summary of validation results, sorted by path
+
+        Raises:
+            GitError: If the design root is not in a git work tree
+        """
+        results: List[Dict[str, Any]] = []
+        for file_path, data in self.staged_documents():
+            if data is None:
+                results.append(
+                    {
+                        "valid": False,
+                        "file_path": str(file_path),
+                        "errors": ["Line 1: Cannot read staged content"],
+                        "warnings": [],
+                    }
+                )
+                continue
+            results.append(self.check_file(file_path, data)[0])
+        return self.summarize(results)
+
+    def _cache_key(self, file_path: Path) -> str:
+        """Cache key of a document found by globbing the design root."""
+        # glob() yields paths below design_root, so keys are plain suffixes
+        return str(file_path)[self._root_len :].replace(os.sep, "/")
+
+    def iter_results(
+        self, files: List[Path], jobs: int = 1
+    ) -> Generator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]], None, None]:
+        """Validate documents, yielding each result as soon as it is known.
+
+        Cached results of unchanged documents are yielded first. With
+        ``jobs`` > 1 and at least PARALLEL_MIN_FILES documents left to
+        validate, those are split into chunks over a process pool and
+        yielded in completion order; otherwise they follow in input order.
+        Closing the iterator early cancels the chunks not yet started.
+
+        Args:
+            files: Documents below the design root
+            jobs: Worker processes to use (0 means one per CPU)
+
+        Yields:
+            Tuples of (validation result, frontmatter) as from check_file()
+        """
+        cache = self.cache
+        if cache is not None:
+            cache.load()
+            cache.reused = cache.validated = 0
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+        parallel = jobs > 1 and len(files) >= PARALLEL_MIN_FILES
+
+        # (file, cache key, cache state) of documents left for the pool
+        pending: List[Tuple[Path, str, Any]] = []
+        try:
+            for file_path in files:
+                key, state = "", None
+                if cache is not None:
+                    key = self._cache_key(file_path)
+                    entry, state = cache.lookup(key, file_path, self._header_hash)
+                    if entry is not None:
+                        yield entry["result"], entry["frontmatter"]
+                        continue
+                if parallel:
+                    pending.append((file_path, key, state))
+                    continue
+                result, frontmatter = self.check_file(file_path)
+                if cache is not None:
+                    cache.store(key, state, result, frontmatter)
+                yield result, frontmatter
+
+            if len(pending) < PARALLEL_MIN_FILES:
+                jobs = 1
+            yield from self._validate_pending(pending, jobs)
+        finally:
+            if cache is not None:
+                cache.save()
+
+    def _validate_pending(
+        self, pending: List[Tuple[Path, str, Any]], jobs: int
+    ) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """Validate documents missing from the cache, in processes if jobs > 1."""
+        chunksize = max(1, min(PARALLEL_CHUNK_SIZE, len(pending) // (jobs * 4)))
+        chunks = [
+            pending[i : i + chunksize] for i in range(0, len(pending), chunksize)
+        ]
+        done = [False] * len(chunks)
+
+        if jobs > 1:
+            try:
+                pool = ProcessPoolExecutor(max_workers=jobs)
+            except OSError:
+                pool = None
+            if pool is not None:
+                try:
+                    futures = {
+                        pool.submit(
+                            _validate_chunk,
+                            type(self),
+                            self.design_root,
+                            self.max_frontmatter_bytes,
+                            [file_path for file_path, _, _ in chunk],
+                        ): i
+                        for i, chunk in enumerate(chunks)
+                    }
+                    for future in as_completed(futures):
+                        i = futures[future]
+                        checked = future.result()
+                        done[i] = True
+                        for (_, key, state), (result, frontmatter) in zip(
+                            chunks[i], checked
+                        ):
+                            if self.cache is not None:
+                                self.cache.store(key, state, result, frontmatter)
+                            yield result, frontmatter
+                except BrokenProcessPool:
+                    pass
+                finally:
+                    pool.shutdown(cancel_futures=True)
+
+        # Serial run, or what a broken pool left over
+        for i, chunk in enumerate(chunks):
+            if done[i]:
+                continue
+            for file_path, key, state in chunk:
+                result, frontmatter = self.check_file(file_path)
+                if self.cache is not None:
+                    self.cache.store(key, state, result, frontmatter)
+                yield result, frontmatter
+
+    def validate_all(
+        self,
+        doc_type: Optional[str] = None,
+        jobs: int = 1,
+        fail_fast: bool = False,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
         """Validate all design documents.
 
         Args:
             doc_type: Optional type filter
+            jobs: Worker processes to validate with (0 means one per CPU)
+            fail_fast: Stop at the first invalid document, cancelling the
+                work not yet started
+            on_result: Called with each result as soon as it is known, and
+                once more with ``"corrected": True`` for every result that
+                corpus-wide checks (duplicate GUUIDs) turned invalid
 
         Returns:
-            Summary of validation results
+            Summary of validation results, sorted by path
         """
-        results: List[Dict[str, Any]] = []
-
         # Find files to validate
         if doc_type:
             type_dir = self.design_root / doc_type
@@ -330,33 +846,204 @@ class DesignDocumentValidator:
                     },
                     "error": f"Type directory not found: {type_dir}",
                 }
-            files = list(type_dir.glob("**/*.md"))
+            files = sorted(type_dir.glob("**/*.md"), key=str)
         else:
-            files = list(self.design_root.glob("**/*.md"))
+            files = sorted(self.design_root.glob("**/*.md"), key=str)
 
-        # Validate each file
-        for file_path in files:
-            result = self.validate_file(file_path)
-            results.append(result)
+        # Validate each file, reusing cached results of unchanged ones
+        results: List[Dict[str, Any]] = []
+        guuids = GuuidIndex()
+        stream = self.iter_results(files, jobs=jobs)
+        try:
+            for result, frontmatter in stream:
+                results.append(result)
+                if frontmatter is not None and "uuid" in frontmatter:
+                    guuids.add(
+                        frontmatter["uuid"],
+                        result["file_path"],
+                        frontmatter.get("_line_uuid", frontmatter["_end_line"]),
+                    )
+                if on_result is not None:
+                    on_result(result)
+                if fail_fast and not result["valid"]:
+                    break
+        finally:
+            stream.close()
+        complete = len(results) == len(files)
+
+        cache = self.cache
+        if cache is not None and complete:
+            cache.prune(
+                f"{doc_type}/" if doc_type else "",
+                {self._cache_key(file_path) for file_path in files},
+            )
+            cache.save()
+
+        # Corpus-wide rules need every document. GUUIDs are unique across
+        # the whole tree, so a type-filtered run also indexes the documents
+        # of the other folders, from their frontmatter only
+        if complete:
+            if doc_type:
+                self._add_other_guuids(guuids, set(files))
+            flagged = guuids.flag_duplicates(results)
+            if on_result is not None:
+                # Those results were streamed before the duplicates were known
+                for streamed, result in zip(results, flagged):
+                    if result is not streamed:
+                        on_result({**result, "corrected": True})
+            results = flagged
+        results.sort(key=lambda r: r["file_path"])
+
+        output = self.summarize(results)
+        if fail_fast:
+            output["summary"]["skipped"] = len(files) - len(results)
+        if complete:
+            output["guuids"] = guuids.report(date.today())
+        if cache is not None:
+            output["cache"] = {"reused": cache.reused, "validated": cache.validated}
+        return output
+
+    def _add_other_guuids(self, guuids: "GuuidIndex", validated: set) -> None:
+        """Index the GUUIDs of the design documents that were not validated.
+
+        Cached frontmatter is used for unchanged documents; others only have
+        their frontmatter read.
+        """
+        for file_path in sorted(self.design_root.glob("**/*.md"), key=str):
+            if file_path in validated:
+                continue
+            entry = None
+            if self.cache is not None:
+                entry = self.cache.peek(self._cache_key(file_path), file_path)
+            if entry is not None:
+                frontmatter = entry["frontmatter"]
+            else:
+                frontmatter = self.parse_frontmatter(file_path)[0]
+            if frontmatter is not None and "uuid" in frontmatter:
+                guuids.add(
+                    frontmatter["uuid"],
+                    self._result_path(file_path),
+                    frontmatter.get("_line_uuid", frontmatter["_end_line"]),
+                )
 
-        # Compute summary
-        total_errors = sum(len(r["errors"]) for r in results)
-        total_warnings = sum(len(r["warnings"]) for r in results)
-        valid_count = sum(1 for r in results if r["valid"])
 
+class GuuidIndex:
+    """Hash index of the GUUIDs used across a design corpus.
+
+    Built in one pass over the documents; duplicates, per-day sequence gaps
+    and the next free sequence numbers are then read off in linear time
+    (apart from sorting each day's sequence numbers).
+    """
+
+    def __init__(self) -> None:
+        # GUUID -> [(file path, line number)]
+        self.locations: Dict[str, List[Tuple[str, int]]] = {}
+
+    def add(self, uuid: str, file_path: str, line_num: int) -> None:
+        """Record where a GUUID is used; malformed values are ignored."""
+        if DesignDocumentValidator.UUID_PATTERN.match(uuid):
+            self.locations.setdefault(uuid, []).append((file_path, line_num))
+
+    def duplicates(self) -> Dict[str, List[str]]:
+        """GUUIDs used by more than one document, with their file paths."""
         return {
-            "valid": total_errors == 0,
-            "results": results,
-            "summary": {
-                "total": len(results),
-                "valid": valid_count,
-                "invalid": len(results) - valid_count,
-                "total_errors": total_errors,
-                "total_warnings": total_warnings,
-            },
+            uuid: sorted(path for path, _ in locations)
+            for uuid, locations in sorted(self.locations.items())
+            if len(locations) > 1
+        }
+
+    def flag_duplicates(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add a duplicate-UUID error to the results of documents sharing one.
+
+        Results are copied before they are changed, since they may be shared
+        with the validation cache.
+        """
+        errors: Dict[str, List[str]] = {}
+        for uuid, locations in self.locations.items():
+            if len(locations) < 2:
+                continue
+            for path, line_num in locations:
+                others = ", ".join(sorted(p for p, _ in locations if p != path))
+                errors.setdefault(path, []).append(
+                    f"Line {line_num}: Duplicate UUID '{uuid}', also used by {others}"
+                )
+        if not errors:
+            return results
+
+        flagged = []
+        for result in results:
+            extra = errors.get(result["file_path"])
+            if extra:
+                result = {
+                    **result,
+                    "valid": False,
+                    "errors": result["errors"] + extra,
+                }
+            flagged.append(result)
+        return flagged
+
+    def report(self, today: date) -> Dict[str, Any]:
+        """Duplicates, sequence gaps per day and the next free GUUIDs.
+
+        Args:
+            today: Day for which the next free GUUID is suggested
+
+        Returns:
+            Dictionary with "total" distinct GUUIDs, "duplicates", "days"
+            (per YYYYMMDD: "count", "last", "gaps" as [first, last] ranges,
+            "next") and "next_guuid" for today
+        """
+        sequences: Dict[str, List[int]] = {}
+        for uuid in self.locations:
+            day, sequence = uuid[6:14], int(uuid[15:])
+            if sequence >= 1:
+                sequences.setdefault(day, []).append(sequence)
+
+        days: Dict[str, Dict[str, Any]] = {}
+        for day in sorted(sequences):
+            used = sorted(sequences[day])
+            gaps = []
+            expected = 1
+            for sequence in used:
+                if sequence > expected:
+                    gaps.append([expected, sequence - 1])
+                expected = sequence + 1
+            if expected <= MAX_SEQUENCE:
+                next_free: Optional[int] = expected
+            else:
+                next_free = gaps[0][0] if gaps else None
+            days[day] = {
+                "count": len(used),
+                "last": used[-1],
+                "gaps": gaps,
+                "next": next_free,
+            }
+
+        key = today.strftime("%Y%m%d")
+        next_today = days[key]["next"] if key in days else 1
+        return {
+            "total": len(self.locations),
+            "duplicates": self.duplicates(),
+            "days": days,
+            "next_guuid": (
+                f"GUUID-{key}-{next_today:04d}" if next_today is not None else None
+            ),
         }
 
 
+def _validate_chunk(
+    validator_class: type,
+    design_root: Path,
+    max_frontmatter_bytes: int,
+    files: List[Path],
+) -> List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Validate a chunk of documents in a worker process."""
+    validator = validator_class(
+        design_root, use_cache=False, max_frontmatter_bytes=max_frontmatter_bytes
+    )
+    return [validator.check_file(file_path) for file_path in files]
+
+
 def main() -> None:
     """Main entry point."""
     parser = argparse.ArgumentParser(
@@ -373,6 +1060,15 @@ Examples:
     # Validate all documents of a specific type
     %(prog)s --all --type pdr
 
+    # Validate all documents again, ignoring cached results
+    %(prog)s --all --no-cache
+
+    # Quick pre-commit check: all CPUs, stop at the first invalid document
+    %(prog)s --all --jobs 0 --fail-fast --format ndjson
+
+    # Pre-commit check of exactly what is about to be committed
+    %(prog)s --staged
+
     # Verbose output with all warnings
     %(prog)s design/pdr/auth-system.md --verbose
         """,
@@ -389,6 +1085,11 @@ Examples:
         action="store_true",
         help="Validate all design documents",
     )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Validate the staged content of added or changed design documents",
+    )
     parser.add_argument(
         "--type",
         dest="doc_type",
@@ -402,9 +1103,36 @@ Examples:
     )
     parser.add_argument(
         "--format",
-        choices=["json", "text"],
+        choices=["json", "ndjson", "text"],
         default="json",
-        help="Output format (default: json)",
+        help="Output format (default: json; ndjson streams one result per line, "
+        "repeating with \"corrected\": true any result later found invalid)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Validate with N processes (0 = one per CPU; small runs always "
+        "run serially; with --all)",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop at the first invalid document (with --all)",
+    )
+    parser.add_argument(
+        "--max-frontmatter-bytes",
+        type=int,
+        default=FRONTMATTER_MAX_BYTES,
+        metavar="N",
+        help="Read at most N bytes of a document looking for the end of its "
+        f"frontmatter (default: {FRONTMATTER_MAX_BYTES})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Validate every document instead of reusing cached results (with --all)",
     )
     parser.add_argument(
         "--verbose",
@@ -415,8 +1143,14 @@ Examples:
     args = parser.parse_args()
 
     # Validate arguments
-    if not args.file and not args.all:
-        parser.error("Either provide a file path or use --all")
+    if not args.file and not args.all and not args.staged:
+        parser.error("Either provide a file path or use --all or --staged")
+    if args.staged and (args.file or args.all):
+        parser.error("--staged cannot be combined with a file path or --all")
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or a positive number")
+    if args.max_frontmatter_bytes < 1:
+        parser.error("--max-frontmatter-bytes must be a positive number")
 
     # Determine design directory
     if args.design_dir:
@@ -432,24 +1166,57 @@ Examples:
         }
         if args.format == "json":
             print(json.dumps(error_result, indent=2))
+        elif args.format == "ndjson":
+            print(json.dumps(error_result))
         else:
             print(f"Error: Design directory not found: {design_dir}")
         sys.exit(1)
 
-    validator = DesignDocumentValidator(design_dir)
+    validator = DesignDocumentValidator(
+        design_dir,
+        use_cache=not args.no_cache,
+        max_frontmatter_bytes=args.max_frontmatter_bytes,
+    )
+
+    def print_line(doc_result: Dict[str, Any]) -> None:
+        print(json.dumps(doc_result), flush=True)
 
     # Perform validation
     if args.all:
-        result = validator.validate_all(doc_type=args.doc_type)
+        result = validator.validate_all(
+            doc_type=args.doc_type,
+            jobs=args.jobs,
+            fail_fast=args.fail_fast,
+            on_result=print_line if args.format == "ndjson" else None,
+        )
+    elif args.staged:
+        try:
+            result = validator.validate_staged()
+        except GitError as e:
+            result = {"valid": False, "errors": [f"git: {e}"], "warnings": []}
+            if args.format == "text":
+                print(f"Error: git: {e}")
+            else:
+                print(json.dumps(result, indent=2 if args.format == "json" else None))
+            sys.exit(1)
+        if args.format == "ndjson":
+            for doc_result in result["results"]:
+                print_line(doc_result)
     else:
         result = validator.validate_file(args.file)
+    multiple = args.all or args.staged
 
     # Output results
     if args.format == "json":
         print(json.dumps(result, indent=2))
+    elif args.format == "ndjson":
+        if multiple:
+            print(json.dumps({k: v for k, v in result.items() if k != "results"}))
+        else:
+            print_line(result)
     else:
         # Text format
-        if args.all:
+        if multiple:
             print("Design Document Validation Summary")
             print("=" * 50)
             print(f"Total documents: {result['summary']['total']}")
@@ -457,6 +1224,15 @@ Examples:
             print(f"Invalid: {result['summary']['invalid']}")
             print(f"Total errors: {result['summary']['total_errors']}")
             print(f"Total warnings: {result['summary']['total_warnings']}")
+            if result["summary"].get("skipped"):
+                print(f"Skipped (--fail-fast): {result['summary']['skipped']}")
+            if "guuids" in result:
+                guuids = result["guuids"]
+                gaps = sum(len(day["gaps"]) for day in guuids["days"].values())
+                print(f"Distinct GUUIDs: {guuids['total']}")
+                print(f"Duplicate GUUIDs: {len(guuids['duplicates'])}")
+                print(f"Sequence gaps: {gaps}")
+                print(f"Next free GUUID: {guuids['next_guuid']}")
             print()
 
             for doc_result in result["results"]:
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+eama_design_walk.py - Design directory discovery and pruned file traversal.
+
+This module decides which markdown files belong to the design corpus:
+- Design directories come from include globs (default: the usual design,
+  specs and architecture folders) in the project config
+- Exclude globs from the config and .gitignore files prune the traversal,
+  so ignored folders are never listed
+- A single os.scandir walk covers nested design directories (e.g. docs and
+  docs/design) and visits every physical directory once, so symlinked
+  folders neither loop nor produce duplicate results
+
+Config file (optional), .eama/design-search.json in the project directory:
+    {
+        "include": ["design", "docs/design", "rfcs/*"],
+        "exclude": ["archive/", "generated/", "vendor/"],
+        "gitignore": true,
+        "git_index": false
+    }
+
+Exclude patterns use .gitignore syntax relative to the project directory.
+Hidden files and directories are always skipped. git_index makes the
+design index trust git blob SHAs for unchanged tracked files instead of
+stat()ing them (see eama_design_index.git_blob_shas).
+
+Used by eama_design_search.py for scanning.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+__all__ = [
+    "CONFIG_FILE",
+    "DEFAULT_DESIGN_DIRS",
+    "WalkConfig",
+    "IgnoreRule",
+    "load_walk_config",
+    "compile_glob",
+    "parse_ignore_lines",
+    "is_ignored",
+    "find_design_roots",
+    "walk_design_files",
+]
+
+CONFIG_FILE = Path(".eama") / "design-search.json"
+
+# Design directory names checked when the config has no include list
+DEFAULT_DESIGN_DIRS = [
+    "design",
+    "designs",
+    "specs",
+    "specifications",
+    "architecture",
+    "docs/design",
+    "docs/specs",
+    "docs/architecture",
+]
+
+GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+@dataclass
+class WalkConfig:
+    """Traversal settings from the project config."""
+
+    include: list[str] = field(default_factory=lambda: list(DEFAULT_DESIGN_DIRS))
+    exclude: list[str] = field(default_factory=list)
+    gitignore: bool = True
+    git_index: bool = False
+
+
+@dataclass
+class IgnoreRule:
+    """A compiled .gitignore-style pattern."""
+
+    base: str
+    regex: re.Pattern[str]
+    negate: bool
+    dir_only: bool
+
+
+def load_walk_config(project_dir: Path) -> WalkConfig:
+    """Load the traversal settings, falling back to defaults.
+
+    A malformed config is reported on stderr and ignored.
+    """
+    config_path = project_dir / CONFIG_FILE
+    try:
+        data: Any = json.loads(config_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return WalkConfig()
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring {config_path}: {e}", file=sys.stderr)
+        return WalkConfig()
+
+    config = WalkConfig()
+    if not isinstance(data, dict):
+        print(f"Warning: Ignoring {config_path}: not an object", file=sys.stderr)
+        return config
+
+    for name in ("include", "exclude"):
+        value = data.get(name)
+        if value is None:
+            continue
+        if isinstance(value, list) and all(isinstance(v, str) for v in value):
+            setattr(config, name, value)
+        else:
+            print(
+                f"Warning: Ignoring '{name}' in {config_path}: expected a list "
+                "of strings",
+                file=sys.stderr,
+            )
+    for name in ("gitignore", "git_index"):
+        if isinstance(data.get(name), bool):
+            setattr(config, name, data[name])
+    return config
+
+
+def compile_glob(pattern: str) -> re.Pattern[str]:
+    """Translate a glob with ``**`` support into a regex on '/' paths.
+
+    ``*`` and ``?`` never cross a '/', ``**/`` matches any number of leading
+    directories, and a trailing ``/**`` also matches the directory itself.
+    """
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            out.append("(?:/.*)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 2)
+            if end < 0:
+                out.append(re.escape("["))
+                i += 1
+                continue
+            body = pattern[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+            i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out))
+
+
+def parse_ignore_lines(lines: list[str], base: str = "") -> list[IgnoreRule]:
+    """Compile .gitignore lines.
+
+    Args:
+        lines: Pattern lines (comments and blanks are skipped)
+        base: Directory the patterns are relative to, as a '/' path from the
+            project directory ('' for the project directory itself)
+
+    Returns:
+        Rules in file order (later rules take precedence)
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+
+        # Patterns without an inner '/' match at any depth
+        if "/" not in line:
+            line = "**/" + line
+        rules.append(
+            IgnoreRule(base, compile_glob(line.lstrip("/")), negate, dir_only)
+        )
+    return rules
+
+
+def is_ignored(rel_path: str, is_dir: bool, rules: list[IgnoreRule]) -> bool:
+    """Apply rules to a '/' path relative to the project; the last match wins."""
+    ignored = False
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        if rule.base:
+            if not rel_path.startswith(rule.base + "/"):
+                continue
+            path = rel_path[len(rule.base) + 1 :]
+        else:
+            path = rel_path
+        if rule.regex.fullmatch(path):
+            ignored = not rule.negate
+    return ignored
+
+
+def _read_ignore_file(path: str, base: str) -> list[IgnoreRule]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return parse_ignore_lines(f.readlines(), base)
+    except (OSError, UnicodeDecodeError):
+        return []
+
+
+def _base_rules(project_dir: Path, config: WalkConfig) -> list[IgnoreRule]:
+    """Rules that apply everywhere: .git/info/exclude and the root .gitignore."""
+    rules: list[IgnoreRule] = []
+    if config.gitignore:
+        rules += _read_ignore_file(str(project_dir / ".git" / "info" / "exclude"), "")
+        rules += _read_ignore_file(str(project_dir / ".gitignore"), "")
+    return rules
+
+
+def _rules_for(
+    project_dir: Path,
+    rel_dir: str,
+    config: WalkConfig,
+    rules: list[IgnoreRule],
+    excludes: list[IgnoreRule],
+) -> tuple[list[IgnoreRule], bool]:
+    """Extend rules with .gitignore files between the project and rel_dir.
+
+    Returns:
+        Tuple of (rules for files inside rel_dir, whether rel_dir or one of
+        its parents is ignored or excluded)
+    """
+    parts = rel_dir.split("/")
+    for depth in range(1, len(parts) + 1):
+        rel = "/".join(parts[:depth])
+        if is_ignored(rel, True, rules) or is_ignored(rel, True, excludes):
+            return rules, True
+        if config.gitignore and depth < len(parts):
+            ignore_file = str(project_dir / rel / ".gitignore")
+            rules = rules + _read_ignore_file(ignore_file, rel)
+    return rules, False
+
+
+def find_design_roots(
+    project_dir: Path, config: Optional[WalkConfig] = None
+) -> list[Path]:
+    """Design directories matching the include globs, in path order.
+
+    Directories reached through different spellings (symlinks) are listed
+    once.
+    """
+    config = config or load_walk_config(project_dir)
+    roots: list[Path] = []
+    seen: set[tuple[int, int]] = set()
+    for pattern in config.include:
+        pattern = pattern.strip("/")
+        if not pattern:
+            continue
+        if GLOB_CHARS.search(pattern):
+            candidates = sorted(project_dir.glob(pattern))
+        else:
+            candidates = [project_dir / pattern]
+        for candidate in candidates:
+            try:
+                st = candidate.stat()
+            except OSError:
+                continue
+            key = (st.st_dev, st.st_ino)
+            if not candidate.is_dir() or key in seen:
+                continue
+            seen.add(key)
+            roots.append(candidate)
+    return sorted(roots)
+
+
+def walk_design_files(
+    project_dir: Path, config: Optional[WalkConfig] = None
+) -> list[Path]:
+    """List markdown files in the design directories with one pruned walk.
+
+    Each physical directory is visited once: a design directory nested in
+    another is covered by the outer walk, symlinks into or above a design
+    directory are not followed, and any other symlink cycle is cut when it
+    reaches a directory that was already visited.
+
+    Args:
+        project_dir: Project root
+        config: Traversal settings (default: loaded from the project config)
+
+    Returns:
+        Markdown files in stable path order
+    """
+    config = config or load_walk_config(project_dir)
+    roots = find_design_roots(project_dir, config)
+    base_rules = _base_rules(project_dir, config)
+    # Kept apart so a .gitignore negation cannot re-include an excluded path
+    excludes = parse_ignore_lines(config.exclude)
+
+    def pruned(rel: str, is_dir: bool, rules: list[IgnoreRule]) -> bool:
+        return is_ignored(rel, is_dir, excludes) or is_ignored(rel, is_dir, rules)
+
+    # Symlinks into (or above) a design directory would revisit it
+    real_roots = [os.path.realpath(root) for root in roots]
+
+    def covered(target: str) -> bool:
+        return any(
+            target == real
+            or target.startswith(real + os.sep)
+            or real.startswith(target + os.sep)
+            for real in real_roots
+        )
+
+    files: list[Path] = []
+    visited: set[tuple[int, int]] = set()
+    for root in roots:
+        try:
+            rel_root = root.relative_to(project_dir).as_posix()
+        except ValueError:
+            continue
+        rules, ignored = _rules_for(
+            project_dir, rel_root, config, base_rules, excludes
+        )
+        if ignored:
+            continue
+
+        stack = [(str(root), rel_root, rules)]
+        while stack:
+            dir_path, rel_dir, rules = stack.pop()
+            try:
+                st = os.stat(dir_path)
+            except OSError:
+                continue
+            key = (st.st_dev, st.st_ino)
+            if key in visited:
+                continue
+            visited.add(key)
+
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+
+            if config.gitignore and any(e.name == ".gitignore" for e in entries):
+                rules = rules + _read_ignore_file(
+                    os.path.join(dir_path, ".gitignore"), rel_dir
+                )
+
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                rel = f"{rel_dir}/{entry.name}"
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    if entry.is_symlink() and covered(os.path.realpath(entry.path)):
+                        continue
+                    if not pruned(rel, True, rules):
+                        stack.append((entry.path, rel, rules))
+                elif entry.name.endswith(".md") and not pruned(rel, False, rules):
+                    files.append(Path(entry.path))
+
+    return sorted(files)